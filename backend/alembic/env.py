@@ -10,6 +10,7 @@ from alembic import context
 from app.auth.models import Account, User, VerificationToken  # noqa: F401
 from app.config import settings
 from app.database import Base
+from app.journal.models import JournalAggregate, JournalEquity, Trade  # noqa: F401
 from app.users.models import UserPreference  # noqa: F401
 from app.watchlists.models import Watchlist, WatchlistItem  # noqa: F401
 
@@ -0,0 +1,112 @@
+"""Add trades, journal_aggregates and journal_equity tables
+
+Revision ID: 004_add_trade_journal
+Revises: 003_add_ohlcv_cache
+Create Date: 2026-03-02
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "004_add_trade_journal"
+down_revision: Union[str, None] = "003_add_ohlcv_cache"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Journal trades
+    op.create_table(
+        "trades",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            server_default=sa.text("gen_random_uuid()"),
+            nullable=False,
+        ),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("symbol", sa.String(30), nullable=False),
+        sa.Column("interval", sa.String(10), nullable=False),
+        sa.Column("direction", sa.String(5), nullable=False),
+        sa.Column("entry_time", sa.BigInteger(), nullable=False),
+        sa.Column("entry_price", sa.Float(), nullable=False),
+        sa.Column("stop_loss", sa.Float(), nullable=True),
+        sa.Column("take_profit", sa.Float(), nullable=True),
+        sa.Column("outcome", sa.String(10), server_default="open", nullable=False),
+        sa.Column("exit_time", sa.BigInteger(), nullable=True),
+        sa.Column("exit_price", sa.Float(), nullable=True),
+        sa.Column("pnl", sa.Float(), nullable=True),
+        sa.Column("r_multiple", sa.Float(), nullable=True),
+        sa.Column("strategy", sa.String(100), nullable=True),
+        sa.Column(
+            "tags",
+            postgresql.ARRAY(sa.String(50)),
+            server_default="{}",
+            nullable=False,
+        ),
+        sa.Column("comment", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_trades_user_entry", "trades", ["user_id", "entry_time"])
+
+    # Additive analytics counters per (dimension, bucket)
+    op.create_table(
+        "journal_aggregates",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("dimension", sa.String(20), nullable=False),
+        sa.Column("bucket", sa.String(100), nullable=False),
+        sa.Column("trades", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("wins", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("losses", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("breakevens", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("sum_r", sa.Float(), server_default="0", nullable=False),
+        sa.Column("gross_win_r", sa.Float(), server_default="0", nullable=False),
+        sa.Column("gross_loss_r", sa.Float(), server_default="0", nullable=False),
+        sa.Column("sum_pnl", sa.Float(), server_default="0", nullable=False),
+        sa.Column("planned_rr_sum", sa.Float(), server_default="0", nullable=False),
+        sa.Column("planned_rr_count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "dimension", "bucket"),
+    )
+
+    # Equity-curve state in entry order
+    op.create_table(
+        "journal_equity",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("closed_trades", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_entry_time", sa.BigInteger(), nullable=True),
+        sa.Column("equity_r", sa.Float(), server_default="0", nullable=False),
+        sa.Column("peak_r", sa.Float(), server_default="0", nullable=False),
+        sa.Column("max_drawdown_r", sa.Float(), server_default="0", nullable=False),
+        sa.Column("current_streak", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("max_win_streak", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("max_loss_streak", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("stale", sa.Boolean(), server_default="false", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("journal_equity")
+    op.drop_table("journal_aggregates")
+    op.drop_index("ix_trades_user_entry", table_name="trades")
+    op.drop_table("trades")
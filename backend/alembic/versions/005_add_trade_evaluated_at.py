@@ -0,0 +1,27 @@
+"""Add trades.evaluated_at for re-evaluating open trades
+
+Revision ID: 005_add_trade_evaluated_at
+Revises: 004_add_trade_journal
+Create Date: 2026-10-19
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005_add_trade_evaluated_at"
+down_revision: Union[str, None] = "004_add_trade_journal"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Unix seconds of the last evaluation; NULL re-evaluates open trades once.
+    op.add_column("trades", sa.Column("evaluated_at", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("trades", "evaluated_at")
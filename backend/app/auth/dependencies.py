@@ -1,8 +1,9 @@
 from typing import Annotated
 
 import structlog
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi_nextauth_jwt import NextAuthJWT
+from fastapi_nextauth_jwt.exceptions import NextAuthJWTException
 
 from app.config import settings
 
@@ -33,3 +34,19 @@ async def get_current_user(
             detail="Invalid authentication token",
         )
     return {"user_id": user_id, "email": jwt.get("email")}
+
+
+async def get_optional_user(request: Request) -> dict | None:
+    """Like get_current_user, but returns None for anonymous requests.
+
+    For public endpoints that personalize their response when a session
+    cookie is present.
+    """
+    try:
+        jwt = JWT(request)
+    except NextAuthJWTException:
+        return None
+    user_id = jwt.get("userId") or jwt.get("sub")
+    if not user_id:
+        return None
+    return {"user_id": user_id, "email": jwt.get("email")}
@@ -0,0 +1,206 @@
+"""Vectorized first-touch evaluation of entry / stop-loss / take-profit trades.
+
+Given one candle series and many trades on it, finds for every trade the
+first candle after entry whose range reaches the stop or the target. The
+scan is done for all open trades at once over blocks of candles (a 2-D
+gather of highs and lows per block), and the block doubles each round,
+so a journal of thousands of trades costs a handful of NumPy passes
+instead of a Python loop per trade per candle.
+
+Conventions:
+- A trade is live from the candle *after* the one opening at or before
+  its entry_time (entry is treated as filled by that candle's close).
+- Long stops trigger on low <= stop, targets on high >= target; shorts
+  mirror this. A NaN level never triggers.
+- A candle that opens beyond a level fills at its open (gap), otherwise
+  the fill is at the level.
+- When a candle reaches both levels and no gap decides it, the order
+  inside the candle is unknown. `stop_first` (conservative) or
+  `target_first` picks the outcome and the trade is flagged ambiguous so
+  the caller can resolve it from finer candles.
+- Trades with no hit within `max_candles` (or before their optional
+  expiry time) stay open and are marked to the last evaluated close.
+
+Everything here is pure NumPy on plain arrays so it can run in a worker
+process.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+# exit reasons
+OPEN, STOP, TARGET = 0, 1, 2
+
+# outcomes
+OUTCOME_OPEN, WIN, LOSS, BREAKEVEN = 0, 1, 2, 3
+
+# |pnl| at or below this fraction of the entry price counts as breakeven.
+BREAKEVEN_TOLERANCE = 1e-9
+
+_FIRST_BLOCK = 32
+_MAX_BLOCK = 4096
+
+# Upper bound on (trades x candles) cells scanned in one pass. Each cell
+# costs about 50 bytes of temporaries, so a pass stays near 50 MB.
+MAX_SCAN_ELEMENTS = 1_000_000
+
+# Trades whose first block fits one pass.
+MAX_SCAN_TRADES = MAX_SCAN_ELEMENTS // _FIRST_BLOCK
+
+
+class Outcomes(NamedTuple):
+    """Per-trade results, aligned with the input trade arrays."""
+
+    exit_index: np.ndarray  # candle index of the exit (-1: no candle after entry)
+    exit_price: np.ndarray
+    reason: np.ndarray  # OPEN / STOP / TARGET
+    ambiguous: np.ndarray  # both levels inside one candle, order assumed
+    outcome: np.ndarray  # OUTCOME_OPEN / WIN / LOSS / BREAKEVEN
+    pnl: np.ndarray  # price units per unit of size
+    pnl_pct: np.ndarray
+    r_multiple: np.ndarray  # pnl / initial risk; NaN without a stop
+    candles_held: np.ndarray
+
+
+def evaluate(
+    candles: tuple[np.ndarray, ...],
+    entry_time: np.ndarray,
+    entry_price: np.ndarray,
+    direction: np.ndarray,
+    stop_loss: np.ndarray,
+    take_profit: np.ndarray,
+    max_candles: int,
+    stop_first: bool = True,
+    expires: np.ndarray | None = None,
+) -> Outcomes:
+    """Evaluate trades against one chronological candle series.
+
+    `candles` is CandleBatch.columns(); `direction` is +1 (long) or -1
+    (short); missing stop / target levels are NaN. `expires` optionally
+    bounds each trade to candles opening at or before that time.
+    """
+    time, open_, high, low, close = candles[:5]
+    n, m = len(entry_time), len(time)
+    direction = np.asarray(direction, dtype=np.float64)
+    entry_price = np.asarray(entry_price, dtype=np.float64)
+    stop_loss = np.asarray(stop_loss, dtype=np.float64)
+    take_profit = np.asarray(take_profit, dtype=np.float64)
+
+    start = np.searchsorted(time, entry_time, "right")
+    end = np.minimum(start + max_candles, m)
+    if expires is not None:
+        end = np.minimum(end, np.searchsorted(time, expires, "right"))
+    exit_index = np.full(n, -1, dtype=np.int64)
+    reason = np.zeros(n, dtype=np.int8)
+    ambiguous = np.zeros(n, dtype=bool)
+
+    def scan(pending: np.ndarray, offset: int, block: int) -> np.ndarray:
+        """Settle the trades hit in candles [offset, offset + block); True for the rest."""
+        idx = start[pending, None] + offset + np.arange(block)
+        valid = idx < end[pending, None]
+        idx = np.minimum(idx, m - 1)
+        d = direction[pending, None]
+        sl = stop_loss[pending, None]
+        tp = take_profit[pending, None]
+
+        # Signed comparisons make shorts use the same tests as longs.
+        adverse = np.where(d > 0, low[idx], high[idx]) * d
+        favorable = np.where(d > 0, high[idx], low[idx]) * d
+        stop = valid & (adverse <= sl * d)
+        target = valid & (favorable >= tp * d)
+        hit = stop | target
+
+        found = hit.any(axis=1)
+        rows, first = pending[found], hit[found].argmax(axis=1)
+        at = idx[found, first]
+        s, t = stop[found, first], target[found, first]
+        both = s & t
+        if both.any():
+            # A gap through one level at the open settles the order.
+            d_rows, o = direction[rows], open_[at] * direction[rows]
+            gap_stop = o <= stop_loss[rows] * d_rows
+            gap_target = o >= take_profit[rows] * d_rows
+            s = s & ~(both & gap_target & ~gap_stop)
+            t = t & ~(both & gap_stop)
+            both = s & t
+            if stop_first:
+                t = t & ~both
+            else:
+                s = s & ~both
+        exit_index[rows] = at
+        reason[rows] = np.where(s, STOP, TARGET)
+        ambiguous[rows] = both
+        return ~found & (start[pending] + offset + block < end[pending])
+
+    pending = np.flatnonzero(start < end)
+    offset, block = 0, _FIRST_BLOCK
+    while pending.size:
+        # The block only grows while pending x block fits the budget; more
+        # pending trades than one pass holds are scanned in slices.
+        block = max(_FIRST_BLOCK, min(block, MAX_SCAN_ELEMENTS // pending.size))
+        step = max(1, MAX_SCAN_ELEMENTS // block)
+        alive = np.concatenate(
+            [scan(pending[i : i + step], offset, block) for i in range(0, pending.size, step)]
+        )
+        pending = pending[alive]
+        offset += block
+        block = min(block * 2, _MAX_BLOCK)
+
+    # Trades still open are marked to the last candle they were evaluated on.
+    still_open = (reason == OPEN) & (start < end)
+    exit_index[still_open] = end[still_open] - 1
+
+    has_exit = exit_index >= 0
+    at = np.where(has_exit, exit_index, 0)
+    if m:
+        exit_price = np.where(
+            reason == STOP,
+            fill_price(open_[at], stop_loss, direction, adverse=True),
+            np.where(
+                reason == TARGET,
+                fill_price(open_[at], take_profit, direction, adverse=False),
+                np.where(has_exit, close[at], np.nan),
+            ),
+        )
+    else:
+        exit_price = np.full(n, np.nan)
+
+    pnl, pnl_pct, r_multiple, outcome = score(exit_price, reason, entry_price, direction, stop_loss)
+    candles_held = np.where(has_exit, exit_index - start + 1, 0)
+    return Outcomes(
+        exit_index, exit_price, reason, ambiguous, outcome,
+        pnl, pnl_pct, r_multiple, candles_held,
+    )
+
+
+def fill_price(
+    open_: np.ndarray, level: np.ndarray, direction: np.ndarray, adverse: bool
+) -> np.ndarray:
+    """Fill at the level, or at the open when the candle gaps through it."""
+    o, lv = open_ * direction, level * direction
+    gapped = o <= lv if adverse else o >= lv
+    return np.where(gapped, open_, level)
+
+
+def score(
+    exit_price: np.ndarray,
+    reason: np.ndarray,
+    entry_price: np.ndarray,
+    direction: np.ndarray,
+    stop_loss: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(pnl, pnl_pct, r_multiple, outcome) for exits at `exit_price`."""
+    pnl = (exit_price - entry_price) * direction
+    risk = np.abs(entry_price - stop_loss)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = pnl / entry_price * 100
+        r_multiple = np.where(risk > 0, pnl / risk, np.nan)
+
+    breakeven = np.abs(pnl) <= BREAKEVEN_TOLERANCE * np.abs(entry_price)
+    outcome = np.select(
+        [reason == OPEN, breakeven, pnl > 0],
+        [OUTCOME_OPEN, BREAKEVEN, WIN],
+        LOSS,
+    ).astype(np.int8)
+    return pnl, pnl_pct, r_multiple, outcome
@@ -0,0 +1,53 @@
+"""Process pool for CPU-bound backtest evaluation.
+
+NumPy scans over large journals hold the GIL for long stretches, so big
+jobs run in worker processes instead of the event loop that serves the
+WebSocket clients. Workers are started lazily with the forkserver method
+(forking a process that runs an event loop and threads is unsafe) and
+stopped from the application lifespan.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any
+
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def worker_count() -> int:
+    return settings.BACKTEST_WORKERS or os.cpu_count() or 1
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=worker_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        logger.info("backtest_pool_started", workers=worker_count())
+    return _executor
+
+
+async def run_in_pool(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a picklable function in a worker process."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+
+def shutdown_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.info("backtest_pool_stopped")
@@ -0,0 +1,100 @@
+"""REST endpoints for backtest evaluation."""
+
+import json
+from typing import Annotated
+
+import httpx
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dependencies import get_current_user
+from app.backtest.schemas import EvaluateRequest, EvaluateResponse, SweepRequest, TradeInput
+from app.backtest.service import BacktestService
+from app.backtest.sweep import MAX_SWEEP_EVALUATIONS, run_sweep
+from app.database import async_session, get_db
+from app.market_data.schemas import parse_interval
+
+logger = structlog.get_logger()
+
+router = APIRouter(prefix="/api/v1/backtest", tags=["backtest"])
+
+
+def get_backtest_service(
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> BacktestService:
+    """Dependency to create BacktestService instance."""
+    return BacktestService(db)
+
+
+@router.post("/evaluate", response_model=EvaluateResponse)
+async def evaluate_trades(
+    body: EvaluateRequest,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[BacktestService, Depends(get_backtest_service)],
+) -> EvaluateResponse:
+    """Compute exit, P&L and win/loss/breakeven for a batch of trades.
+
+    Each trade is replayed over the candles after its entry until its stop
+    loss or take profit is touched, or `max_candles` pass (outcome "open").
+    """
+    _validate_intervals(body.trades)
+    try:
+        results, summary = await service.evaluate(body.trades, body.ambiguity, body.max_candles)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except httpx.HTTPError as e:
+        logger.error("backtest_provider_error", error=str(e))
+        raise HTTPException(status_code=502, detail="Could not load historical data")
+    return EvaluateResponse(results=results, summary=summary)
+
+
+@router.post("/sweep")
+async def sweep_parameters(
+    request: Request,
+    body: SweepRequest,
+    current_user: Annotated[dict, Depends(get_current_user)],
+) -> StreamingResponse:
+    """Evaluate recorded entries under a grid of stop / target multiples.
+
+    Streams NDJSON: SweepProgress lines as evaluation jobs finish, then one
+    SweepSummary line with every combination ranked by `rank_by`. A failure
+    after streaming has started is reported as an {"type": "error"} line.
+    """
+    _validate_intervals(body.trades)
+    evaluations = len(body.trades) * len(body.stop_multiples) * len(body.reward_ratios)
+    if evaluations > MAX_SWEEP_EVALUATIONS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Sweep too large: {evaluations} evaluations (max {MAX_SWEEP_EVALUATIONS})",
+        )
+
+    async def lines():
+        # The request-scoped get_db session may be closed before the body is
+        # streamed, so the generator owns its session.
+        async with async_session() as session:
+            sweep = run_sweep(BacktestService(session), body)
+            try:
+                async for message in sweep:
+                    if await request.is_disconnected():
+                        logger.info("backtest_sweep_client_gone", user_id=current_user["user_id"])
+                        return
+                    yield json.dumps(message, separators=(",", ":")) + "\n"
+                await session.commit()
+            except (ValueError, httpx.HTTPError) as e:
+                logger.error("backtest_sweep_failed", error=str(e))
+                yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+            finally:
+                await sweep.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _validate_intervals(trades: list[TradeInput]) -> None:
+    """Reject malformed intervals with 422 before loading any candles."""
+    for interval in {t.interval for t in trades}:
+        try:
+            parse_interval(interval)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
@@ -0,0 +1,129 @@
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+Direction = Literal["long", "short"]
+Outcome = Literal["win", "loss", "breakeven", "open"]
+ExitReason = Literal["stop_loss", "take_profit", "open"]
+Ambiguity = Literal["stop_first", "target_first", "drilldown"]
+RiskBasis = Literal["trade", "atr", "percent"]
+SweepRank = Literal["total_r", "expectancy", "win_rate", "profit_factor"]
+PositiveFloat = Annotated[float, Field(gt=0)]
+
+
+class TradeInput(BaseModel):
+    """A trade to evaluate against historical candles."""
+
+    id: str | None = None  # echoed back in the result
+    symbol: str
+    interval: str
+    entry_time: int  # Unix seconds; evaluation starts with the next candle
+    entry_price: float = Field(gt=0)
+    direction: Direction
+    stop_loss: float | None = Field(default=None, gt=0)
+    take_profit: float | None = Field(default=None, gt=0)
+
+
+class EvaluateRequest(BaseModel):
+    """Request schema for batch trade evaluation."""
+
+    trades: list[TradeInput] = Field(min_length=1, max_length=20_000)
+    # How to order a stop and a target hit inside the same candle:
+    # "drilldown" replays that candle on finer candles and falls back
+    # to stop_first when they cannot tell either.
+    ambiguity: Ambiguity = "drilldown"
+    max_candles: int = Field(default=5000, ge=1, le=100_000)
+
+
+class TradeResult(BaseModel):
+    """Outcome of one evaluated trade."""
+
+    id: str | None
+    outcome: Outcome
+    exit_reason: ExitReason
+    exit_time: int | None  # open time of the exit candle
+    exit_price: float | None
+    pnl: float | None  # price units per unit of size
+    pnl_pct: float | None
+    r_multiple: float | None  # None without a stop loss
+    candles_held: int
+    ambiguous: bool  # stop and target in one candle, order assumed
+
+
+class EvaluationSummary(BaseModel):
+    """Aggregate counts over an evaluation."""
+
+    trades: int
+    wins: int
+    losses: int
+    breakevens: int
+    open: int
+    win_rate: float | None  # wins / (wins + losses + breakevens)
+    total_r: float  # sum of R multiples of closed trades with a stop
+    ambiguous: int
+
+
+class EvaluateResponse(BaseModel):
+    """Response schema for batch trade evaluation."""
+
+    results: list[TradeResult]
+    summary: EvaluationSummary
+
+
+class SweepRequest(BaseModel):
+    """Request schema for an SL/TP parameter sweep over recorded entries.
+
+    Each combination places the stop `stop_multiple` risk units from the
+    entry and the target `stop_multiple * reward_ratio` units on the
+    other side. A risk unit is the trade's own stop distance ("trade"),
+    ATR(atr_period) at the entry candle ("atr") or 1% of the entry price
+    ("percent"). Recorded take profits are ignored.
+    """
+
+    trades: list[TradeInput] = Field(min_length=1, max_length=20_000)
+    risk_basis: RiskBasis = "trade"
+    atr_period: int = Field(default=14, ge=1, le=500)
+    stop_multiples: list[PositiveFloat] = Field(min_length=1, max_length=50)
+    reward_ratios: list[PositiveFloat] = Field(min_length=1, max_length=50)
+    # Drill-down is not offered: a sweep multiplies the ambiguous candles.
+    ambiguity: Literal["stop_first", "target_first"] = "stop_first"
+    max_candles: int = Field(default=5000, ge=1, le=100_000)
+    rank_by: SweepRank = "total_r"
+
+
+class SweepProgress(BaseModel):
+    """Progress line of a streamed sweep."""
+
+    type: Literal["progress"] = "progress"
+    done: int  # trade evaluations finished
+    total: int
+
+
+class SweepResult(BaseModel):
+    """Aggregate performance of one SL/TP combination.
+
+    R values are in risk units of the chosen basis, so they compare
+    across combinations.
+    """
+
+    stop_multiple: float
+    reward_ratio: float
+    trades: int
+    wins: int
+    losses: int
+    breakevens: int
+    open: int
+    win_rate: float | None
+    total_r: float
+    expectancy: float | None  # mean R per closed trade
+    profit_factor: float | None  # gross won R / gross lost R
+    max_drawdown_r: float  # deepest peak-to-trough of cumulative R by entry time
+
+
+class SweepSummary(BaseModel):
+    """Final line of a streamed sweep: combinations ranked best first."""
+
+    type: Literal["result"] = "result"
+    rank_by: SweepRank
+    skipped: int  # trades without a usable risk unit
+    results: list[SweepResult]
@@ -0,0 +1,323 @@
+"""Backtest service: evaluate recorded trades against historical candles.
+
+Trades are grouped by (symbol, interval). For each group the candle
+windows the trades need (entry to entry + max_candles) are merged into
+as few contiguous spans as possible and each span is loaded once, from
+the cold store or ohlcv_cache (backfilling holes from the provider).
+All trades of the group are then evaluated in one vectorized pass (see
+engine.py); groups with many trades are split by entry time across the
+process pool, each worker receiving only the candles its trades reach.
+
+Stops and targets hit inside the same candle are resolved from finer
+candles when the request asks for drill-down.
+"""
+
+import asyncio
+import time as _time
+from typing import NamedTuple
+
+import numpy as np
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.backtest import engine
+from app.backtest.pool import run_in_pool, worker_count
+from app.backtest.schemas import EvaluationSummary, TradeInput, TradeResult
+from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.resample import UTC, needs_resampling
+from app.market_data.schemas import AssetClass, detect_asset_class, interval_seconds
+from app.market_data.service import MarketDataService, max_gap_seconds
+
+logger = structlog.get_logger()
+
+# Same-candle ambiguities resolved from finer candles per request; the
+# rest keep the stop-first assumption.
+MAX_DRILLDOWNS = 500
+
+_OUTCOMES = {
+    engine.OUTCOME_OPEN: "open",
+    engine.WIN: "win",
+    engine.LOSS: "loss",
+    engine.BREAKEVEN: "breakeven",
+}
+_REASONS = {engine.OPEN: "open", engine.STOP: "stop_loss", engine.TARGET: "take_profit"}
+
+
+class TradeArrays(NamedTuple):
+    """Column form of a group of trades, as the engine consumes them."""
+
+    entry_time: np.ndarray
+    entry_price: np.ndarray
+    direction: np.ndarray
+    stop_loss: np.ndarray
+    take_profit: np.ndarray
+
+    @classmethod
+    def from_inputs(cls, trades: list[TradeInput]) -> "TradeArrays":
+        return cls(
+            np.array([t.entry_time for t in trades], dtype=np.int64),
+            np.array([t.entry_price for t in trades], dtype=np.float64),
+            np.array([1.0 if t.direction == "long" else -1.0 for t in trades]),
+            np.array([np.nan if t.stop_loss is None else t.stop_loss for t in trades]),
+            np.array([np.nan if t.take_profit is None else t.take_profit for t in trades]),
+        )
+
+    def take(self, index: np.ndarray) -> "TradeArrays":
+        return TradeArrays._make(column[index] for column in self)
+
+
+def drilldown_interval(interval: str) -> str | None:
+    """Finer interval used to order a stop and target inside one candle."""
+    seconds = interval_seconds(interval)
+    if seconds > 86400:
+        return "1H"
+    if seconds > 60:
+        return "1m"
+    return None
+
+
+def horizon_seconds(symbol: str, interval: str, max_candles: int) -> int:
+    """Wall-clock span that holds `max_candles` candles after an entry."""
+    span = max_candles * interval_seconds(interval)
+    if detect_asset_class(symbol) == AssetClass.FOREX:
+        # Leave room for weekend closures inside the span.
+        span = span * 7 // 5
+    return span + max_gap_seconds(symbol, interval)
+
+
+def merge_windows(starts: np.ndarray, ends: np.ndarray) -> list[tuple[int, int]]:
+    """Union of [start, end] windows as sorted, disjoint spans."""
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    breaks = np.flatnonzero(starts[1:] > reach[:-1]) + 1
+    firsts = np.concatenate(([0], breaks))
+    lasts = np.concatenate((breaks - 1, [len(starts) - 1]))
+    return [(int(starts[a]), int(reach[b])) for a, b in zip(firsts, lasts)]
+
+
+async def run_engine(
+    candles: CandleBatch,
+    trades: TradeArrays,
+    max_candles: int,
+    stop_first: bool,
+    expires: np.ndarray | None = None,
+    in_pool: bool = False,
+) -> engine.Outcomes:
+    """Evaluate trades off the event loop, in a thread or a worker process.
+
+    Only the candles the trades can reach are handed to the engine, which
+    keeps what is pickled to a worker small.
+    """
+    lo = int(np.searchsorted(candles.time, trades.entry_time.min(), "right"))
+    hi = int(np.searchsorted(candles.time, trades.entry_time.max(), "right")) + max_candles
+    columns = tuple(column[lo:hi] for column in candles.columns())
+    args = (columns, *trades, max_candles, stop_first, expires)
+    if in_pool:
+        out = await run_in_pool(engine.evaluate, *args)
+    else:
+        out = await asyncio.to_thread(engine.evaluate, *args)
+    return out._replace(exit_index=np.where(out.exit_index >= 0, out.exit_index + lo, -1))
+
+
+async def evaluate_trades(
+    candles: CandleBatch,
+    trades: TradeArrays,
+    max_candles: int,
+    stop_first: bool,
+    expires: np.ndarray | None = None,
+) -> engine.Outcomes:
+    """Run the engine in a thread, or split by entry time across the pool."""
+    n = len(trades.entry_time)
+    if n < settings.BACKTEST_POOL_MIN_TRADES:
+        return await run_engine(candles, trades, max_candles, stop_first, expires)
+
+    chunks = np.array_split(np.argsort(trades.entry_time, kind="stable"), worker_count())
+    chunks = [c for c in chunks if len(c)]
+    parts = await asyncio.gather(
+        *(
+            run_engine(
+                candles,
+                trades.take(chunk),
+                max_candles,
+                stop_first,
+                None if expires is None else expires[chunk],
+                in_pool=True,
+            )
+            for chunk in chunks
+        )
+    )
+    merged = [np.empty(n, dtype=field.dtype) for field in parts[0]]
+    for chunk, part in zip(chunks, parts):
+        for column, field in zip(merged, part):
+            column[chunk] = field
+    return engine.Outcomes(*merged)
+
+
+class BacktestService:
+    """Evaluate trades against cached historical candles."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.market_data = MarketDataService(db)
+
+    async def _load(self, symbol: str, interval: str, start_time: int, end_time: int) -> CandleBatch:
+        if needs_resampling(interval, UTC):
+            limit = (end_time - start_time) // interval_seconds(interval) + 1
+            return await self.market_data.get_historical_batch(
+                symbol, interval, start_time, end_time, limit=limit
+            )
+        return await self.market_data.get_span(symbol, interval, start_time, end_time)
+
+    async def load_windows(
+        self,
+        symbol: str,
+        interval: str,
+        entry_time: np.ndarray,
+        max_candles: int,
+        lookback: int = 0,
+    ) -> tuple[CandleBatch, np.ndarray]:
+        """Load the candles after every entry, each merged span once.
+
+        `lookback` also loads that many candles' worth of time before each
+        entry. Returns (candles, expires), where expires[i] is the end of
+        trade i's window, so no trade runs into candles of a later span.
+        """
+        now = int(_time.time())
+        expires = np.minimum(entry_time + horizon_seconds(symbol, interval, max_candles), now)
+        starts = entry_time - lookback * interval_seconds(interval)
+        # Entries in the future have no window at all.
+        spans = [(lo, hi) for lo, hi in merge_windows(starts, expires) if lo <= hi]
+        batches = [await self._load(symbol, interval, lo, hi) for lo, hi in spans]
+        return CandleBatch.concat(batches), expires
+
+    async def evaluate(
+        self,
+        trades: list[TradeInput],
+        ambiguity: str = "drilldown",
+        max_candles: int = 5000,
+    ) -> tuple[list[TradeResult], EvaluationSummary]:
+        """Evaluate trades; results are in request order."""
+        started = _time.perf_counter()
+        groups: dict[tuple[str, str], list[int]] = {}
+        for i, trade in enumerate(trades):
+            groups.setdefault((trade.symbol, trade.interval), []).append(i)
+
+        results: list[TradeResult | None] = [None] * len(trades)
+        drilled = 0
+        for (symbol, interval), index in groups.items():
+            group = TradeArrays.from_inputs([trades[i] for i in index])
+            candles, expires = await self.load_windows(symbol, interval, group.entry_time, max_candles)
+            out = await evaluate_trades(
+                candles, group, max_candles, ambiguity != "target_first", expires
+            )
+            exit_time = np.where(
+                out.exit_index >= 0,
+                candles.time[np.maximum(out.exit_index, 0)] if len(candles) else -1,
+                -1,
+            )
+            if ambiguity == "drilldown":
+                drilled += await self._drilldown(
+                    symbol, interval, group, out, exit_time, MAX_DRILLDOWNS - drilled
+                )
+            for j, i in enumerate(index):
+                results[i] = _to_result(trades[i].id, out, exit_time, j)
+
+        summary = summarize(results)
+        logger.info(
+            "backtest_evaluated",
+            trades=len(trades),
+            groups=len(groups),
+            drilled=drilled,
+            ambiguous=summary.ambiguous,
+            duration_ms=round((_time.perf_counter() - started) * 1000, 1),
+        )
+        return results, summary
+
+    async def _drilldown(
+        self,
+        symbol: str,
+        interval: str,
+        trades: TradeArrays,
+        out: engine.Outcomes,
+        exit_time: np.ndarray,
+        budget: int,
+    ) -> int:
+        """Re-run ambiguous exits on finer candles, updating `out` in place.
+
+        Returns the number of candles drilled into.
+        """
+        fine = drilldown_interval(interval)
+        rows = np.flatnonzero(out.ambiguous)[: max(budget, 0)]
+        if fine is None or not rows.size:
+            return 0
+
+        seconds = interval_seconds(interval)
+        for r in rows:
+            t = int(exit_time[r])
+            window = await self._load(symbol, fine, t, t + seconds - 1)
+            if not len(window):
+                continue
+            sub = engine.evaluate(
+                window.columns(),
+                np.array([t - 1]),
+                *(column[r : r + 1] for column in trades[1:]),
+                max_candles=len(window),
+            )
+            if sub.reason[0] == engine.OPEN:
+                # The finer candles disagree with the coarse one; keep it.
+                continue
+            out.reason[r] = sub.reason[0]
+            out.exit_price[r] = sub.exit_price[0]
+            out.ambiguous[r] = sub.ambiguous[0]
+            exit_time[r] = window.time[sub.exit_index[0]]
+
+        pnl, pnl_pct, r_multiple, outcome = engine.score(
+            out.exit_price[rows],
+            out.reason[rows],
+            trades.entry_price[rows],
+            trades.direction[rows],
+            trades.stop_loss[rows],
+        )
+        out.pnl[rows], out.pnl_pct[rows] = pnl, pnl_pct
+        out.r_multiple[rows], out.outcome[rows] = r_multiple, outcome
+        return len(rows)
+
+
+def _finite(value: float) -> float | None:
+    return float(value) if np.isfinite(value) else None
+
+
+def _to_result(trade_id: str | None, out: engine.Outcomes, exit_time: np.ndarray, j: int) -> TradeResult:
+    return TradeResult(
+        id=trade_id,
+        outcome=_OUTCOMES[int(out.outcome[j])],
+        exit_reason=_REASONS[int(out.reason[j])],
+        exit_time=int(exit_time[j]) if exit_time[j] >= 0 else None,
+        exit_price=_finite(out.exit_price[j]),
+        pnl=_finite(out.pnl[j]),
+        pnl_pct=_finite(out.pnl_pct[j]),
+        r_multiple=_finite(out.r_multiple[j]),
+        candles_held=int(out.candles_held[j]),
+        ambiguous=bool(out.ambiguous[j]),
+    )
+
+
+def summarize(results: list[TradeResult]) -> EvaluationSummary:
+    counts = {"win": 0, "loss": 0, "breakeven": 0, "open": 0}
+    total_r = 0.0
+    for r in results:
+        counts[r.outcome] += 1
+        if r.outcome != "open" and r.r_multiple is not None:
+            total_r += r.r_multiple
+    closed = counts["win"] + counts["loss"] + counts["breakeven"]
+    return EvaluationSummary(
+        trades=len(results),
+        wins=counts["win"],
+        losses=counts["loss"],
+        breakevens=counts["breakeven"],
+        open=counts["open"],
+        win_rate=round(counts["win"] / closed, 4) if closed else None,
+        total_r=round(total_r, 4),
+        ambiguous=sum(r.ambiguous for r in results),
+    )
@@ -0,0 +1,211 @@
+"""SL/TP parameter sweeps over recorded trade entries.
+
+A sweep re-runs every entry under every (stop multiple, reward ratio)
+combination. The candle windows are loaded once per (symbol, interval),
+exactly as for a single evaluation, and each combination is just another
+row of virtual trades for the vectorized engine: the grid is evaluated
+as trades x combinations virtual trades sharing those candles.
+
+Work is cut into jobs of about SWEEP_JOB_EVALUATIONS virtual trades (as
+many as the engine scans in one pass, so a job's scan memory stays
+within engine.MAX_SCAN_ELEMENTS), split by entry time so each job only
+carries the candles its entries reach. Jobs run in the process pool once
+the sweep is large enough and in a thread otherwise; either way the
+event loop only awaits them and streams a progress line as each one
+completes.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import numpy as np
+import structlog
+
+from app.backtest import engine
+from app.backtest.schemas import SweepProgress, SweepRequest, SweepResult, SweepSummary
+from app.backtest.service import BacktestService, TradeArrays, run_engine
+from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.indicators import atr
+
+logger = structlog.get_logger()
+
+# Upper bound on trades x combinations per sweep, and per pool job.
+MAX_SWEEP_EVALUATIONS = 2_000_000
+SWEEP_JOB_EVALUATIONS = engine.MAX_SCAN_TRADES
+
+# Candles of ATR history loaded before each entry (Wilder smoothing keeps
+# under 1% weight beyond 5 periods).
+_ATR_LOOKBACK_PERIODS = 5
+
+
+def combinations(stop_multiples: list[float], reward_ratios: list[float]) -> np.ndarray:
+    """(n, 2) grid of (stop multiple, reward ratio), stop-major."""
+    sm, rr = np.meshgrid(stop_multiples, reward_ratios, indexing="ij")
+    return np.column_stack([sm.ravel(), rr.ravel()])
+
+
+def risk_units(
+    basis: str,
+    trades: TradeArrays,
+    candles: CandleBatch,
+    atr_period: int,
+) -> np.ndarray:
+    """Per-trade risk unit in price terms; NaN where none is available."""
+    if basis == "percent":
+        return trades.entry_price * 0.01
+    if basis == "trade":
+        unit = np.abs(trades.entry_price - trades.stop_loss)
+        return np.where(unit > 0, unit, np.nan)
+
+    values = atr(candles, atr_period)["atr"]
+    at = np.searchsorted(candles.time, trades.entry_time, "right") - 1
+    unit = np.where(at >= 0, values[np.maximum(at, 0)] if len(values) else np.nan, np.nan)
+    return np.where(unit > 0, unit, np.nan)
+
+
+def _virtual_trades(trades: TradeArrays, unit: np.ndarray, grid: np.ndarray) -> TradeArrays:
+    """Combination-major virtual trades: row c * n + j is trade j under combo c."""
+    n, c = len(trades.entry_time), len(grid)
+    stop = np.repeat(grid[:, 0], n) * np.tile(unit, c)
+    target = stop * np.repeat(grid[:, 1], n)
+    entry = np.tile(trades.entry_price, c)
+    direction = np.tile(trades.direction, c)
+    return TradeArrays(
+        np.tile(trades.entry_time, c),
+        entry,
+        direction,
+        entry - direction * stop,
+        entry + direction * target,
+    )
+
+
+def aggregate(
+    grid: np.ndarray,
+    outcome: np.ndarray,
+    r: np.ndarray,
+) -> list[SweepResult]:
+    """Per-combination statistics from (combos, trades) matrices in entry order."""
+    closed = outcome != engine.OUTCOME_OPEN
+    realized = np.where(closed, r, 0.0)
+    closed_n = closed.sum(axis=1)
+    wins = (outcome == engine.WIN).sum(axis=1)
+    losses = (outcome == engine.LOSS).sum(axis=1)
+    breakevens = (outcome == engine.BREAKEVEN).sum(axis=1)
+    total = realized.sum(axis=1)
+    gross_win = np.where(realized > 0, realized, 0.0).sum(axis=1)
+    gross_loss = -np.where(realized < 0, realized, 0.0).sum(axis=1)
+
+    equity = np.cumsum(realized, axis=1)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+    drawdown = (peak - equity).max(axis=1) if equity.shape[1] else np.zeros(len(grid))
+
+    return [
+        SweepResult(
+            stop_multiple=float(grid[i, 0]),
+            reward_ratio=float(grid[i, 1]),
+            trades=int(outcome.shape[1]),
+            wins=int(wins[i]),
+            losses=int(losses[i]),
+            breakevens=int(breakevens[i]),
+            open=int(outcome.shape[1] - closed_n[i]),
+            win_rate=round(float(wins[i] / closed_n[i]), 4) if closed_n[i] else None,
+            total_r=round(float(total[i]), 4),
+            expectancy=round(float(total[i] / closed_n[i]), 4) if closed_n[i] else None,
+            profit_factor=round(float(gross_win[i] / gross_loss[i]), 4) if gross_loss[i] else None,
+            max_drawdown_r=round(float(drawdown[i]), 4),
+        )
+        for i in range(len(grid))
+    ]
+
+
+def rank(results: list[SweepResult], rank_by: str) -> list[SweepResult]:
+    """Best first; combinations without a value for the metric go last."""
+    return sorted(
+        results,
+        key=lambda r: (getattr(r, rank_by) is None, -(getattr(r, rank_by) or 0.0)),
+    )
+
+
+async def run_sweep(service: BacktestService, request: SweepRequest) -> AsyncIterator[dict]:
+    """Evaluate the grid, yielding SweepProgress dicts and a final SweepSummary."""
+    grid = combinations(request.stop_multiples, request.reward_ratios)
+    total = len(request.trades) * len(grid)
+    in_pool = total >= settings.BACKTEST_POOL_MIN_TRADES
+    stop_first = request.ambiguity == "stop_first"
+    lookback = request.atr_period * _ATR_LOOKBACK_PERIODS if request.risk_basis == "atr" else 0
+
+    groups: dict[tuple[str, str], list[int]] = {}
+    for i, trade in enumerate(request.trades):
+        groups.setdefault((trade.symbol, trade.interval), []).append(i)
+
+    entry_times, outcomes, r_values = [], [], []
+    done = skipped = 0
+    for (symbol, interval), index in groups.items():
+        trades = TradeArrays.from_inputs([request.trades[i] for i in index])
+        candles, expires = await service.load_windows(
+            symbol, interval, trades.entry_time, request.max_candles, lookback
+        )
+        unit = risk_units(request.risk_basis, trades, candles, request.atr_period)
+        usable = np.flatnonzero(np.isfinite(unit))
+        skipped += len(index) - len(usable)
+        done += (len(index) - len(usable)) * len(grid)
+        if not len(usable):
+            continue
+
+        order = usable[np.argsort(trades.entry_time[usable], kind="stable")]
+        per_job = max(1, SWEEP_JOB_EVALUATIONS // len(grid))
+        chunks = [order[k : k + per_job] for k in range(0, len(order), per_job)]
+        jobs = {}
+        for chunk in chunks:
+            part = trades.take(chunk)
+            virtual = _virtual_trades(part, unit[chunk], grid)
+            job = asyncio.ensure_future(
+                run_engine(
+                    candles,
+                    virtual,
+                    request.max_candles,
+                    stop_first,
+                    np.tile(expires[chunk], len(grid)),
+                    in_pool=in_pool,
+                )
+            )
+            jobs[job] = chunk
+
+        pending = set(jobs)
+        try:
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for job in finished:
+                    job.result()
+                    done += len(jobs[job]) * len(grid)
+                yield SweepProgress(done=done, total=total).model_dump()
+        finally:
+            # Client gone or a job failed: drop the remaining work.
+            for job in pending:
+                job.cancel()
+
+        for job, chunk in jobs.items():
+            out = job.result()
+            shape = (len(grid), len(chunk))
+            entry_times.append(trades.entry_time[chunk])
+            outcomes.append(out.outcome.reshape(shape))
+            r_values.append((out.pnl / np.tile(unit[chunk], len(grid))).reshape(shape))
+
+    if entry_times:
+        order = np.argsort(np.concatenate(entry_times), kind="stable")
+        outcome = np.concatenate(outcomes, axis=1)[:, order]
+        r = np.concatenate(r_values, axis=1)[:, order]
+    else:
+        outcome = np.zeros((len(grid), 0), dtype=np.int8)
+        r = np.zeros((len(grid), 0))
+
+    results = rank(aggregate(grid, outcome, r), request.rank_by)
+    logger.info(
+        "backtest_sweep_complete",
+        trades=len(request.trades),
+        combinations=len(grid),
+        skipped=skipped,
+        in_pool=in_pool,
+    )
+    yield SweepSummary(rank_by=request.rank_by, skipped=skipped, results=results).model_dump()
@@ -30,6 +30,57 @@ class Settings(BaseSettings):
     BINANCE_WS_URL_FALLBACK: str = "wss://stream.binance.us:9443"
     TWELVE_DATA_REST_URL: str = "https://api.twelvedata.com"
     TWELVE_DATA_WS_URL: str = "wss://ws.twelvedata.com/v1/quotes/price"
+
+    # Cold-tier candle store (memory-mapped columnar files for long ranges)
+    COLD_STORE_ENABLED: bool = True
+    COLD_STORE_DIR: str = "data/cold"
+
+    # Hard cap on rows a single /history/stream export may return
+    HISTORY_STREAM_MAX_ROWS: int = 5_000_000
+
+    # Memory budget for encoded + precompressed /history/pages bodies
+    HISTORY_PAGE_CACHE_BYTES: int = 128 * 1024 * 1024
+
+    # Scroll-back prefetch of older history (see prefetch.py): background
+    # loads running at once, and loads started per minute across clients
+    HISTORY_PREFETCH_CONCURRENCY: int = 2
+    HISTORY_PREFETCH_PER_MINUTE: int = 120
+
+    # Memory budget for cached indicator series (see indicator_cache.py)
+    INDICATOR_CACHE_BYTES: int = 64 * 1024 * 1024
+
+    # Aggregated-trade ingestion (opt-in): Binance symbols to record, where
+    # to store them, and how many trades may wait for disk before the
+    # stream reader pauses
+    TRADE_INGEST_SYMBOLS: list[str] = []
+    TRADE_STORE_DIR: str = "data/trades"
+    TRADE_INGEST_MAX_BUFFERED: int = 200_000
+
+    # Symbol registry: seconds between background exchangeInfo refreshes
+    SYMBOL_REFRESH_SECONDS: int = 3600
+
+    # Live watchlist tickers: seconds between pushes of changed entries
+    TICKER_PUSH_INTERVAL: float = 1.0
+
+    # Volume profile: per-day histogram memory budget, and the most source
+    # candles a profile may read (picks the finest interval that fits)
+    VOLUME_PROFILE_CACHE_BYTES: int = 32 * 1024 * 1024
+    VOLUME_PROFILE_MAX_CANDLES: int = 200_000
+
+    # Multi-timeframe history: most candles per interval in one response
+    MTF_MAX_CANDLES: int = 5000
+
+    # Replay sessions: shared page memory budget and concurrent session cap
+    REPLAY_PAGE_CACHE_BYTES: int = 64 * 1024 * 1024
+    REPLAY_MAX_SESSIONS: int = 1000
+
+    # Backtest evaluation: worker processes (0 = one per CPU) and the
+    # smallest batch of trades worth shipping to the pool
+    BACKTEST_WORKERS: int = 0
+    BACKTEST_POOL_MIN_TRADES: int = 2000
+
+    # Upper bound on paths per journal Monte Carlo request
+    JOURNAL_MONTE_CARLO_MAX_SIMULATIONS: int = 100_000
     EMAIL_FROM: str = "noreply@agencial.dev"
     BACKEND_URL: str = "http://localhost:8000"
     FRONTEND_URL: str = "http://localhost:3000"
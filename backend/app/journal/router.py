@@ -0,0 +1,187 @@
+import uuid
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.dependencies import get_current_user
+from app.config import settings
+from app.database import get_db
+from app.journal.analytics import summarize_bucket
+from app.journal.schemas import (
+    AnalyticsResponse,
+    BucketStats,
+    EquityPoint,
+    EquitySummary,
+    MonteCarloResponse,
+    RebuildResponse,
+    ResampleMethod,
+    TradeCreate,
+    TradeOutcome,
+    TradeResponse,
+    TradeUpdate,
+)
+from app.journal.service import JournalService
+
+router = APIRouter(prefix="/api/v1/journal", tags=["journal"])
+
+# Breakdown dimensions returned by /analytics, in display order.
+_BREAKDOWNS = ("strategy", "symbol", "tag", "session", "weekday", "hour")
+
+
+def get_journal_service(
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> JournalService:
+    """Dependency to create JournalService instance."""
+    return JournalService(db)
+
+
+@router.get("/trades", response_model=list[TradeResponse])
+async def list_trades(
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+    symbol: Annotated[str | None, Query()] = None,
+    strategy: Annotated[str | None, Query()] = None,
+    outcome: Annotated[TradeOutcome | None, Query()] = None,
+    tag: Annotated[str | None, Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 100,
+    offset: Annotated[int, Query(ge=0)] = 0,
+) -> list[TradeResponse]:
+    """List journal trades, newest entry first, with optional filters."""
+    trades = await service.list_trades(
+        current_user["user_id"], symbol, strategy, outcome, tag, limit, offset
+    )
+    return [TradeResponse.model_validate(trade) for trade in trades]
+
+
+@router.post(
+    "/trades",
+    response_model=TradeResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_trade(
+    data: TradeCreate,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+) -> TradeResponse:
+    """Record a trade; its outcome is evaluated from historical candles."""
+    trade = await service.create_trade(current_user["user_id"], data)
+    return TradeResponse.model_validate(trade)
+
+
+@router.get("/trades/{trade_id}", response_model=TradeResponse)
+async def get_trade(
+    trade_id: uuid.UUID,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+) -> TradeResponse:
+    """Get a single journal trade."""
+    trade = await service.get_trade(current_user["user_id"], trade_id)
+    return TradeResponse.model_validate(trade)
+
+
+@router.patch("/trades/{trade_id}", response_model=TradeResponse)
+async def update_trade(
+    trade_id: uuid.UUID,
+    data: TradeUpdate,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+) -> TradeResponse:
+    """Edit a journal trade."""
+    trade = await service.update_trade(current_user["user_id"], trade_id, data)
+    return TradeResponse.model_validate(trade)
+
+
+@router.delete("/trades/{trade_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_trade(
+    trade_id: uuid.UUID,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+) -> Response:
+    """Delete a journal trade."""
+    await service.delete_trade(current_user["user_id"], trade_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get("/analytics", response_model=AnalyticsResponse)
+async def get_analytics(
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+) -> AnalyticsResponse:
+    """Journal performance dashboard, read from the maintained aggregates.
+
+    Time-of-day, weekday and session breakdowns use the UTC entry time.
+    """
+    rows, equity = await service.get_analytics(current_user["user_id"])
+
+    overall = None
+    breakdowns: dict[str, list[BucketStats]] = {name: [] for name in _BREAKDOWNS}
+    days = []
+    for row in rows:
+        stats = BucketStats(bucket=row.bucket, **summarize_bucket(row))
+        if row.dimension == "all":
+            overall = stats
+        elif row.dimension == "day":
+            days.append((row.bucket, row.sum_r))
+        elif row.dimension in breakdowns:
+            breakdowns[row.dimension].append(stats)
+
+    for name, buckets in breakdowns.items():
+        if name in ("hour", "weekday"):
+            buckets.sort(key=lambda b: int(b.bucket))
+        else:
+            buckets.sort(key=lambda b: b.trades, reverse=True)
+
+    curve, cumulative = [], 0.0
+    for day, r in sorted(days):
+        cumulative += r
+        curve.append(EquityPoint(day=day, r=round(r, 4), cumulative_r=round(cumulative, 4)))
+
+    return AnalyticsResponse(
+        overall=overall,
+        equity=EquitySummary(
+            closed_trades=equity.closed_trades,
+            equity_r=round(equity.equity_r, 4),
+            max_drawdown_r=round(equity.max_drawdown_r, 4),
+            current_streak=equity.current_streak,
+            max_win_streak=equity.max_win_streak,
+            max_loss_streak=equity.max_loss_streak,
+        ),
+        breakdowns=breakdowns,
+        equity_curve=curve,
+    )
+
+
+@router.get("/analytics/monte-carlo", response_model=MonteCarloResponse)
+async def monte_carlo(
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+    simulations: Annotated[
+        int, Query(ge=100, le=settings.JOURNAL_MONTE_CARLO_MAX_SIMULATIONS)
+    ] = 10_000,
+    method: Annotated[ResampleMethod, Query()] = "bootstrap",
+    strategy: Annotated[str | None, Query()] = None,
+    seed: Annotated[int | None, Query(ge=0)] = None,
+) -> MonteCarloResponse:
+    """Drawdown, streak and terminal-equity percentiles over resampled sequences.
+
+    `bootstrap` draws trades with replacement; `permutation` shuffles the
+    actual trades. Pass `seed` for reproducible results.
+    """
+    try:
+        result = await service.monte_carlo(
+            current_user["user_id"], simulations, method, strategy, seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return MonteCarloResponse(**result)
+
+
+@router.post("/analytics/rebuild", response_model=RebuildResponse)
+async def rebuild_analytics(
+    current_user: Annotated[dict, Depends(get_current_user)],
+    service: Annotated[JournalService, Depends(get_journal_service)],
+) -> RebuildResponse:
+    """Recompute analytics from the full journal, reporting any drift."""
+    return RebuildResponse(**await service.rebuild(current_user["user_id"]))
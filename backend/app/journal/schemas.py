@@ -0,0 +1,185 @@
+import uuid
+from datetime import datetime
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.backtest.schemas import Direction
+from app.market_data.schemas import parse_interval
+
+Tag = Annotated[str, Field(min_length=1, max_length=50)]
+TradeOutcome = Literal["win", "loss", "breakeven", "open"]
+ResampleMethod = Literal["bootstrap", "permutation"]
+
+
+class TradeCreate(BaseModel):
+    """Request schema for recording a trade in the journal.
+
+    Outcome, exit and P&L are evaluated from historical candles.
+    """
+
+    symbol: str = Field(min_length=1, max_length=30)
+    interval: str = Field(min_length=1, max_length=10)
+    direction: Direction
+    entry_time: int
+    entry_price: float = Field(gt=0)
+    stop_loss: float | None = Field(default=None, gt=0)
+    take_profit: float | None = Field(default=None, gt=0)
+    strategy: str | None = Field(default=None, max_length=100)
+    tags: list[Tag] = Field(default=[], max_length=20)
+    comment: str | None = Field(default=None, max_length=10_000)
+
+    @field_validator("interval")
+    @classmethod
+    def validate_interval(cls, v: str) -> str:
+        parse_interval(v)
+        return v
+
+
+class TradeUpdate(BaseModel):
+    """Request schema for editing a journal trade; omitted fields are kept.
+
+    Changing the entry, stop or target re-evaluates the outcome.
+    """
+
+    symbol: str | None = Field(default=None, min_length=1, max_length=30)
+    interval: str | None = Field(default=None, min_length=1, max_length=10)
+    direction: Direction | None = None
+    entry_time: int | None = None
+    entry_price: float | None = Field(default=None, gt=0)
+    stop_loss: float | None = Field(default=None, gt=0)
+    take_profit: float | None = Field(default=None, gt=0)
+    strategy: str | None = Field(default=None, max_length=100)
+    tags: list[Tag] | None = Field(default=None, max_length=20)
+    comment: str | None = Field(default=None, max_length=10_000)
+
+    @field_validator("symbol", "interval", "direction", "entry_time", "entry_price")
+    @classmethod
+    def validate_not_null(cls, v: object) -> object:
+        # Only stop_loss, take_profit, strategy, comment (and tags) can be cleared.
+        if v is None:
+            raise ValueError("cannot be null; omit the field to keep it")
+        return v
+
+    @field_validator("interval")
+    @classmethod
+    def validate_interval(cls, v: str | None) -> str | None:
+        if v is not None:
+            parse_interval(v)
+        return v
+
+
+class TradeResponse(BaseModel):
+    """Response schema for a journal trade."""
+
+    id: uuid.UUID
+    symbol: str
+    interval: str
+    direction: Direction
+    entry_time: int
+    entry_price: float
+    stop_loss: float | None
+    take_profit: float | None
+    outcome: TradeOutcome
+    exit_time: int | None
+    exit_price: float | None
+    pnl: float | None
+    r_multiple: float | None
+    strategy: str | None
+    tags: list[str]
+    comment: str | None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class BucketStats(BaseModel):
+    """Statistics of closed trades in one analytics bucket."""
+
+    bucket: str
+    trades: int
+    wins: int
+    losses: int
+    breakevens: int
+    win_rate: float | None
+    expectancy_r: float | None
+    total_r: float
+    total_pnl: float  # price units; only meaningful within one symbol
+    profit_factor: float | None
+    avg_win_r: float | None
+    avg_loss_r: float | None
+    planned_rr: float | None  # mean planned reward:risk
+
+
+class EquitySummary(BaseModel):
+    """Sequence statistics of closed trades in entry order, in R."""
+
+    closed_trades: int
+    equity_r: float
+    max_drawdown_r: float
+    current_streak: int  # > 0: consecutive wins, < 0: consecutive losses
+    max_win_streak: int
+    max_loss_streak: int
+
+
+class EquityPoint(BaseModel):
+    """Daily point of the equity curve (UTC day of entry)."""
+
+    day: str
+    r: float
+    cumulative_r: float
+
+
+class AnalyticsResponse(BaseModel):
+    """Response schema for the journal analytics dashboard."""
+
+    overall: BucketStats | None
+    equity: EquitySummary
+    # dimension -> buckets: strategy, symbol, tag, hour, weekday, session
+    breakdowns: dict[str, list[BucketStats]]
+    equity_curve: list[EquityPoint]
+
+
+class RebuildResponse(BaseModel):
+    """Result of rebuilding analytics from the full journal."""
+
+    trades: int
+    settled: int  # open trades closed by re-evaluating them
+    buckets: int
+    mismatched_buckets: int  # stored buckets that differed from the rebuild
+    equity_mismatch: bool
+
+
+class Distribution(BaseModel):
+    """Percentiles and mean of one statistic across simulated paths."""
+
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+    mean: float
+
+
+class PathStats(BaseModel):
+    """Statistics of the actual trade sequence, for comparison."""
+
+    max_drawdown_r: float
+    terminal_r: float
+    max_win_streak: int
+    max_loss_streak: int
+
+
+class MonteCarloResponse(BaseModel):
+    """Distributions of path statistics over resampled trade sequences, in R."""
+
+    method: ResampleMethod
+    simulations: int
+    trades: int
+    max_drawdown_r: Distribution
+    terminal_r: Distribution
+    max_win_streak: Distribution
+    max_loss_streak: Distribution
+    probability_of_loss: float  # share of paths ending below 0 R
+    historical: PathStats
@@ -0,0 +1,462 @@
+import asyncio
+import math
+import time as _time
+import uuid
+
+import httpx
+import numpy as np
+import structlog
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.backtest.schemas import TradeInput
+from app.backtest.service import BacktestService, horizon_seconds
+from app.common.exceptions import NotFoundError
+from app.journal import analytics, montecarlo
+from app.journal.models import JournalAggregate, JournalEquity, Trade
+from app.journal.schemas import TradeCreate, TradeUpdate
+from app.market_data.schemas import interval_seconds
+
+logger = structlog.get_logger()
+
+# Fields whose change requires evaluating the trade again.
+_EVALUATED_FIELDS = {
+    "symbol",
+    "interval",
+    "direction",
+    "entry_time",
+    "entry_price",
+    "stop_loss",
+    "take_profit",
+}
+
+# Tolerance when comparing stored aggregates with a rebuild.
+_REL_TOLERANCE = 1e-9
+
+# Candles after the entry within which a stop or target must be hit.
+EVALUATION_CANDLES = 5000
+
+# Open trades re-evaluated per analytics read at most (oldest entries first).
+MAX_SETTLE_TRADES = 200
+
+
+class JournalService:
+    """Service for journal trade CRUD and incrementally maintained analytics."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # --- trades ---------------------------------------------------------------
+
+    async def _get_trade_owned_by(self, trade_id: uuid.UUID, user_id: str) -> Trade:
+        """Get a trade by ID, verifying ownership. Raises 404 if not found or not owned."""
+        result = await self.db.execute(
+            select(Trade).where(
+                Trade.id == trade_id,
+                Trade.user_id == uuid.UUID(user_id),
+            )
+        )
+        trade = result.scalar_one_or_none()
+        if not trade:
+            raise NotFoundError("Trade not found")
+        return trade
+
+    async def get_trade(self, user_id: str, trade_id: uuid.UUID) -> Trade:
+        return await self._get_trade_owned_by(trade_id, user_id)
+
+    async def list_trades(
+        self,
+        user_id: str,
+        symbol: str | None = None,
+        strategy: str | None = None,
+        outcome: str | None = None,
+        tag: str | None = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> list[Trade]:
+        """List a user's trades, newest entry first, with optional filters."""
+        query = select(Trade).where(Trade.user_id == uuid.UUID(user_id))
+        if symbol is not None:
+            query = query.where(Trade.symbol == symbol)
+        if strategy is not None:
+            query = query.where(Trade.strategy == strategy)
+        if outcome is not None:
+            query = query.where(Trade.outcome == outcome)
+        if tag is not None:
+            query = query.where(Trade.tags.any(tag))
+        query = query.order_by(Trade.entry_time.desc()).limit(limit).offset(offset)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def create_trade(self, user_id: str, data: TradeCreate) -> Trade:
+        """Record a trade, evaluate it and add it to the analytics."""
+        trade = Trade(user_id=uuid.UUID(user_id), **data.model_dump())
+        await self._evaluate(trade)
+        self.db.add(trade)
+        await self.db.flush()
+        await self.db.refresh(trade)
+        await self._apply(trade.user_id, None, analytics.TradeFacts.of(trade))
+        return trade
+
+    async def update_trade(
+        self, user_id: str, trade_id: uuid.UUID, data: TradeUpdate
+    ) -> Trade:
+        """Edit a trade; analytics move its old contribution to the new one."""
+        trade = await self._get_trade_owned_by(trade_id, user_id)
+        before = analytics.TradeFacts.of(trade)
+        changes = data.model_dump(exclude_unset=True)
+        for field, value in changes.items():
+            setattr(trade, field, [] if field == "tags" and value is None else value)
+        if _EVALUATED_FIELDS & changes.keys():
+            await self._evaluate(trade)
+        await self.db.flush()
+        await self.db.refresh(trade)
+        await self._apply(trade.user_id, before, analytics.TradeFacts.of(trade))
+        return trade
+
+    async def delete_trade(self, user_id: str, trade_id: uuid.UUID) -> None:
+        """Delete a trade and remove it from the analytics."""
+        trade = await self._get_trade_owned_by(trade_id, user_id)
+        before = analytics.TradeFacts.of(trade)
+        await self.db.delete(trade)
+        await self.db.flush()
+        await self._apply(trade.user_id, before, None)
+
+    async def _evaluate(self, trade: Trade) -> None:
+        await self._evaluate_many([trade])
+
+    async def _evaluate_many(self, trades: list[Trade]) -> None:
+        """Fill outcome, exit and P&L from historical candles.
+
+        Trades are evaluated per (symbol, interval); if a group's candles
+        cannot be loaded its trades are kept as open.
+        """
+        now = int(_time.time())
+        groups: dict[tuple[str, str], list[Trade]] = {}
+        for trade in trades:
+            trade.outcome, trade.exit_time, trade.exit_price = "open", None, None
+            trade.pnl, trade.r_multiple = None, None
+            trade.evaluated_at = now
+            groups.setdefault((trade.symbol, trade.interval), []).append(trade)
+
+        for (symbol, _), group in groups.items():
+            try:
+                results, _ = await BacktestService(self.db).evaluate(
+                    [
+                        TradeInput(
+                            symbol=trade.symbol,
+                            interval=trade.interval,
+                            entry_time=trade.entry_time,
+                            entry_price=trade.entry_price,
+                            direction=trade.direction,
+                            stop_loss=trade.stop_loss,
+                            take_profit=trade.take_profit,
+                        )
+                        for trade in group
+                    ],
+                    max_candles=EVALUATION_CANDLES,
+                )
+            except (ValueError, httpx.HTTPError) as e:
+                logger.warning("trade_evaluation_failed", symbol=symbol, error=str(e))
+                continue
+            for trade, result in zip(group, results):
+                trade.outcome = result.outcome
+                trade.exit_time = result.exit_time
+                trade.exit_price = result.exit_price
+                trade.pnl = result.pnl
+                trade.r_multiple = result.r_multiple
+
+    async def _settle_open_trades(self, user_id: uuid.UUID, force: bool = False) -> int:
+        """Re-evaluate open trades whose candle window was still running.
+
+        An open trade with a stop or target is due once a new candle has
+        closed since its last evaluation, until it has been evaluated after
+        its window ended. `force` re-evaluates every open trade. Rows
+        locked by a concurrent settle are skipped. Returns the number of
+        trades that closed.
+        """
+        result = await self.db.execute(
+            select(Trade)
+            .where(
+                Trade.user_id == user_id,
+                Trade.outcome == "open",
+                or_(Trade.stop_loss.is_not(None), Trade.take_profit.is_not(None)),
+            )
+            .order_by(Trade.entry_time)
+            .with_for_update(skip_locked=True)
+        )
+        now = int(_time.time())
+        due = [t for t in result.scalars().all() if force or _evaluation_due(t, now)]
+        if not force:
+            due = due[:MAX_SETTLE_TRADES]
+        if not due:
+            return 0
+
+        before = [analytics.TradeFacts.of(t) for t in due]
+        await self._evaluate_many(due)
+        await self.db.flush()
+        for trade, facts in zip(due, before):
+            await self._apply(user_id, facts, analytics.TradeFacts.of(trade))
+        settled = sum(analytics.is_closed(t) for t in due)
+        logger.info(
+            "journal_open_trades_settled",
+            user_id=str(user_id),
+            evaluated=len(due),
+            settled=settled,
+        )
+        return settled
+
+    # --- incremental analytics ------------------------------------------------
+
+    async def _apply(
+        self,
+        user_id: uuid.UUID,
+        before: analytics.TradeFacts | None,
+        after: analytics.TradeFacts | None,
+    ) -> None:
+        """Move a trade's contribution from `before` to `after`."""
+        removed = [before] if before is not None else []
+        added = [after] if after is not None else []
+        net = analytics.deltas(removed, added)
+        if net:
+            rows = [
+                {"user_id": user_id, "dimension": dim, "bucket": bucket, **values}
+                for (dim, bucket), values in net.items()
+            ]
+            stmt = pg_insert(JournalAggregate).values(rows)
+            columns = JournalAggregate.__table__.c
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[columns.user_id, columns.dimension, columns.bucket],
+                set_={name: columns[name] + stmt.excluded[name] for name in analytics.COUNTERS},
+            )
+            await self.db.execute(stmt)
+
+        was_closed = before is not None and analytics.is_closed(before)
+        now_closed = after is not None and analytics.is_closed(after)
+        if not was_closed and not now_closed:
+            return
+        if was_closed and now_closed and _sequence_key(before) == _sequence_key(after):
+            # E.g. a comment or tag edit: the equity sequence is unchanged.
+            return
+
+        equity, created = await self._equity_row(user_id)
+        if created:
+            # Replayed from the journal, which already includes this change.
+            return
+        if (
+            not was_closed
+            and not equity.stale
+            and (equity.last_entry_time is None or after.entry_time >= equity.last_entry_time)
+        ):
+            state = analytics.advance(_equity_state(equity), after)
+            for name, value in state._asdict().items():
+                setattr(equity, name, value)
+        else:
+            # The change is not at the end of the sequence: replay on next read.
+            equity.stale = True
+        await self.db.flush()
+
+    async def _equity_row(self, user_id: uuid.UUID) -> tuple[JournalEquity, bool]:
+        """Lock the user's equity row, creating it by replay if missing.
+
+        Returns (row, created); a row inserted concurrently by another
+        request counts as existing.
+        """
+        locked = select(JournalEquity).where(JournalEquity.user_id == user_id).with_for_update()
+        equity = (await self.db.execute(locked)).scalar_one_or_none()
+        if equity is not None:
+            return equity, False
+        state = await self._replay_equity(user_id)
+        stmt = (
+            pg_insert(JournalEquity)
+            .values(user_id=user_id, stale=False, **state._asdict())
+            .on_conflict_do_nothing(index_elements=[JournalEquity.__table__.c.user_id])
+            .returning(JournalEquity.user_id)
+        )
+        created = (await self.db.execute(stmt)).scalar_one_or_none() is not None
+        equity = (await self.db.execute(locked)).scalar_one()
+        return equity, created
+
+    async def _closed_trades(self, user_id: uuid.UUID) -> list[Trade]:
+        result = await self.db.execute(
+            select(Trade)
+            .where(Trade.user_id == user_id, Trade.outcome.in_(analytics.CLOSED_OUTCOMES))
+            .order_by(Trade.entry_time, Trade.created_at)
+        )
+        return list(result.scalars().all())
+
+    async def _replay_equity(self, user_id: uuid.UUID) -> analytics.EquityState:
+        return analytics.replay(await self._closed_trades(user_id))
+
+    # --- reads ----------------------------------------------------------------
+
+    async def get_analytics(self, user_id: str) -> tuple[list[JournalAggregate], JournalEquity]:
+        """Aggregate rows and equity state; O(buckets) unless equity is stale.
+
+        Open trades that are due are re-evaluated first (see
+        _settle_open_trades).
+        """
+        uid = uuid.UUID(user_id)
+        await self._settle_open_trades(uid)
+        result = await self.db.execute(
+            select(JournalAggregate).where(
+                JournalAggregate.user_id == uid,
+                JournalAggregate.trades > 0,
+            )
+        )
+        rows = list(result.scalars().all())
+
+        equity, _ = await self._equity_row(uid)
+        if equity.stale:
+            state = await self._replay_equity(uid)
+            for name, value in state._asdict().items():
+                setattr(equity, name, value)
+            equity.stale = False
+            await self.db.flush()
+            logger.info("journal_equity_replayed", user_id=user_id, trades=state.closed_trades)
+        return rows, equity
+
+    async def monte_carlo(
+        self,
+        user_id: str,
+        simulations: int,
+        method: str,
+        strategy: str | None = None,
+        seed: int | None = None,
+    ) -> dict:
+        """Resample the closed-trade sequence; see app.journal.montecarlo.
+
+        Raises ValueError when there are no closed trades.
+        """
+        uid = uuid.UUID(user_id)
+        await self._settle_open_trades(uid)
+        trades = await self._closed_trades(uid)
+        if strategy is not None:
+            trades = [t for t in trades if (t.strategy or analytics.NO_STRATEGY) == strategy]
+        if not trades:
+            raise ValueError("No closed trades to resample")
+        # Breakevens count as exactly 0 R so they never extend a streak.
+        r = np.array(
+            [0.0 if t.outcome == "breakeven" else t.r_multiple or 0.0 for t in trades]
+        )
+
+        paths = await asyncio.to_thread(montecarlo.simulate, r, simulations, method, seed)
+        logger.info(
+            "journal_monte_carlo",
+            user_id=user_id,
+            trades=len(r),
+            simulations=simulations,
+            method=method,
+        )
+        return {
+            "method": method,
+            "simulations": simulations,
+            "trades": len(r),
+            **{name: montecarlo.distribution(values) for name, values in paths.items()},
+            "probability_of_loss": round(float((paths["terminal_r"] < 0).mean()), 4),
+            "historical": montecarlo.historical(r),
+        }
+
+    async def rebuild(self, user_id: str) -> dict:
+        """Recompute all analytics from the journal and report drift.
+
+        Every open trade is re-evaluated first. Stored buckets are compared
+        with the rebuild before being replaced.
+        """
+        uid = uuid.UUID(user_id)
+        settled = await self._settle_open_trades(uid, force=True)
+        trades = await self._closed_trades(uid)
+        rebuilt = analytics.deltas(added=trades)
+
+        result = await self.db.execute(
+            select(JournalAggregate).where(JournalAggregate.user_id == uid)
+        )
+        stored = {(row.dimension, row.bucket): row for row in result.scalars().all()}
+        keys = set(stored) | set(rebuilt)
+        mismatched = sum(
+            not _same_counters(stored.get(key), rebuilt.get(key)) for key in keys
+        )
+
+        equity_result = await self.db.execute(
+            select(JournalEquity).where(JournalEquity.user_id == uid).with_for_update()
+        )
+        equity = equity_result.scalar_one_or_none()
+        state = analytics.replay(trades)
+        equity_mismatch = (
+            equity is not None
+            and not equity.stale
+            and not all(
+                math.isclose(a, b, rel_tol=_REL_TOLERANCE, abs_tol=1e-9)
+                for a, b in zip(_equity_state(equity), state)
+                if a is not None and b is not None
+            )
+        )
+
+        await self.db.execute(delete(JournalAggregate).where(JournalAggregate.user_id == uid))
+        if rebuilt:
+            await self.db.execute(
+                pg_insert(JournalAggregate).values(
+                    [
+                        {"user_id": uid, "dimension": dim, "bucket": bucket, **values}
+                        for (dim, bucket), values in rebuilt.items()
+                    ]
+                )
+            )
+        if equity is None:
+            equity = JournalEquity(user_id=uid)
+            self.db.add(equity)
+        for name, value in state._asdict().items():
+            setattr(equity, name, value)
+        equity.stale = False
+        await self.db.flush()
+
+        logger.info(
+            "journal_analytics_rebuilt",
+            user_id=user_id,
+            trades=len(trades),
+            settled=settled,
+            buckets=len(rebuilt),
+            mismatched_buckets=mismatched,
+            equity_mismatch=equity_mismatch,
+        )
+        return {
+            "trades": len(trades),
+            "settled": settled,
+            "buckets": len(rebuilt),
+            "mismatched_buckets": mismatched,
+            "equity_mismatch": equity_mismatch,
+        }
+
+
+def _evaluation_due(trade: Trade, now: int) -> bool:
+    """True when an open trade may close if evaluated again now."""
+    if trade.evaluated_at is None:
+        return True
+    try:
+        window_end = trade.entry_time + horizon_seconds(
+            trade.symbol, trade.interval, EVALUATION_CANDLES
+        )
+        interval_sec = interval_seconds(trade.interval)
+    except ValueError:
+        return False  # stored before intervals were validated
+    return trade.evaluated_at <= window_end and now - trade.evaluated_at >= interval_sec
+
+
+def _sequence_key(trade: analytics.TradeFacts) -> tuple:
+    return trade.entry_time, trade.outcome, trade.r_multiple
+
+
+def _equity_state(equity: JournalEquity) -> analytics.EquityState:
+    return analytics.EquityState(
+        *(getattr(equity, name) for name in analytics.EquityState._fields)
+    )
+
+
+def _same_counters(stored: JournalAggregate | None, rebuilt: dict | None) -> bool:
+    for name in analytics.COUNTERS:
+        a = getattr(stored, name) if stored is not None else 0
+        b = rebuilt[name] if rebuilt is not None else 0
+        if not math.isclose(a, b, rel_tol=_REL_TOLERANCE, abs_tol=1e-9):
+            return False
+    return True
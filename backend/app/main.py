@@ -6,9 +6,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 
 from app.auth.router import router as auth_router
+from app.backtest.pool import shutdown_pool
+from app.backtest.router import router as backtest_router
 from app.common.exceptions import register_exception_handlers
+from app.journal.router import router as journal_router
+from app.market_data.prefetch import history_prefetcher
 from app.market_data.router import router as market_data_router
 from app.market_data.router import stream_manager
+from app.market_data.symbol_registry import symbol_registry
 from app.users.router import router as users_router
 from app.watchlists.router import router as watchlist_router
 from app.config import settings
@@ -29,13 +34,19 @@ async def lifespan(app: FastAPI):
 
     # Initialize stream manager lifecycle
     stream_manager._running = True
+    stream_manager.start_trade_ingest()
     logger.info("stream_manager_started")
+    symbol_registry.start()
 
     yield
 
     # Clean shutdown of upstream streams
+    await symbol_registry.stop()
     await stream_manager.shutdown()
     logger.info("stream_manager_stopped")
+    await history_prefetcher.stop()
+
+    shutdown_pool()
 
     await engine.dispose()
     logger.info("database_engine_disposed")
@@ -64,6 +75,8 @@ app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(watchlist_router)
 app.include_router(market_data_router)
+app.include_router(backtest_router)
+app.include_router(journal_router)
 
 
 @app.get("/api/v1/health")
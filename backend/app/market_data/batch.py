@@ -0,0 +1,123 @@
+"""Columnar OHLCV candle batch backed by NumPy arrays."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from app.market_data.schemas import OHLCVCandle
+
+# Column names in on-disk / on-wire order. `time` is int64 Unix seconds,
+# every other column is float64.
+COLUMNS: tuple[str, ...] = ("time", "open", "high", "low", "close", "volume")
+
+
+class CandleBatch:
+    """A chronologically ordered run of candles stored column-wise.
+
+    Each column is a 1-D NumPy array of equal length. Arrays may be views
+    into a memory-mapped file (see ColdStore), so slicing a batch never
+    copies candle data.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(
+        self,
+        time: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+    ) -> None:
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def empty(cls) -> CandleBatch:
+        """Return a batch with zero candles."""
+        return cls(
+            np.empty(0, dtype=np.int64),
+            *(np.empty(0, dtype=np.float64) for _ in range(5)),
+        )
+
+    @classmethod
+    def from_candles(cls, candles: list[OHLCVCandle]) -> CandleBatch:
+        """Build a batch from a list of OHLCVCandle models."""
+        if not candles:
+            return cls.empty()
+        return cls(
+            np.fromiter((c.time for c in candles), dtype=np.int64, count=len(candles)),
+            np.fromiter((c.open for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.high for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.low for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.close for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.volume for c in candles), dtype=np.float64, count=len(candles)),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple]) -> CandleBatch:
+        """Build a batch from (time, open, high, low, close, volume) row tuples."""
+        if not rows:
+            return cls.empty()
+        table = np.array(rows, dtype=np.float64)
+        return cls(
+            np.array([r[0] for r in rows], dtype=np.int64),
+            table[:, 1].copy(),
+            table[:, 2].copy(),
+            table[:, 3].copy(),
+            table[:, 4].copy(),
+            table[:, 5].copy(),
+        )
+
+    @classmethod
+    def concat(cls, batches: list[CandleBatch]) -> CandleBatch:
+        """Concatenate batches in the given order (copies data)."""
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(*(np.concatenate([getattr(b, c) for b in batches]) for c in COLUMNS))
+
+    def __len__(self) -> int:
+        return int(self.time.shape[0])
+
+    def __getitem__(self, index: slice) -> CandleBatch:
+        """Slice every column; basic slices return views, not copies."""
+        return CandleBatch(*(getattr(self, c)[index] for c in COLUMNS))
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes held by the columns; memory-mapped columns count as 0."""
+        return sum(
+            0 if isinstance(a, np.memmap) else a.nbytes for a in self.columns()
+        )
+
+    def columns(self) -> tuple[np.ndarray, ...]:
+        """Return the column arrays in COLUMNS order."""
+        return tuple(getattr(self, c) for c in COLUMNS)
+
+    def between(self, start_time: int | None, end_time: int | None) -> CandleBatch:
+        """Return the view of candles with start_time <= time <= end_time."""
+        lo = 0 if start_time is None else int(np.searchsorted(self.time, start_time, "left"))
+        hi = len(self) if end_time is None else int(np.searchsorted(self.time, end_time, "right"))
+        return self[lo:hi]
+
+    def to_candles(self) -> list[OHLCVCandle]:
+        """Materialize OHLCVCandle models (only needed for the JSON object format)."""
+        return [
+            OHLCVCandle(time=t, open=o, high=h, low=lo, close=c, volume=v)
+            for t, o, h, lo, c, v in zip(
+                self.time.tolist(),
+                self.open.tolist(),
+                self.high.tolist(),
+                self.low.tolist(),
+                self.close.tolist(),
+                self.volume.tolist(),
+            )
+        ]
@@ -0,0 +1,303 @@
+"""Shared live indicator, chart-transform and level channels on the market-data WebSocket.
+
+A channel is one indicator or transform configuration on one stream, e.g.
+RSI(14) or Renko(10) on BTCUSDT@1m. However many clients subscribe to it,
+the server keeps a single incremental state per channel, evaluates it once
+per upstream tick and sends the same IndicatorUpdate / TransformUpdate
+payload to every subscriber. Channels are reference counted by their
+subscriber sets and dropped with the last one, mirroring how
+ConnectionManager tracks stream keys.
+
+The higher-timeframe levels channel (levels.py) is per symbol rather than
+per stream: it always follows the symbol's 1m stream, so charts of any
+interval share one state, and it sends LevelsUpdate only when a level
+changes.
+"""
+
+from abc import ABC, abstractmethod
+
+import structlog
+from fastapi import WebSocket
+
+from app.database import async_session
+from app.market_data.indicators import IndicatorState, create_state, warmup_candles
+from app.market_data.levels import LEVEL_TIMEFRAMES, SOURCE_INTERVAL, LevelsState
+from app.market_data.resample import current_bucket_start
+from app.market_data.schemas import (
+    IndicatorUpdate,
+    LevelsUpdate,
+    OHLCVCandle,
+    PriceUpdate,
+    TransformUpdate,
+)
+from app.market_data.service import MarketDataService
+from app.market_data.transforms import TransformState, create_transform_state, seed_candles
+
+logger = structlog.get_logger()
+
+
+def channel_id(name: str, params: dict) -> str:
+    """Canonical channel name, e.g. "ema:period=200,source=close"."""
+    return f"{name}:" + ",".join(f"{k}={params[k]}" for k in sorted(params))
+
+
+class _Channel(ABC):
+    """One configuration on one symbol@interval stream (params resolved).
+
+    Subclasses set `state` and implement `load` and `message`.
+    """
+
+    state: IndicatorState | TransformState | LevelsState
+
+    def __init__(self, symbol: str, interval: str, name: str, params: dict) -> None:
+        self.symbol = symbol
+        self.interval = interval
+        self.name = name
+        self.params = params
+        self.id = channel_id(name, params)
+        self.subscribers: set[WebSocket] = set()
+        # Closed candles that arrive while the warm-up is loading; replayed
+        # on top of the warm-up once it is in.
+        self.ready = False
+        self.pending: list[OHLCVCandle] = []
+        # Set while `message` raises, so subscribers are told only once.
+        self.failing = False
+
+    @property
+    def stream_key(self) -> str:
+        return f"{self.symbol}@{self.interval}"
+
+    @property
+    def key(self) -> str:
+        return f"{self.stream_key}|{self.id}"
+
+    @abstractmethod
+    async def load(self, service: MarketDataService, forming_time: int) -> None:
+        """Seed the state from history ahead of `forming_time`."""
+
+    @abstractmethod
+    def message(self, update: PriceUpdate) -> dict | None:
+        """Advance the state by one tick; None if there is nothing to send."""
+
+    def snapshot(self) -> dict | None:
+        """Current payload for a client joining a live channel, if any."""
+        return None
+
+
+class _WarmupChannel(_Channel):
+    """A channel seeded from the stream's own closed candles.
+
+    Subclasses implement `warmup` and `message`.
+    """
+
+    @abstractmethod
+    def warmup(self, forming_time: int) -> int:
+        """Closed candles to load before `forming_time` to seed the state."""
+
+    async def load(self, service: MarketDataService, forming_time: int) -> None:
+        count = self.warmup(forming_time)
+        warm = await service.get_warmup(self.symbol, self.interval, forming_time, count)
+        self.state.seed(warm)
+
+
+class IndicatorChannel(_WarmupChannel):
+    """One indicator configuration on one stream."""
+
+    def __init__(self, symbol: str, interval: str, name: str, params: dict) -> None:
+        super().__init__(symbol, interval, name, params)
+        self.state: IndicatorState = create_state(name, params)
+
+    def warmup(self, forming_time: int) -> int:
+        return warmup_candles(self.name, self.params, self.interval, forming_time)
+
+    def message(self, update: PriceUpdate) -> dict | None:
+        values = self.state.update(update.candle, update.is_closed)
+        if values is None:
+            return None
+        return IndicatorUpdate(
+            symbol=update.symbol,
+            interval=update.interval,
+            channel=self.id,
+            time=update.candle.time,
+            values=values,
+            is_closed=update.is_closed,
+        ).model_dump()
+
+
+class TransformChannel(_WarmupChannel):
+    """One chart transform (Heikin-Ashi, Renko, range bars) on one stream."""
+
+    def __init__(self, symbol: str, interval: str, name: str, params: dict) -> None:
+        super().__init__(symbol, interval, name, params)
+        self.state: TransformState = create_transform_state(name, params)
+
+    def warmup(self, forming_time: int) -> int:
+        return seed_candles(self.name, self.interval, forming_time)
+
+    def message(self, update: PriceUpdate) -> dict | None:
+        result = self.state.update(update.candle, update.is_closed)
+        if result is None:
+            return None
+        candles, forming = result
+        return TransformUpdate(
+            symbol=update.symbol,
+            interval=update.interval,
+            channel=self.id,
+            candles=candles,
+            forming=forming,
+            is_closed=update.is_closed,
+        ).model_dump()
+
+
+class LevelsChannel(_Channel):
+    """Higher-timeframe levels of one symbol, on its 1m stream."""
+
+    def __init__(self, symbol: str) -> None:
+        super().__init__(symbol, SOURCE_INTERVAL, "levels", {})
+        self.id = "levels"
+        self.state: LevelsState = LevelsState()
+
+    async def load(self, service: MarketDataService, forming_time: int) -> None:
+        for timeframe in LEVEL_TIMEFRAMES:
+            # The latest two candles: the previous closed one and the forming one.
+            batch = await service.get_historical_batch(self.symbol, timeframe, limit=2)
+            self.state.seed(timeframe, batch, current_bucket_start(timeframe))
+
+    def message(self, update: PriceUpdate) -> dict | None:
+        self.state.update(update.candle, update.is_closed)
+        if not self.state.changed:
+            return None
+        self.state.changed = False
+        return self.snapshot()
+
+    def snapshot(self) -> dict | None:
+        return LevelsUpdate(symbol=self.symbol, levels=self.state.levels()).model_dump()
+
+
+class ChannelManager:
+    """Track live channels and the WebSockets subscribed to them.
+
+    Maintains three maps:
+    - _channels: channel key -> IndicatorChannel / TransformChannel / LevelsChannel
+    - _by_stream: stream key ("symbol@interval") -> channel keys
+    - _connections: WebSocket -> channel keys
+    """
+
+    def __init__(self) -> None:
+        self._channels: dict[str, _Channel] = {}
+        self._by_stream: dict[str, set[str]] = {}
+        self._connections: dict[WebSocket, set[str]] = {}
+
+    def subscribe(self, ws: WebSocket, channel: _Channel) -> tuple[_Channel, bool]:
+        """Subscribe a client to `channel`, or to the live one with its key.
+
+        Returns (channel, is_new); a new channel still needs seeding.
+        """
+        existing = self._channels.get(channel.key)
+        is_new = existing is None
+        if is_new:
+            self._channels[channel.key] = channel
+            self._by_stream.setdefault(channel.stream_key, set()).add(channel.key)
+        else:
+            channel = existing
+
+        channel.subscribers.add(ws)
+        self._connections.setdefault(ws, set()).add(channel.key)
+        logger.info(
+            "channel_subscribed",
+            key=channel.key,
+            is_new=is_new,
+            subscribers=len(channel.subscribers),
+        )
+        return channel, is_new
+
+    def unsubscribe(self, ws: WebSocket, key: str) -> None:
+        """Unsubscribe a client from the channel with `key`."""
+        keys = self._connections.get(ws)
+        if keys is not None:
+            keys.discard(key)
+        self._release(ws, key)
+
+    def disconnect(self, ws: WebSocket) -> set[str]:
+        """Drop every channel subscription of a client.
+
+        Returns the stream keys the client had channels on, so the caller
+        can release upstream streams that no longer have any subscribers.
+        """
+        keys = self._connections.pop(ws, set())
+        stream_keys = set()
+        for key in keys:
+            channel = self._channels.get(key)
+            if channel is not None:
+                stream_keys.add(channel.stream_key)
+            self._release(ws, key)
+        return stream_keys
+
+    def _release(self, ws: WebSocket, key: str) -> None:
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        channel.subscribers.discard(ws)
+        if channel.subscribers:
+            return
+        del self._channels[key]
+        stream_channels = self._by_stream.get(channel.stream_key)
+        if stream_channels is not None:
+            stream_channels.discard(key)
+            if not stream_channels:
+                del self._by_stream[channel.stream_key]
+        logger.info("channel_closed", key=key)
+
+    def has_subscribers(self, stream_key: str) -> bool:
+        """True if any channel on the stream still has a subscriber."""
+        return bool(self._by_stream.get(stream_key))
+
+    def evaluate(self, stream_key: str, update: PriceUpdate) -> list[tuple[list[WebSocket], dict]]:
+        """Advance every channel on a stream by one tick.
+
+        Returns (subscribers, payload) pairs; each channel is evaluated and
+        serialized once regardless of its subscriber count. A channel that
+        fails only affects its own subscribers, who get one error message
+        until it recovers; the stream's other messages still go out.
+        """
+        messages = []
+        for key in list(self._by_stream.get(stream_key, ())):
+            channel = self._channels[key]
+            if not channel.ready:
+                if update.is_closed:
+                    channel.pending.append(update.candle)
+                continue
+            try:
+                payload = channel.message(update)
+            except Exception as e:
+                if not channel.failing:
+                    channel.failing = True
+                    logger.warning("channel_update_failed", key=key, error=str(e))
+                    error = {"error": "Channel update failed", "detail": str(e), "channel": channel.id}
+                    messages.append((list(channel.subscribers), error))
+                continue
+            channel.failing = False
+            if payload is not None:
+                messages.append((list(channel.subscribers), payload))
+        return messages
+
+
+async def seed_channel(channel: _Channel) -> None:
+    """Load the channel's warm-up history and mark it ready.
+
+    On failure the channel is still marked ready and simply warms up from
+    live candles.
+    """
+    forming = current_bucket_start(channel.interval)
+    try:
+        async with async_session() as session:
+            await channel.load(MarketDataService(session), forming)
+            await session.commit()
+    except Exception as e:
+        logger.warning("channel_seed_failed", key=channel.key, error=str(e))
+
+    for candle in channel.pending:
+        channel.state.update(candle, is_closed=True)
+    channel.pending.clear()
+    channel.ready = True
+    logger.info("channel_ready", key=channel.key, last_time=channel.state.last_time)
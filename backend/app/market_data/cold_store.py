@@ -0,0 +1,287 @@
+"""Append-only, memory-mapped columnar store for closed candle history.
+
+Layout on disk, one directory per (symbol, interval):
+
+    {COLD_STORE_DIR}/{symbol}/{interval}/time.bin    int64  Unix seconds
+                                        /open.bin    float64
+                                        /high.bin    float64
+                                        /low.bin     float64
+                                        /close.bin   float64
+                                        /volume.bin  float64
+                                        /index.bin   int64  time of every
+                                                     _INDEX_STRIDE-th row
+
+Every column file is a flat little-endian array, so row N lives at byte
+offset N * 8 in each file. Files are only ever appended to. The row count
+is derived from the shortest column file, which makes a crash between
+column writes self-healing: the partially written tail is ignored and
+truncated on the next append.
+
+Reads return CandleBatch views straight into np.memmap arrays, so slicing
+a multi-year range costs a couple of binary searches and no copies.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.market_data.batch import COLUMNS, CandleBatch
+
+logger = structlog.get_logger()
+
+# Store the time of every Nth row in index.bin. A lookup binary-searches the
+# small in-memory index first and then a single stride of the time column,
+# so only one or two pages of the mapped time file are touched per lookup.
+_INDEX_STRIDE = 4096
+
+_DTYPES: dict[str, np.dtype] = {
+    c: np.dtype("<i8") if c == "time" else np.dtype("<f8") for c in COLUMNS
+}
+
+
+def symbol_dir_name(symbol: str) -> str:
+    """Make a symbol usable as a directory name: "EUR/USD" -> "EUR_USD"."""
+    return symbol.replace("/", "_")
+
+
+def _interval_dir_name(interval: str) -> str:
+    """Make an interval usable as a directory name.
+
+    "1M" (month) -> "1mo" so it cannot collide with "1m" (minute) on
+    case-insensitive filesystems.
+    """
+    return interval[:-1] + "mo" if interval.endswith("M") else interval
+
+
+class _ColdSeries:
+    """Open handle on one (symbol, interval) series."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = 0
+        self.index = np.empty(0, dtype=np.int64)
+        self.maps: tuple[np.ndarray, ...] | None = None
+        self._load()
+
+    def _load(self) -> None:
+        sizes = []
+        for c in COLUMNS:
+            f = self.path / f"{c}.bin"
+            sizes.append(f.stat().st_size // 8 if f.exists() else 0)
+        self.count = min(sizes)
+
+        index_file = self.path / "index.bin"
+        if index_file.exists():
+            index = np.fromfile(index_file, dtype=_DTYPES["time"])
+            expected = (self.count + _INDEX_STRIDE - 1) // _INDEX_STRIDE
+            self.index = index[:expected].astype(np.int64)
+        self._remap()
+
+    def _remap(self) -> None:
+        if self.count == 0:
+            self.maps = None
+            return
+        self.maps = tuple(
+            np.memmap(self.path / f"{c}.bin", dtype=_DTYPES[c], mode="r", shape=(self.count,))
+            for c in COLUMNS
+        )
+
+    @property
+    def first_time(self) -> int | None:
+        return int(self.maps[0][0]) if self.maps is not None else None
+
+    @property
+    def last_time(self) -> int | None:
+        return int(self.maps[0][self.count - 1]) if self.maps is not None else None
+
+    def offset_of(self, ts: int, side: str) -> int:
+        """Return the row offset of `ts` (np.searchsorted semantics)."""
+        if self.maps is None:
+            return 0
+        block = max(int(np.searchsorted(self.index, ts, "right")) - 1, 0)
+        lo = block * _INDEX_STRIDE
+        hi = min(lo + _INDEX_STRIDE, self.count)
+        # `side="right"` may legitimately land at the start of the next block.
+        return lo + int(np.searchsorted(self.maps[0][lo:hi], ts, side))
+
+    def batch(self, lo: int, hi: int) -> CandleBatch:
+        assert self.maps is not None
+        return CandleBatch(*(m[lo:hi] for m in self.maps))
+
+    def append(self, batch: CandleBatch) -> None:
+        """Append rows to every column file, then extend the index."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        for c in COLUMNS:
+            f = self.path / f"{c}.bin"
+            with open(f, "ab") as fh:
+                # Drop any torn tail left by an interrupted previous append.
+                fh.truncate(self.count * 8)
+                fh.write(np.ascontiguousarray(getattr(batch, c), dtype=_DTYPES[c]).tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+
+        old_count = self.count
+        self.count += len(batch)
+
+        first_stride = (old_count + _INDEX_STRIDE - 1) // _INDEX_STRIDE
+        offsets = np.arange(first_stride * _INDEX_STRIDE, self.count, _INDEX_STRIDE)
+        if offsets.size:
+            new_entries = batch.time[offsets - old_count].astype(_DTYPES["time"])
+            with open(self.path / "index.bin", "ab") as fh:
+                fh.truncate(first_stride * 8)
+                fh.write(new_entries.tobytes())
+            self.index = np.concatenate([self.index[:first_stride], new_entries.astype(np.int64)])
+
+        self._remap()
+
+
+class ColdStore:
+    """Cold tier for long-range closed candle history.
+
+    Writers append closed candles via `append`; readers call `read_range`,
+    which answers only when the requested range is fully covered and
+    returns None otherwise so the caller can fall back to SQL.
+    """
+
+    def __init__(self, root: str) -> None:
+        self._root = Path(root)
+        self._series: dict[tuple[str, str], _ColdSeries] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, symbol: str, interval: str) -> _ColdSeries:
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            series = _ColdSeries(self._root / symbol_dir_name(symbol) / _interval_dir_name(interval))
+            self._series[key] = series
+        return series
+
+    def coverage(self, symbol: str, interval: str) -> tuple[int, int] | None:
+        """Return (first_time, last_time) stored for the series, or None if empty."""
+        series = self._get(symbol, interval)
+        if series.maps is None:
+            return None
+        return series.first_time, series.last_time
+
+    def read_range(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int | None,
+        limit: int,
+    ) -> CandleBatch | None:
+        """Return up to `limit` candles from start_time onwards, or None on a miss.
+
+        A hit requires the store to begin at or before start_time and to hold
+        either `limit` rows from there or everything up to end_time.
+        """
+        series = self._get(symbol, interval)
+        if series.maps is None or series.first_time > start_time:
+            return None
+
+        lo = series.offset_of(start_time, "left")
+        if end_time is not None and end_time <= series.last_time:
+            hi = series.offset_of(end_time, "right")
+        else:
+            hi = series.count
+            if hi - lo < limit:
+                return None
+        return series.batch(lo, min(hi, lo + limit))
+
+    def read_span(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+    ) -> CandleBatch | None:
+        """Return whatever part of [start_time, end_time] is stored, or None.
+
+        Unlike read_range this accepts partial coverage; callers use the
+        returned batch's first/last time to fetch the rest elsewhere.
+        """
+        series = self._get(symbol, interval)
+        if series.maps is None:
+            return None
+        lo = series.offset_of(start_time, "left")
+        hi = series.offset_of(end_time, "right")
+        if lo >= hi:
+            return None
+        return series.batch(lo, hi)
+
+    def read_before(
+        self,
+        symbol: str,
+        interval: str,
+        end_time: int,
+        count: int,
+    ) -> CandleBatch | None:
+        """Return the last `count` candles at or before end_time, or None on a miss."""
+        series = self._get(symbol, interval)
+        if series.maps is None or end_time > series.last_time:
+            return None
+        hi = series.offset_of(end_time, "right")
+        if hi < count:
+            return None
+        return series.batch(hi - count, hi)
+
+    def append(
+        self,
+        symbol: str,
+        interval: str,
+        batch: CandleBatch,
+        max_gap: int,
+    ) -> int:
+        """Append closed candles that are newer than the stored tail.
+
+        Rows at or before the current tail are dropped. The remaining rows are
+        only accepted when they continue the series: either the batch overlaps
+        the stored tail, or its first new row is within `max_gap` seconds of
+        it. Otherwise a hole would silently appear in range reads, so the
+        batch is rejected until a gap-filling batch arrives.
+
+        Blocking file I/O; call via asyncio.to_thread from async code.
+        Returns the number of rows appended.
+        """
+        if not len(batch):
+            return 0
+
+        with self._lock:
+            series = self._get(symbol, interval)
+            last_time = series.last_time
+            if last_time is not None:
+                cut = int(np.searchsorted(batch.time, last_time, "right"))
+                overlaps = cut > 0 and batch.time[cut - 1] == last_time
+                batch = batch[cut:]
+                if not len(batch):
+                    return 0
+                if not overlaps and int(batch.time[0]) - last_time > max_gap:
+                    logger.info(
+                        "cold_store_gap_rejected",
+                        symbol=symbol,
+                        interval=interval,
+                        last_time=last_time,
+                        next_time=int(batch.time[0]),
+                    )
+                    return 0
+
+            series.append(batch)
+
+        logger.info(
+            "cold_store_appended",
+            symbol=symbol,
+            interval=interval,
+            count=len(batch),
+            total=series.count,
+        )
+        return len(batch)
+
+
+cold_store = ColdStore(settings.COLD_STORE_DIR)
@@ -0,0 +1,298 @@
+"""Compact wire encodings for candle batches served by /history.
+
+The default JSON format repeats six key names per candle and is validated
+through HistoricalResponse. The formats here are serialized straight from
+the CandleBatch column arrays without building per-candle objects:
+
+- columnar: {"symbol", "interval", "t": [...], "o": [...], "h": [...],
+  "l": [...], "c": [...], "v": [...]}
+- binary:   8-byte header (magic b"AGC1", uint32 row count, little-endian)
+  followed by int64 time[n] and float64 open/high/low/close/volume[n].
+  Every array starts on an 8-byte boundary so clients can wrap the body in
+  BigInt64Array / Float64Array views without copying.
+- arrow:    Arrow IPC stream with the same six columns (requires pyarrow).
+- ticks:    scaled integers (see encode_ticks): prices as int64 multiples
+  of the symbol's tick size and volumes as multiples of its step size,
+  delta coded and written as zigzag LEB128 varints. Exact for candles on
+  the symbol's grid, typically 8-14 bytes per candle instead of 48.
+
+Streamed exports (/history/stream) send a sequence of chunks, either as
+NDJSON (one candle object per line) or as back-to-back binary frames;
+each binary frame carries its own row count, so frames are self-delimiting.
+"""
+
+import json
+import struct
+from enum import Enum
+
+import numpy as np
+
+from app.market_data.batch import CandleBatch
+from app.market_data.symbol_registry import SymbolInfo
+
+BINARY_MAGIC = b"AGC1"
+_BINARY_HEADER = struct.Struct("<4sI")
+
+TICKS_MAGIC = b"AGT1"
+# magic, row count, tick size, step size, price decimals, quantity decimals
+_TICKS_HEADER = struct.Struct("<4sIddBB")
+
+# A value counts as on the grid when it is within this fraction of an
+# increment of a multiple (float noise from sums and conversions), or
+# within _GRID_ULPS units of the last place of its unit count, whichever
+# is larger: large values such as daily volume carry more absolute noise.
+_GRID_TOLERANCE = 1e-6
+_GRID_ULPS = 4
+
+
+class HistoryFormat(str, Enum):
+    JSON = "json"
+    COLUMNAR = "columnar"
+    BINARY = "binary"
+    ARROW = "arrow"
+    TICKS = "ticks"
+
+
+MEDIA_TYPES: dict[HistoryFormat, str] = {
+    HistoryFormat.JSON: "application/json",
+    HistoryFormat.COLUMNAR: "application/vnd.agencial.columnar+json",
+    HistoryFormat.BINARY: "application/vnd.agencial.candles",
+    HistoryFormat.ARROW: "application/vnd.apache.arrow.stream",
+    HistoryFormat.TICKS: "application/vnd.agencial.ticks",
+}
+
+_FORMATS_BY_MEDIA_TYPE = {v: k for k, v in MEDIA_TYPES.items()}
+
+
+class StreamFormat(str, Enum):
+    NDJSON = "ndjson"
+    BINARY = "binary"
+
+
+STREAM_MEDIA_TYPES: dict[StreamFormat, str] = {
+    StreamFormat.NDJSON: "application/x-ndjson",
+    StreamFormat.BINARY: MEDIA_TYPES[HistoryFormat.BINARY],
+}
+
+
+def negotiate_format(
+    format_param: HistoryFormat | None,
+    accept: str | None,
+) -> HistoryFormat:
+    """Pick the response format: explicit query parameter first, then Accept.
+
+    Only exact media types from MEDIA_TYPES are honoured in Accept; anything
+    else (including */*) gets the default JSON object format.
+    """
+    if format_param is not None:
+        return format_param
+    if accept:
+        for part in accept.split(","):
+            media_type = part.split(";", 1)[0].strip().lower()
+            fmt = _FORMATS_BY_MEDIA_TYPE.get(media_type)
+            if fmt is not None:
+                return fmt
+    return HistoryFormat.JSON
+
+
+def encode_columnar(symbol: str, interval: str, batch: CandleBatch) -> bytes:
+    """Serialize a batch as columnar JSON arrays."""
+    return json.dumps(
+        {
+            "symbol": symbol,
+            "interval": interval,
+            "t": batch.time.tolist(),
+            "o": batch.open.tolist(),
+            "h": batch.high.tolist(),
+            "l": batch.low.tolist(),
+            "c": batch.close.tolist(),
+            "v": batch.volume.tolist(),
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+def encode_binary(batch: CandleBatch) -> bytes:
+    """Serialize a batch as a packed little-endian int64/float64 frame."""
+    parts = [_BINARY_HEADER.pack(BINARY_MAGIC, len(batch))]
+    parts.append(batch.time.astype("<i8", copy=False).tobytes())
+    for column in (batch.open, batch.high, batch.low, batch.close, batch.volume):
+        parts.append(column.astype("<f8", copy=False).tobytes())
+    return b"".join(parts)
+
+
+def _to_units(values: np.ndarray, increment: float, name: str) -> np.ndarray:
+    """Values as int64 multiples of `increment`; RuntimeError if off the grid."""
+    scaled = values / increment
+    units = np.rint(scaled)
+    tolerance = np.maximum(_GRID_TOLERANCE, _GRID_ULPS * np.finfo(np.float64).eps * np.abs(scaled))
+    if not np.all(np.abs(scaled - units) <= tolerance):
+        raise RuntimeError(f"{name} is not on the symbol's increment grid; use the binary format")
+    return units.astype(np.int64)
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def _varints(values: np.ndarray) -> bytes:
+    """LEB128-encode uint64 values: 7 bits per byte, high bit = more follows."""
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    # Byte k of every value at once, for k up to the longest value.
+    for k in range(int(lengths.max(initial=0))):
+        has = lengths > k
+        chunk = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + k] = (chunk | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def _read_varints(data: np.ndarray) -> np.ndarray:
+    """Decode back-to-back LEB128 varints into uint64 values."""
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.uint64) << (np.uint64(7) * position.astype(np.uint64))
+    return np.add.reduceat(parts, starts)
+
+
+def encode_ticks(batch: CandleBatch, meta: SymbolInfo) -> bytes:
+    """Serialize a batch as delta-coded scaled integers.
+
+    After the header come six columns of n zigzag varints each:
+
+    - time: first open time, then differences to the previous one
+    - open: first open, then open - previous close (0 for gapless data)
+    - close - open, high - max(open, close), min(open, close) - low
+    - volume
+
+    Prices are in ticks of `meta.tick_size`, volume in steps of
+    `meta.step_size`; a client multiplies back and rounds to the header's
+    decimals. Raises RuntimeError when the symbol has no increments or a
+    value is off its grid (e.g. Heikin-Ashi averages).
+    """
+    if meta.tick_size <= 0 or meta.step_size <= 0:
+        raise RuntimeError(f"No tick / step size known for {meta.symbol}; use the binary format")
+    o = _to_units(batch.open, meta.tick_size, "open")
+    h = _to_units(batch.high, meta.tick_size, "high")
+    lo = _to_units(batch.low, meta.tick_size, "low")
+    c = _to_units(batch.close, meta.tick_size, "close")
+    v = _to_units(batch.volume, meta.step_size, "volume")
+    t = batch.time.astype(np.int64)
+
+    columns = [
+        np.diff(t, prepend=0),
+        o - np.concatenate(([0], c[:-1])),
+        c - o,
+        h - np.maximum(o, c),
+        np.minimum(o, c) - lo,
+        v,
+    ]
+    header = _TICKS_HEADER.pack(
+        TICKS_MAGIC,
+        len(batch),
+        meta.tick_size,
+        meta.step_size,
+        meta.price_decimals,
+        meta.qty_decimals,
+    )
+    return header + _varints(_zigzag(np.concatenate(columns)))
+
+
+def decode_ticks(body: bytes) -> CandleBatch:
+    """Inverse of encode_ticks."""
+    magic, n, tick, step, price_decimals, qty_decimals = _TICKS_HEADER.unpack_from(body)
+    if magic != TICKS_MAGIC:
+        raise ValueError("Not a ticks frame")
+    values = _unzigzag(_read_varints(np.frombuffer(body, dtype=np.uint8, offset=_TICKS_HEADER.size)))
+    dt, gap, body_, upper, lower, v = values.reshape(6, n)
+    t = np.cumsum(dt)
+    # open[i] = close[i-1] + gap[i] and close[i] = open[i] + body[i], so
+    # close is a running sum of gap + body.
+    c = np.cumsum(gap + body_)
+    o = c - body_
+    h = np.maximum(o, c) + upper
+    lo = np.minimum(o, c) - lower
+    return CandleBatch(
+        t,
+        np.round(o * tick, price_decimals),
+        np.round(h * tick, price_decimals),
+        np.round(lo * tick, price_decimals),
+        np.round(c * tick, price_decimals),
+        np.round(v * step, qty_decimals),
+    )
+
+
+def encode_ndjson(batch: CandleBatch) -> bytes:
+    """Serialize a batch as NDJSON, one OHLCVCandle-shaped object per line.
+
+    float.__repr__ is what the json module uses for floats, so formatting
+    directly gives identical output without a json.dumps call per row.
+    """
+    return "".join(
+        f'{{"time":{t},"open":{o!r},"high":{h!r},"low":{lo!r},"close":{c!r},"volume":{v!r}}}\n'
+        for t, o, h, lo, c, v in zip(
+            batch.time.tolist(),
+            batch.open.tolist(),
+            batch.high.tolist(),
+            batch.low.tolist(),
+            batch.close.tolist(),
+            batch.volume.tolist(),
+        )
+    ).encode()
+
+
+def encode_arrow(batch: CandleBatch) -> bytes:
+    """Serialize a batch as an Arrow IPC stream.
+
+    Raises RuntimeError if pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError("Arrow format requires the optional pyarrow package") from e
+
+    record_batch = pa.record_batch(
+        [pa.array(column) for column in batch.columns()],
+        names=["time", "open", "high", "low", "close", "volume"],
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, record_batch.schema) as writer:
+        writer.write_batch(record_batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_batch(
+    fmt: HistoryFormat,
+    symbol: str,
+    interval: str,
+    batch: CandleBatch,
+    meta: SymbolInfo | None = None,
+) -> bytes:
+    """Encode a batch in one of the compact formats (not HistoryFormat.JSON).
+
+    HistoryFormat.TICKS needs the symbol's metadata; RuntimeError without.
+    """
+    if fmt == HistoryFormat.TICKS:
+        if meta is None:
+            raise RuntimeError(f"No symbol metadata for {symbol}; use the binary format")
+        return encode_ticks(batch, meta)
+    if fmt == HistoryFormat.COLUMNAR:
+        return encode_columnar(symbol, interval, batch)
+    if fmt == HistoryFormat.BINARY:
+        return encode_binary(batch)
+    if fmt == HistoryFormat.ARROW:
+        return encode_arrow(batch)
+    raise ValueError(f"{fmt.value} is not a compact format")
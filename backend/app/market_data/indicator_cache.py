@@ -0,0 +1,233 @@
+"""Memoized indicator series, extended incrementally as candles close.
+
+Values for closed candles never change, so an indicator series computed
+once for (symbol, interval, indicator, params) stays valid. Each entry
+holds the closed-candle values of one contiguous range plus an
+IndicatorState committed through the entry's last closed candle. The
+entry's version is its last closed open time. A request whose last
+closed candle is newer extends the series by feeding only the newly
+closed candles through the state; it does not recompute the history.
+Forming candles are previewed through the state and never stored.
+
+Entries are evicted least-recently-used under a byte budget.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.channels import channel_id
+from app.market_data.indicators import IndicatorState, create_state
+from app.market_data.service import max_gap_seconds
+
+logger = structlog.get_logger()
+
+# Entries are trimmed to their newest MAX_SERIES_LEN values.
+MAX_SERIES_LEN = 200_000
+
+# Incremental and batch values agree to rounding (the batch EMA is closed-form).
+STATE_RTOL = 1e-6
+
+
+class _SeriesEntry:
+    __slots__ = ("time", "outputs", "state")
+
+    def __init__(self, time: np.ndarray, outputs: dict[str, np.ndarray], state: IndicatorState) -> None:
+        self.time = time
+        self.outputs = outputs
+        self.state = state
+
+    @property
+    def last_closed(self) -> int:
+        return int(self.time[-1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + sum(v.nbytes for v in self.outputs.values())
+
+    def trim(self) -> None:
+        if len(self.time) > MAX_SERIES_LEN:
+            self.time = self.time[-MAX_SERIES_LEN:].copy()
+            self.outputs = {k: v[-MAX_SERIES_LEN:].copy() for k, v in self.outputs.items()}
+
+
+def _same_values(seeded: dict[str, np.ndarray], outputs: dict[str, np.ndarray], n: int) -> bool:
+    """True if the state's values for the last `n` candles match the batch outputs."""
+    return seeded.keys() == outputs.keys() and all(
+        np.allclose(seeded[k][-n:], v, rtol=STATE_RTOL, atol=0.0, equal_nan=True)
+        for k, v in outputs.items()
+    )
+
+
+class IndicatorSeriesCache:
+    """Byte-budgeted LRU of indicator series with incremental extension.
+
+    Keyed by (symbol, interval, channel id); see module docstring.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str, str], _SeriesEntry] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.extensions = 0
+        self.misses = 0
+
+    def get(
+        self,
+        symbol: str,
+        interval: str,
+        name: str,
+        params: dict,
+        batch: CandleBatch,
+        forming_time: int,
+    ) -> dict[str, np.ndarray] | None:
+        """Return outputs aligned with `batch`, or None on a miss.
+
+        Candles opening at or after `forming_time` are treated as forming.
+        A hit needs the entry to start at or before the batch's first
+        closed candle and to contain exactly the batch's closed candles
+        (no holes on either side). Newer closed candles that directly
+        follow the entry are appended to it first.
+        """
+        key = (symbol, interval, channel_id(name, params))
+        entry = self._entries.get(key)
+        closed = batch.between(None, forming_time - 1)
+        if entry is None or not len(closed) or closed.time[0] < entry.time[0]:
+            self.misses += 1
+            return None
+
+        # The part of the batch the entry should already hold must match it
+        # candle for candle; a batch starting past the entry's tail cannot
+        # be appended without a hole.
+        lo = int(np.searchsorted(entry.time, closed.time[0], "left"))
+        known = closed.between(None, entry.last_closed)
+        if not len(known) or not np.array_equal(entry.time[lo : lo + len(known)], known.time):
+            self.misses += 1
+            return None
+
+        if len(known) < len(closed):
+            self._extend(key, entry, closed[len(known) :])
+            lo = int(np.searchsorted(entry.time, closed.time[0], "left"))
+        else:
+            self.hits += 1
+        hi = lo + len(closed)
+
+        self._entries.move_to_end(key)
+        outputs = {k: v[lo:hi] for k, v in entry.outputs.items()}
+        forming = batch[len(closed) :]
+        if len(forming):
+            previews = [entry.state.update(c, is_closed=False) for c in forming.to_candles()]
+            for k in outputs:
+                values = np.array(
+                    [np.nan if p is None or p[k] is None else p[k] for p in previews],
+                    dtype=np.float64,
+                )
+                outputs[k] = np.concatenate([outputs[k], values])
+        return outputs
+
+    def put(
+        self,
+        symbol: str,
+        interval: str,
+        name: str,
+        params: dict,
+        batch: CandleBatch,
+        outputs: dict[str, np.ndarray],
+        warm: CandleBatch,
+        forming_time: int,
+    ) -> None:
+        """Cache freshly computed outputs for `batch` (aligned with it).
+
+        `warm` holds the warm-up candles loaded before the batch; the
+        incremental state is seeded from all of them plus the batch's closed
+        candles, i.e. from exactly the candles the outputs were computed
+        from, and the outputs are only cached when the state reproduces
+        them. An older range that overlaps or
+        directly precedes an existing entry is prepended to it
+        (scroll-back); a range reaching at least as far as the entry
+        replaces it.
+        """
+        closed_len = int(np.searchsorted(batch.time, forming_time, "left"))
+        if not closed_len:
+            return
+        time = batch.time[:closed_len].astype(np.int64, copy=True)
+        closed_outputs = {k: v[:closed_len].copy() for k, v in outputs.items()}
+        key = (symbol, interval, channel_id(name, params))
+        existing = self._entries.get(key)
+
+        if existing is not None and int(time[-1]) < existing.last_closed:
+            # An older range: keep it only if it joins the entry's head.
+            overlap = int(np.searchsorted(time, existing.time[0], "left"))
+            joins = (
+                overlap < len(time) and time[overlap] == existing.time[0]
+            ) or (
+                overlap == len(time)
+                and existing.time[0] - time[-1] <= max_gap_seconds(symbol, interval)
+            )
+            if time[0] < existing.time[0] and joins:
+                self._remove(key)
+                existing.time = np.concatenate([time[:overlap], existing.time])
+                existing.outputs = {
+                    k: np.concatenate([closed_outputs[k][:overlap], v])
+                    for k, v in existing.outputs.items()
+                }
+                existing.trim()
+                self._insert(key, existing)
+            return
+
+        state = create_state(name, params)
+        seeded = state.extend(CandleBatch.concat([warm, batch[:closed_len]]))
+        if not _same_values(seeded, closed_outputs, closed_len):
+            # Later extensions would diverge from the batch values.
+            logger.warning(
+                "indicator_state_mismatch",
+                symbol=symbol,
+                interval=interval,
+                channel=key[2],
+            )
+            return
+        entry = _SeriesEntry(time, closed_outputs, state)
+        entry.trim()
+        if existing is not None:
+            self._remove(key)
+        self._insert(key, entry)
+
+    def _extend(self, key: tuple[str, str, str], entry: _SeriesEntry, new: CandleBatch) -> None:
+        values = entry.state.extend(new)
+        self._remove(key)
+        entry.time = np.concatenate([entry.time, new.time.astype(np.int64)])
+        entry.outputs = {k: np.concatenate([v, values[k]]) for k, v in entry.outputs.items()}
+        entry.trim()
+        self._insert(key, entry)
+        self.extensions += 1
+
+    def _insert(self, key: tuple[str, str, str], entry: _SeriesEntry) -> None:
+        if entry.nbytes > self._max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple[str, str, str]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.extensions + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "extensions": self.extensions,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.extensions) / lookups, 4) if lookups else None,
+        }
+
+
+indicator_cache = IndicatorSeriesCache(settings.INDICATOR_CACHE_BYTES)
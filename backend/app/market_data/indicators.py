@@ -0,0 +1,978 @@
+"""Technical indicators over candle batches, in bulk and incrementally.
+
+Every indicator exists in two forms that produce the same values:
+
+- a vectorized batch function over a CandleBatch (sliding-window views,
+  cumulative sums and a blocked closed-form EMA), used for /indicators and
+  for seeding; and
+- an IndicatorState that advances in O(1) per candle, used for live
+  streams. `update(candle, is_closed)` previews the values for a forming
+  candle without changing state and commits them once the candle closes.
+
+Outputs are float64 arrays aligned with the batch; slots still inside the
+warm-up period are NaN. `warmup_candles` says how many candles before the
+first displayed one are needed for the displayed values to be settled, so
+callers can load that lookback automatically.
+
+Conventions follow common charting defaults: EMA and Wilder (RMA)
+smoothing are seeded with the SMA of their first `period` inputs, and
+Bollinger Bands use the population standard deviation. Sessions for VWAP
+and pivot points are UTC calendar periods.
+"""
+
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.market_data.batch import CandleBatch
+from app.market_data.resample import UTC, bucket_starts, calendar_boundaries
+from app.market_data.schemas import OHLCVCandle, interval_seconds
+
+NAN = float("nan")
+
+# Upper bound on warm-up candles loaded ahead of a request.
+MAX_WARMUP_CANDLES = 50_000
+
+# Periods above this are rejected as parameter errors.
+MAX_PERIOD = 5000
+
+# Smoothed averages are treated as settled once the weight of the
+# initial seed has decayed below this.
+_SMOOTHING_TOLERANCE = 1e-4
+
+SOURCES = ("open", "high", "low", "close", "hl2", "hlc3", "ohlc4")
+PIVOT_METHODS = ("classic", "fibonacci", "woodie")
+SESSION_ANCHORS = ("1D", "1W", "1M")
+
+_CHOICES: dict[str, tuple[str, ...]] = {
+    "source": SOURCES,
+    "method": PIVOT_METHODS,
+    "anchor": SESSION_ANCHORS,
+}
+
+# Parameters no longer used but still accepted and ignored, so clients that
+# send the previously advertised defaults are not rejected. Ichimoku's
+# displacement only ever described how the chart plots the lines.
+_IGNORED_PARAMS: dict[str, tuple[str, ...]] = {"ichimoku": ("displacement",)}
+
+
+# ---------------------------------------------------------------------------
+# Vectorized building blocks
+# ---------------------------------------------------------------------------
+
+
+def _source(batch: CandleBatch, source: str) -> np.ndarray:
+    if source == "hl2":
+        return (batch.high + batch.low) / 2
+    if source == "hlc3":
+        return (batch.high + batch.low + batch.close) / 3
+    if source == "ohlc4":
+        return (batch.open + batch.high + batch.low + batch.close) / 4
+    return getattr(batch, source)
+
+
+def _padded(values: np.ndarray, length: int) -> np.ndarray:
+    """Left-pad `values` with NaN to `length` slots."""
+    out = np.full(length, np.nan)
+    if len(values):
+        out[length - len(values) :] = values
+    return out
+
+
+def _rolling(x: np.ndarray, n: int) -> np.ndarray:
+    """(len - n + 1, n) view of every complete window; empty if too short."""
+    if len(x) < n:
+        return np.empty((0, n))
+    return sliding_window_view(x, n)
+
+
+def _sma(x: np.ndarray, n: int) -> np.ndarray:
+    return _padded(_rolling(x, n).mean(axis=1), len(x))
+
+
+def _rolling_max(x: np.ndarray, n: int) -> np.ndarray:
+    return _padded(_rolling(x, n).max(axis=1), len(x))
+
+
+def _rolling_min(x: np.ndarray, n: int) -> np.ndarray:
+    return _padded(_rolling(x, n).min(axis=1), len(x))
+
+
+def ewm(x: np.ndarray, alpha: float, seed_n: int) -> np.ndarray:
+    """Exponential smoothing y[i] = y[i-1] + alpha * (x[i] - y[i-1]).
+
+    Seeded with the mean of the first `seed_n` inputs. The recurrence is
+    evaluated in blocks with its closed form
+
+        y[s + i] = w^(i+1) * y[s-1] + alpha * w^i * cumsum(x[s + j] * w^-j)
+
+    where w = 1 - alpha. Blocks are sized so that w^-j stays far from
+    float64 overflow.
+    """
+    out = np.full(len(x), np.nan)
+    if len(x) < seed_n:
+        return out
+    out[seed_n - 1] = x[:seed_n].mean()
+    w = 1.0 - alpha
+    if w <= 0.0:
+        out[seed_n:] = x[seed_n:]
+        return out
+
+    block = max(1, min(1024, int(150 / -math.log10(w))))
+    y = out[seed_n - 1]
+    for s in range(seed_n, len(x), block):
+        seg = x[s : s + block]
+        powers = w ** np.arange(len(seg))
+        acc = np.cumsum(seg / powers)
+        ys = w * powers * y + alpha * powers * acc
+        out[s : s + len(seg)] = ys
+        y = ys[-1]
+    return out
+
+
+def _chain_ewm(x: np.ndarray, alpha: float, seed_n: int) -> np.ndarray:
+    """ewm over an input that is NaN during its own warm-up."""
+    valid = np.flatnonzero(~np.isnan(x))
+    if not len(valid):
+        return np.full(len(x), np.nan)
+    return _padded(ewm(x[valid[0] :], alpha, seed_n), len(x))
+
+
+def _chain_sma(x: np.ndarray, n: int) -> np.ndarray:
+    valid = np.flatnonzero(~np.isnan(x))
+    if not len(valid):
+        return np.full(len(x), np.nan)
+    return _padded(_sma(x[valid[0] :], n), len(x))
+
+
+def _settle(alpha: float) -> int:
+    """Inputs needed after seeding for the seed's weight to become negligible."""
+    if alpha >= 1.0:
+        return 0
+    return math.ceil(math.log(_SMOOTHING_TOLERANCE) / math.log(1.0 - alpha))
+
+
+def _sessions(times: np.ndarray, anchor: str) -> tuple[np.ndarray, np.ndarray]:
+    """Return (session start per candle, index of each session's first candle)."""
+    starts = bucket_starts(times, anchor, UTC)
+    firsts = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1))
+    return starts, firsts
+
+
+def _session_index(firsts: np.ndarray, length: int) -> np.ndarray:
+    """Map every candle to the ordinal of its session."""
+    return np.repeat(np.arange(len(firsts)), np.diff(np.append(firsts, length)))
+
+
+def _pivot_levels(high, low, close, method: str) -> dict:
+    """Pivot levels from a period's high/low/close (scalars or arrays)."""
+    rng = high - low
+    if method == "woodie":
+        p = (high + low + 2 * close) / 4
+    else:
+        p = (high + low + close) / 3
+    if method == "fibonacci":
+        return {
+            "p": p,
+            "r1": p + 0.382 * rng,
+            "r2": p + 0.618 * rng,
+            "r3": p + rng,
+            "s1": p - 0.382 * rng,
+            "s2": p - 0.618 * rng,
+            "s3": p - rng,
+        }
+    return {
+        "p": p,
+        "r1": 2 * p - low,
+        "r2": p + rng,
+        "r3": high + 2 * (p - low),
+        "s1": 2 * p - high,
+        "s2": p - rng,
+        "s3": low - 2 * (high - p),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Batch indicators
+# ---------------------------------------------------------------------------
+
+
+def sma(batch: CandleBatch, period: int = 20, source: str = "close") -> dict[str, np.ndarray]:
+    return {"sma": _sma(_source(batch, source), period)}
+
+
+def ema(batch: CandleBatch, period: int = 20, source: str = "close") -> dict[str, np.ndarray]:
+    return {"ema": ewm(_source(batch, source), 2 / (period + 1), period)}
+
+
+def wma(batch: CandleBatch, period: int = 20, source: str = "close") -> dict[str, np.ndarray]:
+    weights = np.arange(1, period + 1, dtype=np.float64)
+    x = _source(batch, source)
+    return {"wma": _padded(_rolling(x, period) @ weights / weights.sum(), len(x))}
+
+
+def rsi(batch: CandleBatch, period: int = 14) -> dict[str, np.ndarray]:
+    change = np.diff(batch.close)
+    avg_gain = ewm(np.maximum(change, 0.0), 1 / period, period)
+    avg_loss = ewm(np.maximum(-change, 0.0), 1 / period, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100 - 100 / (1 + avg_gain / avg_loss)
+    value = np.where(avg_loss == 0, 100.0, np.where(avg_gain == 0, 0.0, value))
+    value[np.isnan(avg_gain)] = np.nan
+    return {"rsi": _padded(value, len(batch))}
+
+
+def macd(
+    batch: CandleBatch,
+    fast: int = 12,
+    slow: int = 26,
+    signal: int = 9,
+) -> dict[str, np.ndarray]:
+    line = ewm(batch.close, 2 / (fast + 1), fast) - ewm(batch.close, 2 / (slow + 1), slow)
+    signal_line = _chain_ewm(line, 2 / (signal + 1), signal)
+    return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+
+def bollinger(
+    batch: CandleBatch,
+    period: int = 20,
+    stddev: float = 2.0,
+    source: str = "close",
+) -> dict[str, np.ndarray]:
+    x = _source(batch, source)
+    windows = _rolling(x, period)
+    middle = _padded(windows.mean(axis=1), len(x))
+    width = stddev * _padded(windows.std(axis=1), len(x))
+    return {"middle": middle, "upper": middle + width, "lower": middle - width}
+
+
+def stochastic(
+    batch: CandleBatch,
+    k_period: int = 14,
+    k_smooth: int = 1,
+    d_period: int = 3,
+) -> dict[str, np.ndarray]:
+    highest = _rolling_max(batch.high, k_period)
+    lowest = _rolling_min(batch.low, k_period)
+    spread = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = np.where(spread > 0, 100 * (batch.close - lowest) / spread, 50.0)
+    raw[np.isnan(spread)] = np.nan
+    k = _chain_sma(raw, k_smooth)
+    return {"k": k, "d": _chain_sma(k, d_period)}
+
+
+def _true_range(batch: CandleBatch) -> np.ndarray:
+    tr = batch.high - batch.low
+    if len(batch) > 1:
+        prev_close = batch.close[:-1]
+        tr[1:] = np.maximum.reduce([
+            tr[1:],
+            np.abs(batch.high[1:] - prev_close),
+            np.abs(batch.low[1:] - prev_close),
+        ])
+    return tr
+
+
+def atr(batch: CandleBatch, period: int = 14) -> dict[str, np.ndarray]:
+    return {"atr": ewm(_true_range(batch), 1 / period, period)}
+
+
+def ichimoku(
+    batch: CandleBatch,
+    conversion: int = 9,
+    base: int = 26,
+    span_b: int = 52,
+) -> dict[str, np.ndarray]:
+    """Ichimoku lines at the candle they are computed from.
+
+    Displacement is left to the chart: conventionally span_a and span_b are
+    drawn 26 candles ahead and lagging 26 candles behind.
+    """
+
+    def midpoint(n: int) -> np.ndarray:
+        return (_rolling_max(batch.high, n) + _rolling_min(batch.low, n)) / 2
+
+    conversion_line = midpoint(conversion)
+    base_line = midpoint(base)
+    return {
+        "conversion": conversion_line,
+        "base": base_line,
+        "span_a": (conversion_line + base_line) / 2,
+        "span_b": midpoint(span_b),
+        "lagging": batch.close.astype(np.float64),
+    }
+
+
+def pivots(
+    batch: CandleBatch,
+    method: str = "classic",
+    anchor: str = "1D",
+) -> dict[str, np.ndarray]:
+    """Pivot levels from the previous `anchor` session's high/low/close."""
+    if not len(batch):
+        return {k: np.empty(0) for k in _PIVOT_OUTPUTS}
+    _, firsts = _sessions(batch.time, anchor)
+    lasts = np.concatenate((firsts[1:], [len(batch)])) - 1
+    levels = _pivot_levels(
+        np.maximum.reduceat(batch.high, firsts),
+        np.minimum.reduceat(batch.low, firsts),
+        batch.close[lasts],
+        method,
+    )
+    session = _session_index(firsts, len(batch))
+    out = {}
+    for name, values in levels.items():
+        previous = np.concatenate(([np.nan], values[:-1]))
+        out[name] = previous[session]
+    return out
+
+
+_PIVOT_OUTPUTS = ("p", "r1", "r2", "r3", "s1", "s2", "s3")
+
+
+def vwap(batch: CandleBatch, anchor: str = "1D", start_time: int = 0) -> dict[str, np.ndarray]:
+    """Volume-weighted average of hlc3, reset every `anchor` session.
+
+    With a non-zero `start_time` the VWAP is anchored there instead: it
+    starts at the first candle at or after start_time and never resets.
+    """
+    price = _source(batch, "hlc3")
+    if not len(batch):
+        return {"vwap": price}
+    pv = np.cumsum(price * batch.volume)
+    vol = np.cumsum(batch.volume)
+
+    if start_time:
+        first = int(np.searchsorted(batch.time, start_time, "left"))
+        base_pv = pv[first - 1] if first else 0.0
+        base_vol = vol[first - 1] if first else 0.0
+        pv, vol = pv - base_pv, vol - base_vol
+        valid = np.arange(len(batch)) >= first
+    else:
+        _, firsts = _sessions(batch.time, anchor)
+        session = _session_index(firsts, len(batch))
+        offset_pv = np.concatenate(([0.0], pv[firsts[1:] - 1]))
+        offset_vol = np.concatenate(([0.0], vol[firsts[1:] - 1]))
+        pv, vol = pv - offset_pv[session], vol - offset_vol[session]
+        valid = np.ones(len(batch), dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(vol > 0, pv / vol, price)
+    value[~valid] = np.nan
+    return {"vwap": value}
+
+
+# ---------------------------------------------------------------------------
+# Incremental building blocks
+#
+# Each `step(x, commit)` returns the value for a window ending at x. With
+# commit=False (a forming candle) the state is left untouched, so a forming
+# candle can be re-evaluated on every tick at O(1) cost.
+# ---------------------------------------------------------------------------
+
+
+class _RollingWindow:
+    """Sum, sum of squares and linearly weighted sum of the last n values.
+
+    Running sums are recomputed exactly every n commits, so floating-point
+    drift stays bounded at amortized O(1) cost.
+    """
+
+    __slots__ = ("n", "values", "total", "squares", "weighted", "commits")
+
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.values: deque[float] = deque(maxlen=n)
+        self.total = 0.0
+        self.squares = 0.0
+        self.weighted = 0.0
+        self.commits = 0
+
+    def step(self, x: float, commit: bool) -> tuple[float, float, float] | None:
+        k = len(self.values)
+        if k == self.n:
+            old = self.values[0]
+            total = self.total - old + x
+            squares = self.squares - old * old + x * x
+            weighted = self.weighted - self.total + self.n * x
+        else:
+            total = self.total + x
+            squares = self.squares + x * x
+            weighted = self.weighted + (k + 1) * x
+
+        if commit:
+            self.values.append(x)
+            self.total, self.squares, self.weighted = total, squares, weighted
+            self.commits += 1
+            if self.commits % self.n == 0:
+                self._resync()
+
+        if k + 1 < self.n:
+            return None
+        return total, squares, weighted
+
+    def _resync(self) -> None:
+        values = np.fromiter(self.values, dtype=np.float64, count=len(self.values))
+        self.total = float(values.sum())
+        self.squares = float(values @ values)
+        self.weighted = float(values @ np.arange(1, len(values) + 1))
+
+
+class _RollingMean:
+    __slots__ = ("window",)
+
+    def __init__(self, n: int) -> None:
+        self.window = _RollingWindow(n)
+
+    def step(self, x: float, commit: bool) -> float:
+        sums = self.window.step(x, commit)
+        return NAN if sums is None else sums[0] / self.window.n
+
+
+class _RollingExtreme:
+    """Max (or min) of the last n values via a monotonic deque.
+
+    The deque covers the last n - 1 committed values, so the window ending
+    at an uncommitted x is the deque plus x.
+    """
+
+    __slots__ = ("n", "is_max", "deque", "count")
+
+    def __init__(self, n: int, is_max: bool) -> None:
+        self.n = n
+        self.is_max = is_max
+        self.deque: deque[tuple[int, float]] = deque()
+        self.count = 0
+
+    def step(self, x: float, commit: bool) -> float:
+        d = self.deque
+        if d:
+            best = max(d[0][1], x) if self.is_max else min(d[0][1], x)
+        else:
+            best = x
+        ready = self.count + 1 >= self.n
+
+        if commit:
+            while d and (d[-1][1] <= x if self.is_max else d[-1][1] >= x):
+                d.pop()
+            d.append((self.count, x))
+            self.count += 1
+            while d and d[0][0] <= self.count - self.n:
+                d.popleft()
+
+        return best if ready else NAN
+
+
+class _Smoother:
+    """Exponential smoothing seeded with the mean of the first seed_n inputs."""
+
+    __slots__ = ("alpha", "seed_n", "count", "total", "value")
+
+    def __init__(self, alpha: float, seed_n: int) -> None:
+        self.alpha = alpha
+        self.seed_n = seed_n
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def step(self, x: float, commit: bool) -> float:
+        if self.count < self.seed_n:
+            total = self.total + x
+            value = total / self.seed_n if self.count + 1 == self.seed_n else NAN
+            if commit:
+                self.total = total
+                self.count += 1
+                self.value = value
+            return value
+
+        value = self.value + self.alpha * (x - self.value)
+        if commit:
+            self.value = value
+        return value
+
+
+class _Session:
+    """Tracks which UTC `anchor` period the candle stream is in."""
+
+    __slots__ = ("anchor", "start", "end")
+
+    def __init__(self, anchor: str) -> None:
+        self.anchor = anchor
+        self.start: int | None = None
+        self.end: int | None = None
+
+    def is_new(self, t: int) -> bool:
+        return self.end is None or t >= self.end
+
+    def advance(self, t: int) -> None:
+        boundaries = calendar_boundaries(self.anchor, t, t, UTC)
+        i = int(np.searchsorted(boundaries, t, "right"))
+        self.start, self.end = int(boundaries[i - 1]), int(boundaries[i])
+
+
+def _source_value(source: str, o: float, h: float, lo: float, c: float) -> float:
+    if source == "close":
+        return c
+    if source == "open":
+        return o
+    if source == "high":
+        return h
+    if source == "low":
+        return lo
+    if source == "hl2":
+        return (h + lo) / 2
+    if source == "hlc3":
+        return (h + lo + c) / 3
+    return (o + h + lo + c) / 4
+
+
+# ---------------------------------------------------------------------------
+# Incremental indicators
+# ---------------------------------------------------------------------------
+
+
+class IndicatorState(ABC):
+    """Incremental evaluator for one indicator configuration.
+
+    Subclasses implement `_step`, which evaluates one candle and commits
+    the new state only when `commit` is true.
+    """
+
+    def __init__(self) -> None:
+        self.last_time: int | None = None
+
+    @abstractmethod
+    def _step(
+        self, t: int, o: float, h: float, lo: float, c: float, v: float, commit: bool
+    ) -> dict[str, float]:
+        """Output values of one candle."""
+
+    def seed(self, batch: CandleBatch) -> None:
+        """Commit a run of closed candles (warm-up), in chronological order."""
+        self.extend(batch)
+
+    def extend(self, batch: CandleBatch) -> dict[str, np.ndarray]:
+        """Commit closed candles newer than the last committed one.
+
+        Returns their output values as arrays aligned with the committed
+        candles, or an empty dict if none were newer.
+        """
+        batch = batch.between(None if self.last_time is None else self.last_time + 1, None)
+        rows = [
+            self._step(*row, commit=True)
+            for row in zip(*(column.tolist() for column in batch.columns()))
+        ]
+        if not rows:
+            return {}
+        self.last_time = int(batch.time[-1])
+        return {k: np.array([r[k] for r in rows], dtype=np.float64) for k in rows[0]}
+
+    def update(self, candle: OHLCVCandle, is_closed: bool) -> dict[str, float | None] | None:
+        """Evaluate a streamed candle in O(1).
+
+        Forming candles are previewed; closed candles are committed. Returns
+        None for candles at or before the last committed one, and None for
+        individual outputs still inside their warm-up.
+        """
+        if self.last_time is not None and candle.time <= self.last_time:
+            return None
+        values = self._step(
+            candle.time,
+            candle.open,
+            candle.high,
+            candle.low,
+            candle.close,
+            candle.volume,
+            commit=is_closed,
+        )
+        if is_closed:
+            self.last_time = candle.time
+        return {k: None if math.isnan(v) else v for k, v in values.items()}
+
+
+class _SMAState(IndicatorState):
+    def __init__(self, period: int = 20, source: str = "close") -> None:
+        super().__init__()
+        self.source = source
+        self.mean = _RollingMean(period)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        return {"sma": self.mean.step(_source_value(self.source, o, h, lo, c), commit)}
+
+
+class _EMAState(IndicatorState):
+    def __init__(self, period: int = 20, source: str = "close") -> None:
+        super().__init__()
+        self.source = source
+        self.smoother = _Smoother(2 / (period + 1), period)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        return {"ema": self.smoother.step(_source_value(self.source, o, h, lo, c), commit)}
+
+
+class _WMAState(IndicatorState):
+    def __init__(self, period: int = 20, source: str = "close") -> None:
+        super().__init__()
+        self.source = source
+        self.window = _RollingWindow(period)
+        self.denominator = period * (period + 1) / 2
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        sums = self.window.step(_source_value(self.source, o, h, lo, c), commit)
+        return {"wma": NAN if sums is None else sums[2] / self.denominator}
+
+
+class _RSIState(IndicatorState):
+    def __init__(self, period: int = 14) -> None:
+        super().__init__()
+        self.prev_close: float | None = None
+        self.gains = _Smoother(1 / period, period)
+        self.losses = _Smoother(1 / period, period)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        if self.prev_close is None:
+            if commit:
+                self.prev_close = c
+            return {"rsi": NAN}
+        change = c - self.prev_close
+        avg_gain = self.gains.step(max(change, 0.0), commit)
+        avg_loss = self.losses.step(max(-change, 0.0), commit)
+        if commit:
+            self.prev_close = c
+        if math.isnan(avg_gain):
+            value = NAN
+        elif avg_loss == 0:
+            value = 100.0
+        elif avg_gain == 0:
+            value = 0.0
+        else:
+            value = 100 - 100 / (1 + avg_gain / avg_loss)
+        return {"rsi": value}
+
+
+class _MACDState(IndicatorState):
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        super().__init__()
+        self.fast = _Smoother(2 / (fast + 1), fast)
+        self.slow = _Smoother(2 / (slow + 1), slow)
+        self.signal = _Smoother(2 / (signal + 1), signal)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        line = self.fast.step(c, commit) - self.slow.step(c, commit)
+        if math.isnan(line):
+            return {"macd": NAN, "signal": NAN, "histogram": NAN}
+        signal_line = self.signal.step(line, commit)
+        return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+
+class _BollingerState(IndicatorState):
+    def __init__(self, period: int = 20, stddev: float = 2.0, source: str = "close") -> None:
+        super().__init__()
+        self.source = source
+        self.stddev = stddev
+        self.window = _RollingWindow(period)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        sums = self.window.step(_source_value(self.source, o, h, lo, c), commit)
+        if sums is None:
+            return {"middle": NAN, "upper": NAN, "lower": NAN}
+        n = self.window.n
+        mean = sums[0] / n
+        width = self.stddev * math.sqrt(max(sums[1] / n - mean * mean, 0.0))
+        return {"middle": mean, "upper": mean + width, "lower": mean - width}
+
+
+class _StochasticState(IndicatorState):
+    def __init__(self, k_period: int = 14, k_smooth: int = 1, d_period: int = 3) -> None:
+        super().__init__()
+        self.highest = _RollingExtreme(k_period, is_max=True)
+        self.lowest = _RollingExtreme(k_period, is_max=False)
+        self.k = _RollingMean(k_smooth)
+        self.d = _RollingMean(d_period)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        highest = self.highest.step(h, commit)
+        lowest = self.lowest.step(lo, commit)
+        if math.isnan(highest):
+            return {"k": NAN, "d": NAN}
+        spread = highest - lowest
+        raw = 100 * (c - lowest) / spread if spread > 0 else 50.0
+        k = self.k.step(raw, commit)
+        if math.isnan(k):
+            return {"k": NAN, "d": NAN}
+        return {"k": k, "d": self.d.step(k, commit)}
+
+
+class _ATRState(IndicatorState):
+    def __init__(self, period: int = 14) -> None:
+        super().__init__()
+        self.prev_close: float | None = None
+        self.smoother = _Smoother(1 / period, period)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        tr = h - lo
+        if self.prev_close is not None:
+            tr = max(tr, abs(h - self.prev_close), abs(lo - self.prev_close))
+        if commit:
+            self.prev_close = c
+        return {"atr": self.smoother.step(tr, commit)}
+
+
+class _IchimokuState(IndicatorState):
+    def __init__(
+        self,
+        conversion: int = 9,
+        base: int = 26,
+        span_b: int = 52,
+    ) -> None:
+        super().__init__()
+        self.windows = [
+            (_RollingExtreme(n, is_max=True), _RollingExtreme(n, is_max=False))
+            for n in (conversion, base, span_b)
+        ]
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        conversion, base, span_b = (
+            (highest.step(h, commit) + lowest.step(lo, commit)) / 2
+            for highest, lowest in self.windows
+        )
+        return {
+            "conversion": conversion,
+            "base": base,
+            "span_a": (conversion + base) / 2,
+            "span_b": span_b,
+            "lagging": c,
+        }
+
+
+class _PivotsState(IndicatorState):
+    def __init__(self, method: str = "classic", anchor: str = "1D") -> None:
+        super().__init__()
+        self.method = method
+        self.session = _Session(anchor)
+        self.high = NAN
+        self.low = NAN
+        self.close = NAN
+        self.levels = dict.fromkeys(_PIVOT_OUTPUTS, NAN)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        if self.session.is_new(t):
+            levels = (
+                _pivot_levels(self.high, self.low, self.close, self.method)
+                if self.session.end is not None
+                else self.levels
+            )
+            high, low = h, lo
+        else:
+            levels = self.levels
+            high, low = max(self.high, h), min(self.low, lo)
+
+        if commit:
+            if self.session.is_new(t):
+                self.session.advance(t)
+                self.levels = levels
+            self.high, self.low, self.close = high, low, c
+        return dict(levels)
+
+
+class _VWAPState(IndicatorState):
+    def __init__(self, anchor: str = "1D", start_time: int = 0) -> None:
+        super().__init__()
+        self.start_time = start_time
+        self.session = _Session(anchor)
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        price = (h + lo + c) / 3
+        if self.start_time:
+            if t < self.start_time:
+                return {"vwap": NAN}
+            new_session = False
+        else:
+            new_session = self.session.is_new(t)
+
+        pv = price * v + (0.0 if new_session else self.pv)
+        volume = v + (0.0 if new_session else self.volume)
+        if commit:
+            if new_session:
+                self.session.advance(t)
+            self.pv, self.volume = pv, volume
+        return {"vwap": pv / volume if volume > 0 else price}
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+class Indicator(NamedTuple):
+    compute: Callable[..., dict[str, np.ndarray]]
+    state: type[IndicatorState]
+    defaults: dict[str, int | float | str]
+    # (params, interval seconds) -> candles of lookback needed
+    lookback: Callable[[dict, int], int]
+
+
+def _session_lookback(anchor: str, interval_sec: int, periods: int) -> int:
+    return periods * math.ceil(interval_seconds(anchor) * 32 / 30 / interval_sec)
+
+
+INDICATORS: dict[str, Indicator] = {
+    "sma": Indicator(sma, _SMAState, {"period": 20, "source": "close"}, lambda p, _: p["period"] - 1),
+    "ema": Indicator(
+        ema,
+        _EMAState,
+        {"period": 20, "source": "close"},
+        lambda p, _: p["period"] - 1 + _settle(2 / (p["period"] + 1)),
+    ),
+    "wma": Indicator(wma, _WMAState, {"period": 20, "source": "close"}, lambda p, _: p["period"] - 1),
+    "rsi": Indicator(
+        rsi,
+        _RSIState,
+        {"period": 14},
+        lambda p, _: p["period"] + _settle(1 / p["period"]),
+    ),
+    "macd": Indicator(
+        macd,
+        _MACDState,
+        {"fast": 12, "slow": 26, "signal": 9},
+        lambda p, _: (
+            max(p["fast"], p["slow"]) - 1
+            + _settle(2 / (max(p["fast"], p["slow"]) + 1))
+            + p["signal"] - 1
+            + _settle(2 / (p["signal"] + 1))
+        ),
+    ),
+    "bollinger": Indicator(
+        bollinger,
+        _BollingerState,
+        {"period": 20, "stddev": 2.0, "source": "close"},
+        lambda p, _: p["period"] - 1,
+    ),
+    "stochastic": Indicator(
+        stochastic,
+        _StochasticState,
+        {"k_period": 14, "k_smooth": 1, "d_period": 3},
+        lambda p, _: p["k_period"] + p["k_smooth"] + p["d_period"] - 3,
+    ),
+    "atr": Indicator(
+        atr,
+        _ATRState,
+        {"period": 14},
+        lambda p, _: p["period"] + _settle(1 / p["period"]),
+    ),
+    "ichimoku": Indicator(
+        ichimoku,
+        _IchimokuState,
+        {"conversion": 9, "base": 26, "span_b": 52},
+        lambda p, _: max(p["conversion"], p["base"], p["span_b"]) - 1,
+    ),
+    "pivots": Indicator(
+        pivots,
+        _PivotsState,
+        {"method": "classic", "anchor": "1D"},
+        lambda p, sec: _session_lookback(p["anchor"], sec, 2),
+    ),
+    "vwap": Indicator(
+        vwap,
+        _VWAPState,
+        {"anchor": "1D", "start_time": 0},
+        # Anchored VWAP needs data back to its anchor; see warmup_candles.
+        lambda p, sec: 0 if p["start_time"] else _session_lookback(p["anchor"], sec, 1),
+    ),
+}
+
+
+def _get(name: str) -> Indicator:
+    indicator = INDICATORS.get(name)
+    if indicator is None:
+        raise ValueError(f"Unknown indicator: {name!r}")
+    return indicator
+
+
+def resolve_params(name: str, params: dict) -> dict[str, int | float | str]:
+    """Merge user params over the indicator defaults and validate them.
+
+    Raises ValueError for unknown indicators, unknown parameters and
+    out-of-range values. Parameters in _IGNORED_PARAMS are dropped.
+    """
+    defaults = _get(name).defaults
+    resolved = dict(defaults)
+    for key, value in params.items():
+        if key in _IGNORED_PARAMS.get(name, ()):
+            continue
+        if key not in defaults:
+            raise ValueError(f"Unknown parameter {key!r} for {name}")
+        default = defaults[key]
+        if isinstance(default, str):
+            if value not in _CHOICES[key]:
+                raise ValueError(f"{name}.{key} must be one of {', '.join(_CHOICES[key])}")
+            resolved[key] = value
+        elif isinstance(default, int):
+            if (
+                isinstance(value, bool)
+                or not isinstance(value, (int, float))
+                or not math.isfinite(value)
+                or value != int(value)
+            ):
+                raise ValueError(f"{name}.{key} must be an integer")
+            resolved[key] = int(value)
+        else:
+            if (
+                isinstance(value, bool)
+                or not isinstance(value, (int, float))
+                or not math.isfinite(value)
+                or not value > 0
+            ):
+                raise ValueError(f"{name}.{key} must be a positive number")
+            resolved[key] = float(value)
+
+    for key, value in resolved.items():
+        if key == "start_time":
+            if value < 0:
+                raise ValueError(f"{name}.start_time must be >= 0")
+        elif isinstance(value, int) and not 1 <= value <= MAX_PERIOD:
+            raise ValueError(f"{name}.{key} must be between 1 and {MAX_PERIOD}")
+    return resolved
+
+
+def warmup_candles(name: str, params: dict, interval: str, first_time: int) -> int:
+    """Candles needed before `first_time` for settled values at first_time.
+
+    `params` must already be resolved. Raises ValueError if the lookback
+    exceeds MAX_WARMUP_CANDLES.
+    """
+    sec = interval_seconds(interval)
+    if name == "vwap" and params["start_time"]:
+        count = max(0, math.ceil((first_time - params["start_time"]) / sec))
+    else:
+        count = _get(name).lookback(params, sec)
+    if count > MAX_WARMUP_CANDLES:
+        raise ValueError(
+            f"{name} needs {count} warm-up candles on {interval} (max {MAX_WARMUP_CANDLES})"
+        )
+    return count
+
+
+def compute_indicator(batch: CandleBatch, name: str, params: dict) -> dict[str, np.ndarray]:
+    """Evaluate an indicator over a whole batch (`params` already resolved)."""
+    return _get(name).compute(batch, **params)
+
+
+def create_state(name: str, params: dict) -> IndicatorState:
+    """Create an incremental evaluator (`params` already resolved)."""
+    return _get(name).state(**params)
+
+
+def series_to_list(values: np.ndarray) -> list[float | None]:
+    """Convert an output array to a JSON-ready list with None for NaN."""
+    return [None if v != v else v for v in values.tolist()]
@@ -0,0 +1,207 @@
+"""Bulk candle upsert into ohlcv_cache via COPY + staging-table merge.
+
+A single multi-row INSERT binds 9 parameters per candle, which exceeds
+asyncpg's 32,767 bind-parameter limit at ~3,640 rows and is slow well
+before that. Large batches are instead streamed with COPY into a
+session-local temp table and merged with one INSERT ... SELECT ... ON
+CONFLICT per chunk. Small batches keep the plain INSERT path, chunked
+under the bind limit, because COPY's setup cost dominates there.
+"""
+
+import time as _time
+from itertools import repeat
+from typing import NamedTuple
+
+import structlog
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.market_data.batch import CandleBatch
+from app.market_data.models import OHLCVCache
+
+logger = structlog.get_logger()
+
+# Rows per COPY + merge round trip. Bounds staging-table size and memory.
+COPY_CHUNK_ROWS = 20_000
+
+# Below this many rows a parameterized INSERT beats COPY's fixed overhead.
+COPY_MIN_ROWS = 1_000
+
+# asyncpg allows at most 32,767 bind parameters per statement.
+_MAX_BIND_PARAMS = 32_767
+
+_COPY_COLUMNS = (
+    "symbol",
+    "interval",
+    "provider",
+    "open_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+)
+
+_INSERT_CHUNK_ROWS = _MAX_BIND_PARAMS // len(_COPY_COLUMNS)
+
+_STAGING_TABLE = "ohlcv_staging"
+
+_CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} (
+    symbol VARCHAR(30) NOT NULL,
+    interval VARCHAR(10) NOT NULL,
+    provider VARCHAR(20) NOT NULL,
+    open_time BIGINT NOT NULL,
+    open DOUBLE PRECISION NOT NULL,
+    high DOUBLE PRECISION NOT NULL,
+    low DOUBLE PRECISION NOT NULL,
+    close DOUBLE PRECISION NOT NULL,
+    volume DOUBLE PRECISION NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+# DISTINCT ON guards against duplicate open_times inside one chunk, which
+# would otherwise fail with "ON CONFLICT DO UPDATE command cannot affect
+# row a second time".
+_MERGE_SQL = f"""
+INSERT INTO ohlcv_cache ({", ".join(_COPY_COLUMNS)})
+SELECT DISTINCT ON (symbol, interval, open_time) {", ".join(_COPY_COLUMNS)}
+FROM {_STAGING_TABLE}
+ORDER BY symbol, interval, open_time
+ON CONFLICT ON CONSTRAINT uq_ohlcv_candle DO UPDATE SET
+    open = EXCLUDED.open,
+    high = EXCLUDED.high,
+    low = EXCLUDED.low,
+    close = EXCLUDED.close,
+    volume = EXCLUDED.volume
+"""
+
+
+class IngestResult(NamedTuple):
+    """Outcome of one bulk upsert call."""
+
+    rows: int
+    chunks: int
+    method: str  # "copy" or "insert"
+    elapsed_sec: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed_sec if self.elapsed_sec > 0 else float(self.rows)
+
+
+async def bulk_upsert_candles(
+    db: AsyncSession,
+    batch: CandleBatch,
+    symbol: str,
+    interval: str,
+    provider: str,
+) -> IngestResult:
+    """Upsert a candle batch into ohlcv_cache, chunking automatically.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    started = _time.perf_counter()
+    if not len(batch):
+        return IngestResult(0, 0, "insert", 0.0)
+
+    driver_conn = None
+    if len(batch) >= COPY_MIN_ROWS:
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        driver_conn = raw.driver_connection
+
+    if driver_conn is not None and hasattr(driver_conn, "copy_records_to_table"):
+        chunks = await _copy_merge(db, driver_conn, batch, symbol, interval, provider)
+        method = "copy"
+    else:
+        chunks = await _insert_chunks(db, batch, symbol, interval, provider)
+        method = "insert"
+
+    result = IngestResult(len(batch), chunks, method, _time.perf_counter() - started)
+    logger.info(
+        "candles_bulk_upserted",
+        symbol=symbol,
+        interval=interval,
+        rows=result.rows,
+        chunks=result.chunks,
+        method=result.method,
+        elapsed_ms=round(result.elapsed_sec * 1000, 1),
+        rows_per_sec=round(result.rows_per_sec),
+    )
+    return result
+
+
+def _records(batch: CandleBatch, symbol: str, interval: str, provider: str):
+    """Yield row tuples in _COPY_COLUMNS order."""
+    return zip(
+        repeat(symbol),
+        repeat(interval),
+        repeat(provider),
+        batch.time.tolist(),
+        batch.open.tolist(),
+        batch.high.tolist(),
+        batch.low.tolist(),
+        batch.close.tolist(),
+        batch.volume.tolist(),
+    )
+
+
+async def _copy_merge(
+    db: AsyncSession,
+    driver_conn,
+    batch: CandleBatch,
+    symbol: str,
+    interval: str,
+    provider: str,
+) -> int:
+    """COPY each chunk into the staging table and merge it into ohlcv_cache."""
+    conn = await db.connection()
+    await conn.exec_driver_sql(_CREATE_STAGING_SQL)
+
+    chunks = 0
+    for lo in range(0, len(batch), COPY_CHUNK_ROWS):
+        chunk = batch[lo : lo + COPY_CHUNK_ROWS]
+        await driver_conn.copy_records_to_table(
+            _STAGING_TABLE,
+            records=_records(chunk, symbol, interval, provider),
+            columns=_COPY_COLUMNS,
+        )
+        await conn.exec_driver_sql(_MERGE_SQL)
+        # ON COMMIT DELETE ROWS only clears at commit; later chunks in the
+        # same transaction must not re-merge earlier rows.
+        await conn.exec_driver_sql(f"TRUNCATE {_STAGING_TABLE}")
+        chunks += 1
+    return chunks
+
+
+async def _insert_chunks(
+    db: AsyncSession,
+    batch: CandleBatch,
+    symbol: str,
+    interval: str,
+    provider: str,
+) -> int:
+    """Multi-row INSERT ... ON CONFLICT, chunked under the bind-parameter limit."""
+    chunks = 0
+    for lo in range(0, len(batch), _INSERT_CHUNK_ROWS):
+        chunk = batch[lo : lo + _INSERT_CHUNK_ROWS]
+        values = [
+            dict(zip(_COPY_COLUMNS, row))
+            for row in _records(chunk, symbol, interval, provider)
+        ]
+        stmt = pg_insert(OHLCVCache).values(values)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_ohlcv_candle",
+            set_={
+                "open": stmt.excluded.open,
+                "high": stmt.excluded.high,
+                "low": stmt.excluded.low,
+                "close": stmt.excluded.close,
+                "volume": stmt.excluded.volume,
+            },
+        )
+        await db.execute(stmt)
+        chunks += 1
+    await db.flush()
+    return chunks
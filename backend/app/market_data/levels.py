@@ -0,0 +1,139 @@
+"""Higher-timeframe levels for lower-timeframe charts.
+
+For each of LEVEL_TIMEFRAMES (day, week, month, UTC-aligned like the
+provider candles) the levels are the previous closed bucket's high, low
+and close plus classic floor-trader pivots:
+
+    P  = (H + L + C) / 3
+    R1 = 2P - L        S1 = 2P - H
+    R2 = P + (H - L)   S2 = P - (H - L)
+    R3 = H + 2(P - L)  S3 = L - 2(H - P)
+
+LevelsState is seeded from the provider's latest higher-timeframe candles
+and then follows a 1m stream: every tick only folds its high, low and
+close into the forming bucket of each timeframe, and the levels change
+only when a tick opens a new bucket, i.e. when a higher-timeframe candle
+closes. One state per symbol serves every chart on it (see channels.py).
+"""
+
+import numpy as np
+
+from app.market_data.batch import CandleBatch
+from app.market_data.resample import UTC, calendar_boundaries
+from app.market_data.schemas import OHLCVCandle
+
+LEVEL_TIMEFRAMES: tuple[str, ...] = ("1D", "1W", "1M")
+
+# Stream the levels follow, whatever interval the subscribing chart shows.
+SOURCE_INTERVAL = "1m"
+
+# (open time, high, low, close)
+Bucket = tuple[int, float, float, float]
+
+
+def pivots(high: float, low: float, close: float) -> dict[str, float]:
+    """Classic floor pivots of one bucket."""
+    p = (high + low + close) / 3
+    return {
+        "pivot": p,
+        "r1": 2 * p - low,
+        "s1": 2 * p - high,
+        "r2": p + (high - low),
+        "s2": p - (high - low),
+        "r3": high + 2 * (p - low),
+        "s3": low - 2 * (high - p),
+    }
+
+
+def _bucket_bounds(timeframe: str, t: int) -> tuple[int, int]:
+    """(open time of the bucket containing t, open time of the next one)."""
+    boundaries = calendar_boundaries(timeframe, t, t, UTC)
+    i = int(np.searchsorted(boundaries, t, "right"))
+    return int(boundaries[i - 1]), int(boundaries[i])
+
+
+class LevelsState:
+    """Previous and forming bucket of every timeframe for one symbol.
+
+    `changed` is set whenever the levels move (seed, or a bucket closing)
+    and cleared by the consumer once it has sent them.
+    """
+
+    def __init__(self) -> None:
+        self.last_time: int | None = None
+        self.changed = False
+        self._prior: dict[str, Bucket | None] = dict.fromkeys(LEVEL_TIMEFRAMES)
+        # Forming bucket as [open time, high, low, close], its end, and
+        # whether it was observed from its start (a bucket first seen
+        # mid-way never becomes the prior: its range would be partial).
+        self._current: dict[str, list | None] = dict.fromkeys(LEVEL_TIMEFRAMES)
+        self._ends: dict[str, int] = dict.fromkeys(LEVEL_TIMEFRAMES, 0)
+        self._complete: dict[str, bool] = dict.fromkeys(LEVEL_TIMEFRAMES, False)
+
+    def seed(self, timeframe: str, batch: CandleBatch, forming_start: int) -> None:
+        """Take the last closed and the forming `timeframe` candle from `batch`."""
+        closed = batch.between(None, forming_start - 1)
+        if len(closed):
+            self._prior[timeframe] = (
+                int(closed.time[-1]),
+                float(closed.high[-1]),
+                float(closed.low[-1]),
+                float(closed.close[-1]),
+            )
+        forming = batch.between(forming_start, None)
+        if len(forming):
+            self._current[timeframe] = [
+                forming_start,
+                float(forming.high[0]),
+                float(forming.low[0]),
+                float(forming.close[0]),
+            ]
+            self._ends[timeframe] = _bucket_bounds(timeframe, forming_start)[1]
+            self._complete[timeframe] = True
+        self.changed = True
+
+    def update(self, candle: OHLCVCandle, is_closed: bool) -> None:
+        """Fold a streamed source candle into every timeframe.
+
+        Highs, lows and the latest close are idempotent, so forming updates
+        and a candle already covered by the seed are harmless.
+        """
+        t = candle.time
+        for timeframe in LEVEL_TIMEFRAMES:
+            current = self._current[timeframe]
+            if current is not None and t < current[0]:
+                continue
+            if current is None or t >= self._ends[timeframe]:
+                start, end = _bucket_bounds(timeframe, t)
+                if current is not None and self._complete[timeframe]:
+                    self._prior[timeframe] = tuple(current)
+                    self.changed = True
+                self._current[timeframe] = [start, candle.high, candle.low, candle.close]
+                self._ends[timeframe] = end
+                self._complete[timeframe] = t == start
+                continue
+            current[1] = max(current[1], candle.high)
+            current[2] = min(current[2], candle.low)
+            current[3] = candle.close
+        if is_closed:
+            self.last_time = t
+
+    def levels(self) -> list[dict]:
+        """Levels of every timeframe with a known previous bucket."""
+        out = []
+        for timeframe in LEVEL_TIMEFRAMES:
+            prior = self._prior[timeframe]
+            if prior is None:
+                continue
+            time, high, low, close = prior
+            out.append(
+                {
+                    "timeframe": timeframe,
+                    "time": time,
+                    "high": high,
+                    "low": low,
+                    "close": close,
+                    **pivots(high, low, close),
+                }
+            )
+        return out
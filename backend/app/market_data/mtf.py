@@ -0,0 +1,159 @@
+"""Several timeframes of one symbol over a shared window, in one request.
+
+Multi-timeframe layouts show the same window at 2-4 intervals. Instead of
+one /history call (and one cache query, one possible provider miss) per
+pane, the finest requested interval's base candles are loaded once and
+every coarser interval they tile exactly is resampled from them, so the
+coarse candles are consistent with the fine ones by construction.
+Intervals the base does not tile (or would need too many base candles
+for) are loaded on their own.
+
+Each series covers whole buckets: its first candle is the one containing
+start_time and its last the one containing end_time. With nested
+intervals every coarse bucket edge is also a fine candle edge, so the
+panes line up.
+"""
+
+import time as _time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.resample import (
+    calendar_boundaries,
+    choose_base_interval,
+    needs_resampling,
+    resample,
+)
+from app.market_data.schemas import interval_seconds
+from app.market_data.service import MarketDataService
+
+logger = structlog.get_logger()
+
+MAX_INTERVALS = 6
+
+# Most base candles loaded to derive coarser intervals from.
+MAX_BASE_CANDLES = 250_000
+
+
+def bucket_span(interval: str, start_time: int, end_time: int, tz: ZoneInfo) -> tuple[int, int]:
+    """[open of the bucket containing start_time, end of the one containing end_time]."""
+    boundaries = calendar_boundaries(interval, start_time, end_time, tz)
+    first = int(boundaries[np.searchsorted(boundaries, start_time, "right") - 1])
+    last = int(boundaries[np.searchsorted(boundaries, end_time, "right")]) - 1
+    return first, last
+
+
+def _tiles(base: str, interval: str, span: tuple[int, int], tz: ZoneInfo) -> bool:
+    """True when every `interval` bucket edge in `span` is a `base` candle edge."""
+    if interval_seconds(base) > interval_seconds(interval):
+        return False
+    boundaries = calendar_boundaries(interval, span[0], span[1], tz)
+    return bool(np.all(boundaries % interval_seconds(base) == 0))
+
+
+def _check_count(interval: str, span: tuple[int, int], cap: int) -> None:
+    count = (span[1] - span[0]) // interval_seconds(interval) + 1
+    if count > cap:
+        raise ValueError(
+            f"Window holds about {count} {interval} candles (max {cap}); request a shorter window"
+        )
+
+
+async def _load_base(
+    service: MarketDataService,
+    symbol: str,
+    base: str,
+    start_time: int,
+    end_time: int,
+    now: int,
+) -> CandleBatch:
+    """Every `base` candle in the span, with a fresh forming candle."""
+    batch = await service.get_span(symbol, base, start_time, min(end_time, now))
+    if end_time >= now - interval_seconds(base):
+        # Cached history lags the forming candle; refresh the tail so the
+        # newest bucket of every derived interval is current.
+        tail = await service.get_historical_batch(symbol, base, limit=3)
+        if len(tail):
+            batch = CandleBatch.concat([batch.between(None, int(tail.time[0]) - 1), tail])
+    return batch
+
+
+async def load_aligned(
+    service: MarketDataService,
+    symbol: str,
+    intervals: list[str],
+    start_time: int,
+    end_time: int,
+    tz: ZoneInfo,
+) -> list[dict]:
+    """Candles of each interval over [start_time, end_time], in request order.
+
+    Returns one dict per interval: interval, base_interval (the interval it
+    was resampled from, or None when loaded directly) and batch. Raises
+    ValueError for windows too large and httpx errors from providers.
+    """
+    now = int(_time.time())
+    started = _time.perf_counter()
+    cap = settings.MTF_MAX_CANDLES
+    spans = {i: bucket_span(i, start_time, end_time, tz) for i in intervals}
+    for interval, span in spans.items():
+        _check_count(interval, span, cap)
+
+    ordered = sorted(set(intervals), key=interval_seconds)
+    finest = ordered[0]
+    base = (
+        choose_base_interval(finest, tz, *spans[finest])
+        if needs_resampling(finest, tz)
+        else finest
+    )
+    derived = [
+        i
+        for i in ordered
+        if base is not None
+        and _tiles(base, i, spans[i], tz)
+        and (spans[i][1] - spans[i][0]) // interval_seconds(base) < MAX_BASE_CANDLES
+    ]
+
+    results: dict[str, tuple[str | None, CandleBatch]] = {}
+    base_count = 0
+    if derived:
+        # Derived spans nest, so the coarsest one covers all of them.
+        lo = min(spans[i][0] for i in derived)
+        hi = max(spans[i][1] for i in derived)
+        base_batch = await _load_base(service, symbol, base, lo, hi, now)
+        base_count = len(base_batch)
+        for interval in derived:
+            batch = base_batch.between(*spans[interval])
+            if interval != base:
+                batch = resample(batch, interval, tz)
+            results[interval] = (base if interval != base else None, batch)
+
+    for interval in ordered:
+        if interval in results:
+            continue
+        lo, hi = spans[interval]
+        if needs_resampling(interval, tz):
+            batch = await service.get_historical_batch(
+                symbol, interval, lo, hi, limit=cap, tz=tz
+            )
+        else:
+            batch = await service.get_span(symbol, interval, lo, min(hi, now))
+        results[interval] = (None, batch.between(lo, hi))
+
+    logger.info(
+        "mtf_loaded",
+        symbol=symbol,
+        intervals=ordered,
+        base=base if derived else None,
+        derived=len([i for i in derived if i != base]),
+        base_count=base_count,
+        ms=round((_time.perf_counter() - started) * 1000, 2),
+    )
+    return [
+        {"interval": i, "base_interval": results[i][0], "batch": results[i][1]}
+        for i in intervals
+    ]
@@ -0,0 +1,210 @@
+"""Boundary-aligned, immutable history pages with validators and precompression.
+
+History is split into fixed pages of PAGE_SIZE candle slots per interval:
+page N covers open times [N * span, (N + 1) * span) with
+span = PAGE_SIZE * interval seconds. The boundaries depend only on the
+interval, so every client asking for page N gets byte-identical bodies and
+browsers, the Next.js proxy and CDNs can cache them.
+
+Once every candle slot of a page has closed, the page never changes: it is
+served with a content-hash ETag and `Cache-Control: immutable`. The page
+containing the forming candle (the "tail") gets a few seconds of max-age.
+Each page body is encoded and compressed once and kept in a bounded
+in-memory LRU.
+"""
+
+import gzip
+import hashlib
+import time as _time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import structlog
+
+from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.encoding import HistoryFormat, encode_batch
+from app.market_data.schemas import HistoricalResponse, interval_seconds
+from app.market_data.symbol_registry import SymbolInfo
+
+logger = structlog.get_logger()
+
+# Candle slots per page. Kept at the Binance per-request maximum so a page
+# miss costs at most one provider call.
+PAGE_SIZE = 1000
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+TAIL_PAGE_MAX_AGE = 5
+
+
+def page_span(interval: str) -> int:
+    """Seconds covered by one page of the given interval."""
+    return PAGE_SIZE * interval_seconds(interval)
+
+
+def page_bounds(interval: str, page: int) -> tuple[int, int]:
+    """Return the inclusive (start_time, end_time) open-time range of a page."""
+    span = page_span(interval)
+    return page * span, (page + 1) * span - 1
+
+
+def page_for_time(interval: str, ts: int) -> int:
+    """Return the page number containing open time `ts`."""
+    return ts // page_span(interval)
+
+
+def is_page_closed(interval: str, page: int, now: int | None = None) -> bool:
+    """True once the last candle slot of the page has closed."""
+    now = int(_time.time()) if now is None else now
+    _, end_time = page_bounds(interval, page)
+    # The last slot opens at end_time + 1 - interval and closes at end_time + 1.
+    return end_time + 1 <= now
+
+
+class PageEntry(NamedTuple):
+    """An encoded page with its validators and precompressed variants."""
+
+    batch: CandleBatch
+    body: bytes
+    etag_hash: str
+    encoded: dict[str, bytes]  # content-coding -> compressed body
+    immutable: bool
+    expires_at: float  # monotonic deadline; inf for immutable pages
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.batch.nbytes
+            + len(self.body)
+            + sum(len(b) for b in self.encoded.values())
+        )
+
+    def etag(self, coding: str | None) -> str:
+        """Strong ETag per representation: each content-coding gets its own."""
+        return f'"{self.etag_hash}-{coding}"' if coding else f'"{self.etag_hash}"'
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """True if an If-None-Match header names any representation of this page."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        for tag in if_none_match.split(","):
+            tag = tag.strip().removeprefix("W/").strip('"')
+            if tag.split("-", 1)[0] == self.etag_hash:
+                return True
+        return False
+
+    def cache_control(self) -> str:
+        if self.immutable:
+            return IMMUTABLE_CACHE_CONTROL
+        return f"public, max-age={TAIL_PAGE_MAX_AGE}"
+
+    def pick_encoding(self, accept_encoding: str | None) -> str | None:
+        """Choose the best precompressed variant the client accepts."""
+        if not accept_encoding:
+            return None
+        accepted = {
+            part.split(";", 1)[0].strip().lower()
+            for part in accept_encoding.split(",")
+            if not part.strip().endswith(";q=0")
+        }
+        for coding in ("br", "gzip"):
+            if coding in accepted and coding in self.encoded:
+                return coding
+        return None
+
+
+def _compress(body: bytes) -> dict[str, bytes]:
+    """Precompress a body with gzip, plus brotli if the optional package exists."""
+    encoded = {"gzip": gzip.compress(body, compresslevel=6)}
+    try:
+        import brotli
+    except ImportError:
+        return encoded
+    encoded["br"] = brotli.compress(body, quality=9)
+    return encoded
+
+
+def build_page_entry(
+    symbol: str,
+    interval: str,
+    page: int,
+    fmt: HistoryFormat,
+    batch: CandleBatch,
+    meta: SymbolInfo | None = None,
+) -> PageEntry:
+    """Encode, hash and compress a page body (`meta` for the ticks format)."""
+    if fmt == HistoryFormat.JSON:
+        body = (
+            HistoricalResponse(symbol=symbol, interval=interval, candles=batch.to_candles())
+            .model_dump_json()
+            .encode()
+        )
+    else:
+        body = encode_batch(fmt, symbol, interval, batch, meta)
+
+    immutable = is_page_closed(interval, page)
+    return PageEntry(
+        batch=batch,
+        body=body,
+        etag_hash=hashlib.sha256(body).hexdigest()[:32],
+        encoded=_compress(body),
+        immutable=immutable,
+        expires_at=float("inf") if immutable else _time.monotonic() + TAIL_PAGE_MAX_AGE,
+    )
+
+
+class HistoryPageCache:
+    """Byte-budgeted LRU of encoded history pages.
+
+    Keyed by (symbol, interval, page, format). Tail pages expire after
+    TAIL_PAGE_MAX_AGE seconds; closed pages stay until evicted.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str, int, HistoryFormat], PageEntry] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, interval: str, page: int, fmt: HistoryFormat) -> PageEntry | None:
+        key = (symbol, interval, page, fmt)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at < _time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, symbol: str, interval: str, page: int, fmt: HistoryFormat, entry: PageEntry) -> None:
+        key = (symbol, interval, page, fmt)
+        if key in self._entries:
+            self._remove(key)
+        if entry.nbytes > self._max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self._max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: tuple[str, str, int, HistoryFormat]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+page_cache = HistoryPageCache(settings.HISTORY_PAGE_CACHE_BYTES)
@@ -0,0 +1,355 @@
+"""Predictive background loading of older history for infinite scroll.
+
+When a chart is scrolled left, the client asks /history for the `limit`
+candles before the oldest one it holds (`end_time = oldest - 1`), or for
+the equally wide range before its previous one, and a cache miss stalls
+on the provider. HistoryPrefetcher watches the windows served to each
+client per (symbol, interval, timezone) and recognises a scroll-back step
+when a request ends just before that client's previous window. It then
+loads the next older window through the normal cache-first path, so its
+candles are in ohlcv_cache (or the resample cache) before the client
+asks. The next window is predicted exactly: for `end_time`-only requests
+it ends one second before the oldest candle just served. Scroll state is
+per client, so other viewers of the same market loading its latest
+window do not disturb a client that is scrolling back.
+
+Every consecutive step adds one window of look-ahead, up to
+PREFETCH_DEPTH. Prefetching is low priority and bounded: at most
+HISTORY_PREFETCH_CONCURRENCY loads run at once, at most
+HISTORY_PREFETCH_PER_MINUTE start per minute across all clients, and a
+window that would exceed the budget is left to the request itself.
+Look-ahead is cancelled when it stops being useful: the client jumps
+elsewhere, pages forward, reloads the latest window, reaches the start
+of history, or goes idle for IDLE_SECONDS. Cancelling stops further
+look-ahead; a window already being loaded still finishes into the
+shared cache. A request for a window that is being loaded in the
+background, by any client's look-ahead, waits for that load instead of
+fetching it a second time.
+
+When a client subscribes to a stream that was not running, the latest
+window is warmed the same way, so the chart's initial /history usually
+hits the cache too.
+"""
+
+import asyncio
+import time as _time
+from collections import OrderedDict
+from zoneinfo import ZoneInfo
+
+import structlog
+
+from app.config import settings
+from app.database import async_session
+from app.market_data.batch import CandleBatch
+from app.market_data.resample import UTC, needs_resampling
+from app.market_data.schemas import interval_seconds
+from app.market_data.service import MarketDataService
+
+logger = structlog.get_logger()
+
+# Windows loaded ahead of the client at most.
+PREFETCH_DEPTH = 2
+
+# Seconds without a request after which a key's look-ahead stops.
+IDLE_SECONDS = 120.0
+
+# Keys tracked at most; the least recently used are dropped.
+MAX_TRACKED = 2000
+
+# Window warmed on subscribe: the /history default limit.
+WARM_LIMIT = 500
+
+# Seconds during which the latest window of a market is not warmed again.
+WARM_TTL_SECONDS = 30.0
+
+# (symbol, interval, timezone); the timezone is UTC unless it changes the candles.
+ScrollKey = tuple[str, str, ZoneInfo]
+
+# (client, ScrollKey): the client is the user id, or the address of an
+# anonymous client.
+ClientScrollKey = tuple[str, ScrollKey]
+
+# (start_time, end_time, limit) of one /history request.
+Window = tuple[int | None, int | None, int]
+
+
+def scroll_key(symbol: str, interval: str, tz: ZoneInfo) -> ScrollKey:
+    return symbol, interval, tz if needs_resampling(interval, tz) else UTC
+
+
+def older_window(window: Window, batch: CandleBatch) -> Window | None:
+    """The window a client scrolling back asks for after `window`.
+
+    `batch` holds the candles served for `window`; None when it is empty
+    (history starts there) or the range would start before the epoch.
+    """
+    start_time, end_time, limit = window
+    if not len(batch):
+        return None
+    if start_time is None:
+        return None, int(batch.time[0]) - 1, limit
+    width = end_time - start_time + 1
+    if start_time - width < 0:
+        return None
+    return start_time - width, start_time - 1, limit
+
+
+class _Scroll:
+    """Scroll position and look-ahead of one client on one ScrollKey."""
+
+    __slots__ = ("edge", "streak", "target", "ready", "task", "seen")
+
+    def __init__(self) -> None:
+        self.edge: int | None = None  # oldest open time the client holds
+        self.streak = 0  # consecutive scroll-back steps
+        self.target = 0  # windows to keep loaded ahead
+        # Prefetched windows, newest first, each with the window after it.
+        self.ready: list[tuple[Window, Window | None]] = []
+        self.task: asyncio.Task | None = None
+        self.seen = _time.monotonic()
+
+
+class HistoryPrefetcher:
+    """Scroll-back detection and budgeted background loading of history."""
+
+    def __init__(
+        self,
+        concurrency: int = settings.HISTORY_PREFETCH_CONCURRENCY,
+        per_minute: int = settings.HISTORY_PREFETCH_PER_MINUTE,
+    ) -> None:
+        self._slots = asyncio.Semaphore(concurrency)
+        self._per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._refilled_at = _time.monotonic()
+        self._scrolls: OrderedDict[ClientScrollKey, _Scroll] = OrderedDict()
+        self._loading: dict[tuple[ScrollKey, Window], asyncio.Task] = {}
+        self._warmed: dict[tuple[str, str], float] = {}
+        self._warm_tasks: set[asyncio.Task] = set()
+        self.loads = 0
+        self.hits = 0
+        self.waits = 0
+        self.cancelled = 0
+        self.over_budget = 0
+        self.failures = 0
+        self.warms = 0
+
+    def _take_token(self) -> bool:
+        now = _time.monotonic()
+        self._tokens = min(
+            self._per_minute,
+            self._tokens + (now - self._refilled_at) * self._per_minute / 60,
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            self.over_budget += 1
+            return False
+        self._tokens -= 1
+        return True
+
+    async def wait(
+        self,
+        symbol: str,
+        interval: str,
+        tz: ZoneInfo,
+        start_time: int | None,
+        end_time: int | None,
+        limit: int,
+    ) -> None:
+        """Wait for a background load of exactly this window, if one is running.
+
+        Never raises: a failed or cancelled load leaves the request to load
+        the window itself.
+        """
+        load = self._loading.get((scroll_key(symbol, interval, tz), (start_time, end_time, limit)))
+        if load is not None:
+            self.waits += 1
+            await asyncio.wait({load})
+
+    def observe(
+        self,
+        client: str,
+        symbol: str,
+        interval: str,
+        tz: ZoneInfo,
+        start_time: int | None,
+        end_time: int | None,
+        limit: int,
+        batch: CandleBatch,
+    ) -> None:
+        """Record a window served to `client` and schedule look-ahead after it."""
+        key = scroll_key(symbol, interval, tz)
+        state = self._scrolls.pop((client, key), None) or _Scroll()
+        self._scrolls[(client, key)] = state
+        while len(self._scrolls) > MAX_TRACKED:
+            self._reset(self._scrolls.popitem(last=False)[1])
+        state.seen = _time.monotonic()
+
+        window = (start_time, end_time, limit)
+        previous_edge = state.edge
+        if start_time is not None:
+            state.edge = start_time
+        elif len(batch):
+            state.edge = int(batch.time[0])
+        if end_time is None or not len(batch) or previous_edge is None or end_time >= previous_edge:
+            # Latest window, forward paging or the start of history: nothing
+            # older is about to be asked for. A first end-bounded window
+            # (a jump to a date) counts as one step.
+            self._reset(state)
+            if end_time is not None and len(batch) and previous_edge is None:
+                state.streak = 1
+                self._schedule(key, state, window, batch)
+            return
+
+        if end_time < previous_edge - limit * interval_seconds(interval):
+            # A jump further back: the look-ahead was for another place.
+            self._reset(state)
+        served = next((i for i, (w, _) in enumerate(state.ready) if w == window), None)
+        if served is not None:
+            self.hits += 1
+            del state.ready[: served + 1]
+        elif state.ready or (state.task is not None and not state.task.done()):
+            self._reset(state)
+        state.streak += 1
+        self._schedule(key, state, window, batch)
+
+    def _schedule(self, key: ScrollKey, state: _Scroll, window: Window, batch: CandleBatch) -> None:
+        state.target = min(state.streak, PREFETCH_DEPTH)
+        if state.task is not None and not state.task.done():
+            return  # the running look-ahead picks up the new target
+        start = state.ready[-1][1] if state.ready else older_window(window, batch)
+        if start is None or len(state.ready) >= state.target:
+            return
+        state.task = asyncio.create_task(
+            self._run(key, state, start), name=f"history-prefetch-{key[0]}@{key[1]}"
+        )
+
+    def _reset(self, state: _Scroll) -> None:
+        if state.task is not None and not state.task.done():
+            state.task.cancel()
+            self.cancelled += 1
+        state.task = None
+        state.ready.clear()
+        state.streak = 0
+
+    async def _run(self, key: ScrollKey, state: _Scroll, window: Window | None) -> None:
+        """Load windows older and older until `target` are ready."""
+        while window is not None and len(state.ready) < state.target:
+            if _time.monotonic() - state.seen > IDLE_SECONDS:
+                return
+            async with self._slots:
+                if not self._take_token():
+                    return
+                try:
+                    # Shielded: a cancelled look-ahead lets the load finish
+                    # into the cache, where this or another client can use it.
+                    batch = await asyncio.shield(self._start_load(key, window))
+                except Exception as e:
+                    # The request loads the window itself when it gets there.
+                    self.failures += 1
+                    logger.warning(
+                        "history_prefetch_failed",
+                        symbol=key[0],
+                        interval=key[1],
+                        end_time=window[1],
+                        error=str(e),
+                    )
+                    return
+            older = older_window(window, batch)
+            state.ready.append((window, older))
+            window = older
+
+    def _start_load(self, key: ScrollKey, window: Window) -> asyncio.Task:
+        load = self._loading.get((key, window))
+        if load is not None:
+            return load
+        load = asyncio.create_task(self._load(key, window), name=f"history-load-{key[0]}@{key[1]}")
+        self._loading[(key, window)] = load
+        load.add_done_callback(lambda _: self._load_done(key, window, load))
+        return load
+
+    def _load_done(self, key: ScrollKey, window: Window, load: asyncio.Task) -> None:
+        self._loading.pop((key, window), None)
+        if not load.cancelled():
+            # Retrieved here for loads whose look-ahead was cancelled; the
+            # awaiting look-ahead or warm-up logs failures.
+            load.exception()
+
+    async def _load(self, key: ScrollKey, window: Window) -> CandleBatch:
+        symbol, interval, tz = key
+        start_time, end_time, limit = window
+        started = _time.perf_counter()
+        async with async_session() as session:
+            service = MarketDataService(session)
+            batch = await service.get_historical_batch(
+                symbol, interval, start_time, end_time, limit, tz
+            )
+            await session.commit()
+        self.loads += 1
+        logger.info(
+            "history_prefetched",
+            symbol=symbol,
+            interval=interval,
+            end_time=end_time,
+            count=len(batch),
+            ms=round((_time.perf_counter() - started) * 1000, 2),
+        )
+        return batch
+
+    def warm(self, symbol: str, interval: str) -> None:
+        """Load the latest window of a market in the background.
+
+        Skipped while the market was warmed within WARM_TTL_SECONDS or the
+        budget is spent. Warm loads do not wait for a prefetch slot: the
+        client's first /history call is right behind them.
+        """
+        key = scroll_key(symbol, interval, UTC)
+        window = (None, None, WARM_LIMIT)
+        now = _time.monotonic()
+        if (key, window) in self._loading:
+            return
+        if now - self._warmed.get((symbol, interval), float("-inf")) < WARM_TTL_SECONDS:
+            return
+        if not self._take_token():
+            return
+        if len(self._warmed) >= MAX_TRACKED:
+            self._warmed = {
+                k: t for k, t in self._warmed.items() if now - t < WARM_TTL_SECONDS
+            }
+        self._warmed[(symbol, interval)] = now
+        self.warms += 1
+        task = asyncio.create_task(self._warm(key, window), name=f"history-warm-{symbol}@{interval}")
+        self._warm_tasks.add(task)
+        task.add_done_callback(self._warm_tasks.discard)
+
+    async def _warm(self, key: ScrollKey, window: Window) -> None:
+        try:
+            await self._start_load(key, window)
+        except Exception as e:
+            self.failures += 1
+            logger.warning("history_warm_failed", symbol=key[0], interval=key[1], error=str(e))
+
+    async def stop(self) -> None:
+        """Cancel all background loads (on shutdown)."""
+        tasks = [s.task for s in self._scrolls.values() if s.task is not None]
+        tasks += [*self._warm_tasks, *self._loading.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scrolls.clear()
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._scrolls),
+            "loading": len(self._loading),
+            "tokens": int(self._tokens),
+            "loads": self.loads,
+            "hits": self.hits,
+            "waits": self.waits,
+            "cancelled": self.cancelled,
+            "over_budget": self.over_budget,
+            "failures": self.failures,
+            "warms": self.warms,
+        }
+
+
+history_prefetcher = HistoryPrefetcher()
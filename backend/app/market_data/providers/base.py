@@ -6,6 +6,9 @@ from app.market_data.schemas import OHLCVCandle
 
 
 class MarketDataProvider(ABC):
+    # Largest `limit` a single fetch_historical call can satisfy.
+    max_page_size: int = 1000
+
     @abstractmethod
     async def fetch_historical(
         self,
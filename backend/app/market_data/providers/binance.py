@@ -1,5 +1,7 @@
 """Binance market data provider for crypto OHLCV candles."""
 
+import json
+
 import httpx
 import structlog
 
@@ -45,7 +47,7 @@ class BinanceProvider(MarketDataProvider):
         params: dict = {
             "symbol": symbol,
             "interval": binance_interval,
-            "limit": min(limit, 1000),  # Binance max is 1000
+            "limit": min(limit, self.max_page_size),  # Binance max is 1000
         }
         if start_time is not None:
             params["startTime"] = start_time * 1000  # Convert s to ms
@@ -76,6 +78,40 @@ class BinanceProvider(MarketDataProvider):
         )
         return candles
 
+    async def fetch_agg_trades(
+        self,
+        symbol: str,
+        from_id: int,
+        limit: int = 1000,
+    ) -> list[tuple[int, int, float, float, bool]]:
+        """Fetch aggregated trades starting at aggregate trade id `from_id`.
+
+        Returns (id, time_ms, price, qty, buyer_maker) tuples in id order.
+        """
+        data = await self._fetch_with_fallback(
+            "/api/v3/aggTrades",
+            {"symbol": symbol, "fromId": from_id, "limit": min(limit, 1000)},
+        )
+        return [
+            (int(t["a"]), int(t["T"]), float(t["p"]), float(t["q"]), bool(t["m"]))
+            for t in data
+        ]
+
+    async def fetch_24h_tickers(self, symbols: list[str]) -> dict[str, tuple[float, float]]:
+        """Fetch last price and 24h change percent for many symbols in one call.
+
+        Returns {symbol: (last_price, change_percent)}. Binance rejects the
+        whole request if any symbol is unknown.
+        """
+        data = await self._fetch_with_fallback(
+            "/api/v3/ticker/24hr",
+            {"symbols": json.dumps(symbols, separators=(",", ":"))},
+        )
+        return {
+            t["symbol"]: (float(t["lastPrice"]), float(t["priceChangePercent"]))
+            for t in data
+        }
+
     async def get_available_symbols(self) -> list[str]:
         """Fetch trading symbols from Binance exchangeInfo.
 
@@ -96,16 +132,65 @@ class BinanceProvider(MarketDataProvider):
         logger.info("binance_available_symbols", count=len(symbols))
         return symbols
 
+    async def fetch_symbol_assets(
+        self, etag: str | None = None
+    ) -> tuple[list[tuple[str, str, str, str, str]] | None, str | None]:
+        """Fetch (symbol, base, quote, tick size, step size) of trading symbols.
+
+        Same filter as get_available_symbols; tick and step sizes are the
+        PRICE_FILTER / LOT_SIZE values as Binance formats them (e.g.
+        "0.01000000"). With the ETag of a previous response the request is
+        conditional; returns (None, etag) when exchangeInfo has not
+        changed, else (symbols, new ETag or None).
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        response = await self._get_with_fallback("/api/v3/exchangeInfo", {}, headers)
+        if response.status_code == 304:
+            return None, etag
+
+        allowed_quotes = {"USDT", "BUSD", "BTC"}
+        symbols = []
+        for info in response.json().get("symbols", []):
+            if info.get("status") != "TRADING" or info.get("quoteAsset") not in allowed_quotes:
+                continue
+            filters = {f.get("filterType"): f for f in info.get("filters", [])}
+            symbols.append(
+                (
+                    info["symbol"],
+                    info["baseAsset"],
+                    info["quoteAsset"],
+                    filters.get("PRICE_FILTER", {}).get("tickSize", "0"),
+                    filters.get("LOT_SIZE", {}).get("stepSize", "0"),
+                )
+            )
+        logger.info("binance_symbol_assets", count=len(symbols))
+        return symbols, response.headers.get("ETag")
+
     async def _fetch_with_fallback(self, path: str, params: dict) -> list | dict:
         """Make a GET request, falling back to the US endpoint on geo-block (451/403)."""
+        response = await self._get_with_fallback(path, params)
+        return response.json()
+
+    async def _get_with_fallback(
+        self,
+        path: str,
+        params: dict,
+        headers: dict | None = None,
+    ) -> httpx.Response:
+        """GET `path`, retrying once on the US endpoint when geo-blocked.
+
+        Raises httpx.HTTPStatusError for error statuses; 304 Not Modified
+        is returned like a success for conditional requests.
+        """
         global _use_fallback
 
         async with httpx.AsyncClient() as client:
             url = f"{self._base_url}{path}"
             try:
-                response = await client.get(url, params=params, timeout=30.0)
-                response.raise_for_status()
-                return response.json()
+                response = await client.get(url, params=params, headers=headers, timeout=30.0)
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
             except httpx.HTTPStatusError as e:
                 status = e.response.status_code
                 # 451 = geo-blocked, 403 = forbidden (some regions)
@@ -119,8 +204,9 @@ class BinanceProvider(MarketDataProvider):
                     _use_fallback = True
                     fallback_url = f"{self._fallback_url}{path}"
                     response = await client.get(
-                        fallback_url, params=params, timeout=30.0
+                        fallback_url, params=params, headers=headers, timeout=30.0
                     )
-                    response.raise_for_status()
-                    return response.json()
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
                 raise
@@ -65,6 +65,8 @@ def _datestr_to_unix(datestr: str) -> int:
 class TwelveDataProvider(MarketDataProvider):
     """Fetch forex market data from Twelve Data REST API."""
 
+    max_page_size = 5000
+
     def __init__(self, api_key: str | None = None) -> None:
         self._api_key = api_key or settings.TWELVE_DATA_API_KEY
         self._base_url = settings.TWELVE_DATA_REST_URL
@@ -88,7 +90,7 @@ class TwelveDataProvider(MarketDataProvider):
         params: dict = {
             "symbol": symbol,
             "interval": td_interval,
-            "outputsize": min(limit, 5000),
+            "outputsize": min(limit, self.max_page_size),
             "apikey": self._api_key,
             "format": "JSON",
             "order": "asc",
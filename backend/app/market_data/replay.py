@@ -0,0 +1,372 @@
+"""Server-side bar-by-bar replay sessions on the market-data WebSocket.
+
+A replay session reveals the history of one symbol@interval candle by
+candle from a start time, so a client practising on past data never
+holds candles beyond its cursor. Sessions play at a given speed (candles
+per second) and can be paused, stepped and seeked.
+
+Candles are read in the same boundary-aligned pages as /history/pages
+(see pages.py) from a process-wide ReplayPageStore: sessions replaying
+the same market share one copy of each page, and concurrent requests for
+a page share one load. Each session keeps only its cursor and a reference
+to the page it is reading, and prefetches the next READ_AHEAD_PAGES pages
+in the background so playback does not stall on page boundaries. Paused
+sessions have no task at all.
+"""
+
+import asyncio
+import time as _time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import structlog
+from fastapi import WebSocket
+
+from app.config import settings
+from app.database import async_session
+from app.market_data.batch import CandleBatch
+from app.market_data.pages import (
+    PAGE_SIZE,
+    TAIL_PAGE_MAX_AGE,
+    is_page_closed,
+    page_bounds,
+    page_for_time,
+)
+from app.market_data.resample import current_bucket_start
+from app.market_data.schemas import ReplayStatus, ReplayUpdate
+from app.market_data.service import MarketDataService
+
+logger = structlog.get_logger()
+
+# Pages loaded ahead of the one a session is reading.
+READ_AHEAD_PAGES = 2
+
+# Minimum seconds between updates; faster speeds batch several candles
+# into one message instead of sending more often.
+MIN_TICK_SECONDS = 0.05
+
+# Consecutive pages without candles after which a session ends, so a
+# cursor in a gap (before listing, a delisting) does not walk forever.
+MAX_EMPTY_PAGES = 50
+
+MAX_SESSIONS_PER_CLIENT = 4
+
+PageKey = tuple[str, str, int]
+
+
+class ReplayPageStore:
+    """Byte-budgeted LRU of candle pages shared by all replay sessions.
+
+    Closed pages stay until evicted; the page holding the forming candle
+    expires after TAIL_PAGE_MAX_AGE seconds. Requests for a page that is
+    already loading await the same load.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[PageKey, tuple[CandleBatch, float]] = OrderedDict()
+        self._loading: dict[PageKey, asyncio.Task] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+
+    def _cached(self, key: PageKey) -> CandleBatch | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        batch, expires_at = entry
+        if expires_at < _time.monotonic():
+            self._remove(key)
+            return None
+        return batch
+
+    async def get(self, symbol: str, interval: str, page: int) -> CandleBatch:
+        key = (symbol, interval, page)
+        batch = self._cached(key)
+        if batch is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return batch
+        self.misses += 1
+        # Shielded: a session cancelled mid-load must not cancel the load
+        # for other sessions waiting on the same page.
+        return await asyncio.shield(self._start_load(key))
+
+    def prefetch(self, symbol: str, interval: str, page: int) -> None:
+        """Start loading a page in the background if it is not cached."""
+        key = (symbol, interval, page)
+        if key in self._loading or self._cached(key) is not None:
+            return
+        self.prefetches += 1
+        self._start_load(key)
+
+    def _start_load(self, key: PageKey) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key), name=f"replay-page-{key}")
+            task.add_done_callback(self._load_done)
+            self._loading[key] = task
+        return task
+
+    async def _load(self, key: PageKey) -> CandleBatch:
+        symbol, interval, page = key
+        start_time, end_time = page_bounds(interval, page)
+        try:
+            async with async_session() as session:
+                service = MarketDataService(session)
+                batch = await service.get_historical_batch(
+                    symbol, interval, start_time, end_time, PAGE_SIZE
+                )
+                await session.commit()
+        finally:
+            self._loading.pop(key, None)
+        batch = batch.between(start_time, end_time)
+        self._put(key, batch)
+        return batch
+
+    @staticmethod
+    def _load_done(task: asyncio.Task) -> None:
+        # Prefetch failures have no awaiter; log them here. The page is
+        # simply loaded again when a session reaches it.
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("replay_page_load_failed", task=task.get_name(), error=str(task.exception()))
+
+    def _put(self, key: PageKey, batch: CandleBatch) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if batch.nbytes > self._max_bytes:
+            return
+        _, interval, page = key
+        expires_at = (
+            float("inf")
+            if is_page_closed(interval, page)
+            else _time.monotonic() + TAIL_PAGE_MAX_AGE
+        )
+        self._entries[key] = (batch, expires_at)
+        self._bytes += batch.nbytes
+        while self._bytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: PageKey) -> None:
+        batch, _ = self._entries.pop(key)
+        self._bytes -= batch.nbytes
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "misses": self.misses,
+            "prefetches": self.prefetches,
+        }
+
+
+replay_pages = ReplayPageStore(settings.REPLAY_PAGE_CACHE_BYTES)
+
+
+class ReplaySession:
+    """One client's replay of symbol@interval from a cursor.
+
+    `cursor` is the earliest open time not yet revealed; every candle sent
+    is older than it. Commands and playback are serialized by a lock.
+    """
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+        speed: float,
+        store: ReplayPageStore = replay_pages,
+    ) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.ws = ws
+        self.symbol = symbol
+        self.interval = interval
+        self.cursor = start_time
+        self.end_time = end_time
+        self.speed = speed
+        self.store = store
+        self.task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def playing(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    @property
+    def ended(self) -> bool:
+        return self.cursor > self.end_time
+
+    def state(self) -> str:
+        if self.ended:
+            return "ended"
+        return "playing" if self.playing else "paused"
+
+    def status(self, state: str | None = None) -> dict:
+        return ReplayStatus(
+            session=self.id,
+            symbol=self.symbol,
+            interval=self.interval,
+            state=state or self.state(),
+            time=self.cursor,
+            speed=self.speed,
+        ).model_dump()
+
+    async def _take(self, count: int) -> CandleBatch:
+        """Advance the cursor past up to `count` candles and return them."""
+        chunks = []
+        taken = empty_pages = 0
+        while taken < count and not self.ended:
+            page = page_for_time(self.interval, self.cursor)
+            batch = await self.store.get(self.symbol, self.interval, page)
+            for ahead in range(page + 1, page + 1 + READ_AHEAD_PAGES):
+                if page_bounds(self.interval, ahead)[0] > self.end_time:
+                    break
+                self.store.prefetch(self.symbol, self.interval, ahead)
+
+            lo = int(np.searchsorted(batch.time, self.cursor, "left"))
+            hi = int(np.searchsorted(batch.time, self.end_time, "right"))
+            chunk = batch[lo : min(hi, lo + count - taken)]
+            if len(chunk):
+                chunks.append(chunk)
+                taken += len(chunk)
+                self.cursor = int(chunk.time[-1]) + 1
+                empty_pages = 0
+                continue
+
+            self.cursor = page_bounds(self.interval, page)[1] + 1
+            empty_pages += 1
+            if empty_pages >= MAX_EMPTY_PAGES:
+                logger.info("replay_no_more_data", session=self.id, symbol=self.symbol)
+                self.cursor = self.end_time + 1
+        return CandleBatch.concat(chunks) if chunks else CandleBatch.empty()
+
+    async def _reveal(self, count: int) -> None:
+        candles = await self._take(count)
+        if len(candles):
+            await self.ws.send_json(
+                ReplayUpdate(
+                    session=self.id,
+                    symbol=self.symbol,
+                    interval=self.interval,
+                    candles=candles.to_candles(),
+                ).model_dump()
+            )
+        if self.ended:
+            await self.ws.send_json(self.status("ended"))
+
+    async def step(self, count: int) -> None:
+        """Reveal the next `count` candles (playback continues if running)."""
+        async with self._lock:
+            await self._reveal(count)
+
+    async def seek(self, time: int) -> None:
+        """Move the cursor; the client reloads history up to `time` itself."""
+        async with self._lock:
+            self.cursor = time
+
+    def play(self) -> None:
+        if not self.playing and not self.ended:
+            self.task = asyncio.create_task(self._run(), name=f"replay-{self.id}")
+
+    def pause(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.ended:
+                per_tick = max(1, round(self.speed * MIN_TICK_SECONDS))
+                started = loop.time()
+                async with self._lock:
+                    await self._reveal(per_tick)
+                await asyncio.sleep(max(0.0, per_tick / self.speed - (loop.time() - started)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("replay_failed", session=self.id, symbol=self.symbol, error=str(e))
+            try:
+                await self.ws.send_json({"error": "Replay failed", "detail": str(e), "session": self.id})
+            except Exception:
+                pass
+
+
+class ReplayManager:
+    """Track replay sessions and the WebSockets that own them."""
+
+    def __init__(self, max_sessions: int) -> None:
+        self._max_sessions = max_sessions
+        self._sessions: dict[str, ReplaySession] = {}
+        self._connections: dict[WebSocket, set[str]] = {}
+
+    def create(
+        self,
+        ws: WebSocket,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int | None,
+        speed: float,
+    ) -> ReplaySession:
+        """Open a paused session at `start_time`.
+
+        The replay never goes past the last closed candle at creation.
+        Raises ValueError when a session limit is reached.
+        """
+        owned = self._connections.setdefault(ws, set())
+        if len(owned) >= MAX_SESSIONS_PER_CLIENT:
+            raise ValueError(f"At most {MAX_SESSIONS_PER_CLIENT} replay sessions per connection")
+        if len(self._sessions) >= self._max_sessions:
+            raise ValueError("Too many replay sessions, try again later")
+
+        last_closed = current_bucket_start(interval) - 1
+        end_time = last_closed if end_time is None else min(end_time, last_closed)
+        session = ReplaySession(ws, symbol, interval, start_time, end_time, speed)
+        self._sessions[session.id] = session
+        owned.add(session.id)
+        logger.info(
+            "replay_session_created",
+            session=session.id,
+            symbol=symbol,
+            interval=interval,
+            start_time=start_time,
+            sessions=len(self._sessions),
+        )
+        return session
+
+    def get(self, ws: WebSocket, session_id: str | None) -> ReplaySession | None:
+        """The client's session with `session_id`, if it owns one."""
+        if session_id not in self._connections.get(ws, ()):
+            return None
+        return self._sessions.get(session_id)
+
+    def close(self, ws: WebSocket, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.pause()
+        owned = self._connections.get(ws)
+        if owned is not None:
+            owned.discard(session_id)
+
+    def drop_client(self, ws: WebSocket) -> None:
+        """Stop every session of a disconnected client."""
+        for session_id in self._connections.pop(ws, set()):
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                session.pause()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "playing": sum(s.playing for s in self._sessions.values()),
+            "max_sessions": self._max_sessions,
+        }
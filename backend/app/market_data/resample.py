@@ -0,0 +1,194 @@
+"""Vectorized resampling of candle batches into coarser intervals.
+
+Any interval accepted by parse_interval (e.g. 2H, 3H, 12H, 3D, 2W) can be
+built from a finer base interval whose candles tile it exactly. Bucket
+boundaries follow provider conventions:
+
+- m / H: multiples of the interval since the Unix epoch (UTC).
+- D: local midnights in the requested timezone, every Nth day since
+  1970-01-01.
+- W: local Monday midnights (Binance weekly candles open on Monday).
+- M: local first-of-month midnights.
+
+Calendar boundaries are generated once per calendar day in Python. Candles
+are assigned to buckets with np.searchsorted and aggregated with ufunc
+reduceat, so the cost per candle is vectorized.
+"""
+
+import time as _time
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.market_data.batch import CandleBatch
+from app.market_data.schemas import INTERVAL_SECONDS, interval_seconds, parse_interval
+
+UTC = ZoneInfo("UTC")
+
+# Standard intervals usable as resampling bases, coarsest first. 1W and 1M
+# are excluded: no other interval tiles them exactly.
+BASE_INTERVALS: tuple[str, ...] = ("1D", "4H", "1H", "30m", "15m", "5m", "1m")
+
+_EPOCH_DATE = date(1970, 1, 1)
+# 1970-01-05 was the first Monday after the epoch.
+_FIRST_MONDAY_ORDINAL = 4
+
+
+def _is_arithmetic(unit: str, tz: ZoneInfo) -> bool:
+    """True when bucket starts are plain multiples of the interval length."""
+    return unit in ("m", "H") or (unit == "D" and tz.key == "UTC")
+
+
+def _local_midnight(day: date, tz: ZoneInfo) -> int:
+    return int(datetime.combine(day, time(0), tzinfo=tz).timestamp())
+
+
+def calendar_boundaries(interval: str, start: int, end: int, tz: ZoneInfo) -> np.ndarray:
+    """Return bucket start timestamps covering [start, end].
+
+    The first boundary is at or before `start` and the last one is after
+    `end`, so every timestamp in the span falls between two boundaries.
+    """
+    count, unit = parse_interval(interval)
+    if _is_arithmetic(unit, tz):
+        sec = interval_seconds(interval)
+        first = start // sec * sec
+        return np.arange(first, end + 2 * sec, sec, dtype=np.int64)
+
+    first_day = datetime.fromtimestamp(start, tz).date() - timedelta(days=1)
+    last_day = datetime.fromtimestamp(end, tz).date() + timedelta(days=1)
+    days: list[date] = []
+
+    if unit == "D":
+        ordinal = (first_day - _EPOCH_DATE).days
+        day = first_day - timedelta(days=ordinal % count)
+        while day <= last_day + timedelta(days=count):
+            days.append(day)
+            day += timedelta(days=count)
+    elif unit == "W":
+        step = 7 * count
+        ordinal = (first_day - _EPOCH_DATE).days - _FIRST_MONDAY_ORDINAL
+        day = first_day - timedelta(days=ordinal % step)
+        while day <= last_day + timedelta(days=step):
+            days.append(day)
+            day += timedelta(days=step)
+    else:  # "M"
+        month_index = first_day.year * 12 + first_day.month - 1
+        month_index -= month_index % count
+        last_index = last_day.year * 12 + last_day.month - 1 + count
+        while month_index <= last_index:
+            days.append(date(month_index // 12, month_index % 12 + 1, 1))
+            month_index += count
+
+    return np.array([_local_midnight(d, tz) for d in days], dtype=np.int64)
+
+
+def bucket_starts(times: np.ndarray, interval: str, tz: ZoneInfo) -> np.ndarray:
+    """Return the bucket start time for every timestamp in `times` (sorted)."""
+    _, unit = parse_interval(interval)
+    if _is_arithmetic(unit, tz):
+        sec = interval_seconds(interval)
+        return times // sec * sec
+    boundaries = calendar_boundaries(interval, int(times[0]), int(times[-1]), tz)
+    return boundaries[np.searchsorted(boundaries, times, "right") - 1]
+
+
+def current_bucket_start(interval: str, now: int | None = None, tz: ZoneInfo = UTC) -> int:
+    """Open time of the bucket containing `now`, i.e. of the forming candle."""
+    now = int(_time.time()) if now is None else now
+    return int(bucket_starts(np.array([now], dtype=np.int64), interval, tz)[0])
+
+
+def resample(batch: CandleBatch, interval: str, tz: ZoneInfo = UTC) -> CandleBatch:
+    """Aggregate a chronologically sorted batch into `interval` buckets.
+
+    Buckets are emitted only where base candles exist. The last bucket may
+    be partial (the forming candle); callers that need the first bucket to
+    be complete must pass base data starting at a bucket boundary.
+    """
+    if not len(batch):
+        return CandleBatch.empty()
+
+    starts = bucket_starts(batch.time, interval, tz)
+    edges = np.flatnonzero(np.diff(starts)) + 1
+    first = np.concatenate(([0], edges))
+    last = np.concatenate((edges, [len(batch)])) - 1
+
+    return CandleBatch(
+        starts[first],
+        batch.open[first],
+        np.maximum.reduceat(batch.high, first),
+        np.minimum.reduceat(batch.low, first),
+        batch.close[last],
+        np.add.reduceat(batch.volume, first),
+    )
+
+
+def needs_resampling(interval: str, tz: ZoneInfo) -> bool:
+    """True if no provider serves this interval/timezone combination directly.
+
+    That is the case for custom intervals, and for daily-or-longer intervals
+    aligned to a non-UTC timezone.
+    """
+    if interval not in INTERVAL_SECONDS:
+        return True
+    _, unit = parse_interval(interval)
+    return unit in ("D", "W", "M") and tz.key != "UTC"
+
+
+def choose_base_interval(
+    interval: str,
+    tz: ZoneInfo,
+    start: int,
+    end: int,
+) -> str | None:
+    """Pick the coarsest standard interval whose candles tile `interval` exactly.
+
+    A base qualifies when it is strictly finer than the target and every
+    bucket boundary in [start, end] is a multiple of its length, which
+    accounts for timezone offsets (including half-hour zones and DST).
+    """
+    target_sec = interval_seconds(interval)
+    boundaries = calendar_boundaries(interval, start, end, tz)
+    for base in BASE_INTERVALS:
+        base_sec = INTERVAL_SECONDS[base]
+        if base_sec >= target_sec:
+            continue
+        if np.all(boundaries % base_sec == 0):
+            return base
+    return None
+
+
+class ResampleCache:
+    """Small TTL + LRU cache of resampled responses.
+
+    Keys are the full request (symbol, interval, timezone, start, end,
+    limit). Ranges that are entirely closed live for an hour; ranges that
+    include the forming bucket expire quickly so its close stays fresh.
+    """
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, CandleBatch]] = OrderedDict()
+
+    def get(self, key: tuple) -> CandleBatch | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, batch = item
+        if expires_at < _time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return batch
+
+    def put(self, key: tuple, batch: CandleBatch, ttl: float) -> None:
+        self._entries[key] = (_time.monotonic() + ttl, batch)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+resample_cache = ResampleCache()
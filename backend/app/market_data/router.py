@@ -2,27 +2,113 @@
 
 WebSocket at /ws accepts subscribe/unsubscribe messages and relays real-time
 price updates from upstream providers. REST endpoints serve historical candle
-data and available symbol listings.
+data, server-side indicators and available symbol listings.
 """
 
-from typing import Annotated
+import asyncio
+import time as _time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Annotated, Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import httpx
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.auth.dependencies import get_optional_user
+from app.config import settings
+from app.database import async_session, get_db
+from app.market_data.batch import CandleBatch
+from app.market_data.channels import (
+    ChannelManager,
+    IndicatorChannel,
+    LevelsChannel,
+    TransformChannel,
+    seed_channel,
+)
 from app.market_data.connection_manager import ConnectionManager
+from app.market_data.encoding import (
+    MEDIA_TYPES,
+    STREAM_MEDIA_TYPES,
+    HistoryFormat,
+    StreamFormat,
+    encode_batch,
+    encode_binary,
+    encode_ndjson,
+    negotiate_format,
+)
+from app.market_data.indicator_cache import indicator_cache
+from app.market_data.indicators import (
+    compute_indicator,
+    resolve_params,
+    series_to_list,
+    warmup_candles,
+)
+from app.market_data.resample import UTC, current_bucket_start
 from app.market_data.schemas import (
+    INTERVAL_SECONDS,
     AssetClass,
     ConnectionStatus,
     HistoricalResponse,
-    OHLCVCandle,
+    IndicatorRequest,
+    IndicatorResponse,
+    IndicatorResult,
+    MultiTimeframeResponse,
+    ReplayMessage,
+    SparklineSeries,
+    SparklinesResponse,
     SubscribeMessage,
+    SymbolMatch,
+    SymbolMeta,
+    SymbolSearchResponse,
+    TickerMessage,
+    TradesResponse,
+    TransformName,
+    VolumeProfileResponse,
+    detect_asset_class,
+    interval_seconds,
+    parse_interval,
+)
+from app.market_data.mtf import MAX_INTERVALS, load_aligned
+from app.market_data.pages import (
+    PAGE_SIZE,
+    build_page_entry,
+    page_bounds,
+    page_cache,
 )
+from app.market_data.prefetch import history_prefetcher
+from app.market_data.providers.binance import BinanceProvider
+from app.market_data.replay import ReplayManager, replay_pages
 from app.market_data.service import MarketDataService
 from app.market_data.stream_manager import StreamManager
+from app.market_data.symbol_registry import SymbolIndex, SymbolInfo, symbol_registry
+from app.market_data.trade_store import trade_store
+from app.market_data.transforms import (
+    ACTIVITY_ANCHOR_SECONDS,
+    BRICK_TRANSFORMS,
+    apply_transform,
+    check_brick_size,
+    resolve_transform_params,
+    trade_rows,
+    transform_warmup,
+)
+from app.market_data.volume_profile import build_profile, day_profile_cache
+from app.users.models import UserPreference
 
 logger = structlog.get_logger()
 
@@ -30,7 +116,21 @@ router = APIRouter(prefix="/api/v1/market-data", tags=["market-data"])
 
 # Module-level singletons persisted across requests
 connection_manager = ConnectionManager()
-stream_manager = StreamManager(connection_manager)
+channel_manager = ChannelManager()
+stream_manager = StreamManager(connection_manager, channel_manager)
+replay_manager = ReplayManager(settings.REPLAY_MAX_SESSIONS)
+
+# Most recorded trades read to build one /history?source=trades response.
+MAX_TRANSFORM_TRADES = 2_000_000
+
+# Lower limit for renko and range bars, which step through trades one by one.
+MAX_BRICK_TRANSFORM_TRADES = 250_000
+
+# Most symbols in one /sparklines request.
+MAX_SPARKLINE_SYMBOLS = 100
+
+# Strong references to in-flight channel warm-up tasks.
+_seed_tasks: set[asyncio.Task] = set()
 
 
 @router.websocket("/ws")
@@ -41,7 +141,18 @@ async def websocket_endpoint(ws: WebSocket) -> None:
     1. Server sends ConnectionStatus with status="connected" on connect
     2. Client sends SubscribeMessage to subscribe/unsubscribe
     3. Server sends SubscriptionConfirm + streams PriceUpdate messages
-    4. On disconnect, all client subscriptions are cleaned up
+    4. SubscribeMessage with an `indicator` or `transform` spec
+       (un)subscribes a shared channel instead; its IndicatorUpdate /
+       TransformUpdate messages are computed once per tick for all
+       subscribers of the same channel
+       (`levels: true` subscribes the symbol's higher-timeframe levels,
+       pushed as LevelsUpdate when a day / week / month candle closes)
+    5. Messages with action="replay" drive bar-by-bar replay sessions
+       (see replay.py), answered with ReplayStatus / ReplayUpdate
+    6. Messages with action="ticker" set the client's watchlist for live
+       tickers from the shared all-market feed (see ticker_feed.py),
+       answered with TickerUpdate for changed entries
+    7. On disconnect, all client subscriptions and replays are cleaned up
     """
     await connection_manager.connect(ws)
 
@@ -56,6 +167,13 @@ async def websocket_endpoint(ws: WebSocket) -> None:
         while True:
             data = await ws.receive_json()
 
+            if isinstance(data, dict) and data.get("action") == "replay":
+                await _handle_replay_message(ws, data)
+                continue
+            if isinstance(data, dict) and data.get("action") == "ticker":
+                await _handle_ticker_message(ws, data)
+                continue
+
             try:
                 msg = SubscribeMessage(**data)
             except Exception as e:
@@ -65,12 +183,16 @@ async def websocket_endpoint(ws: WebSocket) -> None:
                 )
                 continue
 
-            if msg.action == "subscribe":
+            if msg.indicator is not None or msg.transform is not None or msg.levels:
+                await _handle_channel_message(ws, msg)
+
+            elif msg.action == "subscribe":
                 is_first = connection_manager.subscribe(
                     ws, msg.symbol, msg.interval
                 )
                 if is_first:
                     stream_manager.start_stream(msg.symbol, msg.interval)
+                    history_prefetcher.warm(msg.symbol, msg.interval)
 
                 await ws.send_json(
                     {
@@ -81,11 +203,8 @@ async def websocket_endpoint(ws: WebSocket) -> None:
                 )
 
             elif msg.action == "unsubscribe":
-                is_last = connection_manager.unsubscribe(
-                    ws, msg.symbol, msg.interval
-                )
-                if is_last:
-                    stream_manager.stop_stream(msg.symbol, msg.interval)
+                connection_manager.unsubscribe(ws, msg.symbol, msg.interval)
+                stream_manager.release_stream(msg.symbol, msg.interval)
 
                 await ws.send_json(
                     {
@@ -96,20 +215,178 @@ async def websocket_endpoint(ws: WebSocket) -> None:
                 )
 
     except WebSocketDisconnect:
-        orphaned_keys = connection_manager.disconnect(ws)
-        for key in orphaned_keys:
-            parts = key.split("@", 1)
-            if len(parts) == 2:
-                stream_manager.stop_stream(parts[0], parts[1])
+        stream_manager.drop_client(ws)
+        replay_manager.drop_client(ws)
         logger.info("ws_client_disconnected_cleanly")
 
     except Exception as e:
         logger.error("ws_client_error", error=str(e))
-        orphaned_keys = connection_manager.disconnect(ws)
-        for key in orphaned_keys:
-            parts = key.split("@", 1)
-            if len(parts) == 2:
-                stream_manager.stop_stream(parts[0], parts[1])
+        stream_manager.drop_client(ws)
+        replay_manager.drop_client(ws)
+
+
+async def _handle_channel_message(ws: WebSocket, msg: SubscribeMessage) -> None:
+    """(Un)subscribe a client to a shared indicator, transform or levels channel.
+
+    The first subscriber of a channel creates it and triggers loading its
+    warm-up history in the background; the upstream stream is started if
+    it is not already running for raw price subscribers. A client joining
+    a live levels channel gets the current levels right away.
+    """
+    if (msg.indicator is not None) + (msg.transform is not None) + msg.levels > 1:
+        await ws.send_json(
+            {
+                "error": "Invalid message format",
+                "detail": "Set only one of indicator, transform or levels",
+            }
+        )
+        return
+    try:
+        if msg.levels:
+            channel = LevelsChannel(msg.symbol)
+        elif msg.indicator is not None:
+            params = resolve_params(msg.indicator.name, msg.indicator.params)
+            channel = IndicatorChannel(msg.symbol, msg.interval, msg.indicator.name, params)
+        else:
+            params = resolve_transform_params(msg.transform.name, msg.transform.params)
+            channel = TransformChannel(msg.symbol, msg.interval, msg.transform.name, params)
+    except ValueError as e:
+        kind = "indicator" if msg.indicator is not None else "transform"
+        await ws.send_json({"error": f"Invalid {kind}", "detail": str(e)})
+        return
+
+    is_brick = msg.transform is not None and msg.transform.name in BRICK_TRANSFORMS
+    if msg.action == "subscribe" and is_brick:
+        # Bricks far below the price scale would flood every tick with bars.
+        price = await _latest_close(msg.symbol, msg.interval)
+        if price is not None:
+            try:
+                check_brick_size(msg.transform.name, params, price)
+            except ValueError as e:
+                await ws.send_json({"error": "Invalid transform", "detail": str(e)})
+                return
+
+    if msg.action == "subscribe":
+        channel, is_new = channel_manager.subscribe(ws, channel)
+        if is_new:
+            task = asyncio.create_task(seed_channel(channel), name=f"seed-{channel.key}")
+            _seed_tasks.add(task)
+            task.add_done_callback(_seed_tasks.discard)
+        stream_manager.start_stream(channel.symbol, channel.interval)
+        await ws.send_json(
+            {
+                "type": "subscribed",
+                "symbol": msg.symbol,
+                "interval": msg.interval,
+                "channel": channel.id,
+            }
+        )
+        snapshot = channel.snapshot() if channel.ready else None
+        if snapshot is not None:
+            await ws.send_json(snapshot)
+    else:
+        channel_manager.unsubscribe(ws, channel.key)
+        stream_manager.release_stream(channel.symbol, channel.interval)
+        await ws.send_json(
+            {
+                "type": "unsubscribed",
+                "symbol": msg.symbol,
+                "interval": msg.interval,
+                "channel": channel.id,
+            }
+        )
+
+
+async def _latest_close(symbol: str, interval: str) -> float | None:
+    """Close of the newest candle, or None if it cannot be loaded."""
+    try:
+        async with async_session() as session:
+            service = MarketDataService(session)
+            batch = await service.get_historical_batch(symbol, interval, limit=1)
+            await session.commit()
+    except Exception as e:
+        logger.warning("latest_close_failed", symbol=symbol, interval=interval, error=str(e))
+        return None
+    return float(batch.close[-1]) if len(batch) else None
+
+
+async def _handle_ticker_message(ws: WebSocket, data: dict) -> None:
+    """Set the client's live ticker watchlist (crypto symbols only)."""
+    try:
+        msg = TickerMessage(**data)
+    except Exception as e:
+        logger.warning("invalid_ws_message", error=str(e), data=data)
+        await ws.send_json({"error": "Invalid message format", "detail": str(e)})
+        return
+
+    symbols = [s for s in msg.symbols if detect_asset_class(s) == AssetClass.CRYPTO]
+    try:
+        await stream_manager.ticker_feed.watch(ws, symbols)
+    except ValueError as e:
+        await ws.send_json({"error": "Invalid ticker watchlist", "detail": str(e)})
+        return
+    await ws.send_json({"type": "ticker_watching", "symbols": symbols})
+
+
+async def _handle_replay_message(ws: WebSocket, data: dict) -> None:
+    """Run one replay command and answer with the session's status.
+
+    Replays read closed history only, so they need no upstream stream.
+    """
+    try:
+        msg = ReplayMessage(**data)
+    except Exception as e:
+        logger.warning("invalid_ws_message", error=str(e), data=data)
+        await ws.send_json({"error": "Invalid message format", "detail": str(e)})
+        return
+
+    if msg.command == "start":
+        try:
+            if msg.symbol is None or msg.interval is None or msg.start_time is None:
+                raise ValueError("start needs symbol, interval and start_time")
+            parse_interval(msg.interval)
+            session = replay_manager.create(
+                ws, msg.symbol, msg.interval, msg.start_time, msg.end_time, msg.speed or 1.0
+            )
+        except ValueError as e:
+            await ws.send_json({"error": "Invalid replay", "detail": str(e)})
+            return
+        await ws.send_json(session.status())
+        return
+
+    session = replay_manager.get(ws, msg.session)
+    if session is None:
+        await ws.send_json({"error": "Unknown replay session", "session": msg.session})
+        return
+
+    if msg.command == "stop":
+        replay_manager.close(ws, session.id)
+        await ws.send_json(session.status("stopped"))
+        return
+
+    try:
+        if msg.command == "play":
+            session.play()
+        elif msg.command == "pause":
+            session.pause()
+        elif msg.command == "step":
+            await session.step(msg.count)
+        elif msg.command == "seek":
+            if msg.time is None:
+                raise ValueError("seek needs time")
+            await session.seek(msg.time)
+        elif msg.command == "speed":
+            if msg.speed is None:
+                raise ValueError("speed needs speed")
+            session.speed = msg.speed
+    except ValueError as e:
+        await ws.send_json({"error": "Invalid replay", "detail": str(e), "session": session.id})
+        return
+    except (httpx.HTTPError, RuntimeError) as e:
+        logger.warning("replay_failed", session=session.id, error=str(e))
+        await ws.send_json({"error": "Replay failed", "detail": str(e), "session": session.id})
+        return
+    await ws.send_json(session.status())
 
 
 @router.get("/history", response_model=HistoricalResponse)
@@ -117,23 +394,250 @@ async def get_history(
     symbol: Annotated[str, Query(description="Trading symbol (e.g. BTCUSDT, EUR/USD)")],
     interval: Annotated[str, Query(description="Timeframe interval (e.g. 1m, 1H, 1D)")],
     db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
     start_time: Annotated[int | None, Query(description="Start time Unix seconds")] = None,
     end_time: Annotated[int | None, Query(description="End time Unix seconds")] = None,
     limit: Annotated[int, Query(ge=1, le=5000, description="Max candles to return")] = 500,
-) -> HistoricalResponse:
+    format_param: Annotated[
+        HistoryFormat | None,
+        Query(alias="format", description="Response format; overrides the Accept header"),
+    ] = None,
+    tz: Annotated[
+        str | None,
+        Query(description="IANA timezone for daily/weekly/monthly alignment (default: user preference, else UTC)"),
+    ] = None,
+    transform: Annotated[
+        TransformName | None,
+        Query(description="Chart transform (heikin_ashi, renko, range, tick, volume, dollar)"),
+    ] = None,
+    brick_size: Annotated[
+        float | None,
+        Query(gt=0, description="Brick / bar size in price units for renko and range"),
+    ] = None,
+    threshold: Annotated[
+        float | None,
+        Query(gt=0, description="Base (volume) or quote (dollar) volume per bar"),
+    ] = None,
+    ticks: Annotated[int | None, Query(ge=1, description="Trades per tick bar")] = None,
+    source: Annotated[
+        Literal["candles", "trades"],
+        Query(description="Build brick / activity bars from candles or recorded trades"),
+    ] = "candles",
+    accept: Annotated[str | None, Header()] = None,
+    user: Annotated[dict | None, Depends(get_optional_user)] = None,
+) -> HistoricalResponse | Response:
     """Fetch historical OHLCV candles for a symbol.
 
     Uses cache-first strategy: checks DB cache, fetches from provider on miss.
+    Custom intervals (e.g. 2H, 3H, 12H, 3D) and timezone-aligned daily or
+    weekly bars are resampled server-side from finer cached candles.
+
+    The response format is negotiated from `format` or the Accept header:
+    the default JSON object list, or a compact columnar / binary / Arrow
+    encoding serialized directly from the candle batch (see encoding.py).
+
+    `transform` returns Heikin-Ashi candles, Renko / range bars or tick /
+    volume / dollar bars instead (see transforms.py); non-Heikin-Ashi bars
+    do not line up one-to-one with the source candles. With
+    `source=trades` they are built from recorded aggregated trades over
+    the span of the loaded candles; tick bars require it.
+
+    Scrolling back (successive windows ending just before the previous
+    one, per user or anonymous client address) makes the server load the
+    next older window in the background (see prefetch.py).
     """
-    service = MarketDataService(db)
+    _validate_interval(interval)
+    fmt = negotiate_format(format_param, accept)
+    zone = await _resolve_timezone(db, tz, user)
+    await history_prefetcher.wait(symbol, interval, zone, start_time, end_time, limit)
+    batch = await _load_history_batch(db, symbol, interval, start_time, end_time, limit, zone)
+    history_prefetcher.observe(
+        _client_key(request, user), symbol, interval, zone, start_time, end_time, limit, batch
+    )
+    if transform is not None:
+        params = {
+            key: value
+            for key, value in (("brick_size", brick_size), ("threshold", threshold), ("ticks", ticks))
+            if value is not None
+        }
+        batch = await _transform_batch(db, symbol, interval, batch, transform, params, source)
+
+    if fmt == HistoryFormat.JSON:
+        return HistoricalResponse(
+            symbol=symbol,
+            interval=interval,
+            candles=batch.to_candles(),
+        )
+
+    meta = await _symbol_meta(symbol, fmt)
+    started = _time.perf_counter()
+    try:
+        body = encode_batch(fmt, symbol, interval, batch, meta)
+    except RuntimeError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    encode_ms = (_time.perf_counter() - started) * 1000
+    return Response(
+        content=body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Server-Timing": f"encode;dur={encode_ms:.2f}", "Vary": "Accept"},
+    )
+
+
+async def _transform_batch(
+    db: AsyncSession,
+    symbol: str,
+    interval: str,
+    batch: CandleBatch,
+    name: str,
+    params: dict,
+    source: str = "candles",
+) -> CandleBatch:
+    """Apply a chart transform, loading its warm-up candles first."""
+    try:
+        params = resolve_transform_params(name, params)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not len(batch):
+        return batch
+    if source == "trades":
+        return await _transform_trades(symbol, interval, batch, name, params)
+
+    warm = CandleBatch.empty()
+    count = transform_warmup(name, interval, int(batch.time[0]))
+    if count:
+        service = MarketDataService(db)
+        with _provider_errors(symbol):
+            warm = await service.get_warmup(symbol, interval, int(batch.time[0]), count)
+    with _provider_errors(symbol):
+        out = await asyncio.to_thread(
+            apply_transform, CandleBatch.concat([warm, batch]), name, params
+        )
+    # Bars starting in the warm-up are dropped by time.
+    return out.between(int(batch.time[0]), None) if len(warm) else out
+
+
+async def _transform_trades(
+    symbol: str,
+    interval: str,
+    batch: CandleBatch,
+    name: str,
+    params: dict,
+) -> CandleBatch:
+    """Build bars from recorded trades over the span of `batch`.
+
+    Trades are read from the UTC midnight before the span so activity
+    bars line up with their daily grid.
+    """
+    first = int(batch.time[0])
+    start_ms = (first - first % ACTIVITY_ANCHOR_SECONDS) * 1000
+    end_ms = (int(batch.time[-1]) + interval_seconds(interval)) * 1000 - 1
+    cap = MAX_BRICK_TRANSFORM_TRADES if name in BRICK_TRANSFORMS else MAX_TRANSFORM_TRADES
+    trades = await asyncio.to_thread(trade_store.read, symbol.upper(), start_ms, end_ms, cap + 1)
+    if not len(trades):
+        raise HTTPException(status_code=422, detail=f"No recorded trades for {symbol} in this range")
+    if len(trades) > cap:
+        raise HTTPException(
+            status_code=422,
+            detail=f"More than {cap} trades in this range; request fewer candles",
+        )
     try:
-        candles: list[OHLCVCandle] = await service.get_historical_candles(
+        out = await asyncio.to_thread(
+            apply_transform, trade_rows(trades), name, params, from_trades=True
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return out.between(first, None)
+
+
+def _client_key(request: Request, user: dict | None) -> str:
+    """Identity of a /history client for scroll tracking."""
+    if user is not None:
+        return f"user:{user['user_id']}"
+    return f"addr:{request.client.host if request.client else ''}"
+
+
+async def _symbol_meta(symbol: str, fmt: HistoryFormat) -> SymbolInfo | None:
+    """Symbol metadata for formats that need it (ticks), else None.
+
+    A registry that cannot load leaves it None; encoding then answers 406.
+    """
+    if fmt != HistoryFormat.TICKS:
+        return None
+    try:
+        index = await symbol_registry.ensure_loaded()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("symbol_registry_unavailable", error=str(e))
+        index = symbol_registry.index
+    return index.get(symbol)
+
+
+def _validate_interval(interval: str) -> None:
+    """Reject malformed intervals with 422 before touching cache or providers."""
+    try:
+        parse_interval(interval)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def _resolve_timezone(
+    db: AsyncSession,
+    tz: str | None,
+    user: dict | None,
+) -> ZoneInfo:
+    """Explicit ?tz= first, then the signed-in user's preference, else UTC."""
+    if tz is not None:
+        try:
+            return ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Unknown timezone: {tz}")
+
+    if user is None:
+        return UTC
+    try:
+        user_id = uuid.UUID(str(user.get("user_id")))
+    except ValueError:
+        logger.warning("invalid_token_user_id", user_id=user.get("user_id"))
+        return UTC
+    result = await db.execute(
+        select(UserPreference.timezone).where(UserPreference.user_id == user_id)
+    )
+    name = result.scalar_one_or_none()
+    try:
+        return ZoneInfo(name) if name else UTC
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("invalid_preference_timezone", timezone=name)
+        return UTC
+
+
+async def _load_history_batch(
+    db: AsyncSession,
+    symbol: str,
+    interval: str,
+    start_time: int | None,
+    end_time: int | None,
+    limit: int,
+    tz: ZoneInfo = UTC,
+) -> CandleBatch:
+    """Load a candle batch, mapping provider failures to 502 responses."""
+    service = MarketDataService(db)
+    with _provider_errors(symbol):
+        return await service.get_historical_batch(
             symbol=symbol,
             interval=interval,
             start_time=start_time,
             end_time=end_time,
             limit=limit,
+            tz=tz,
         )
+
+
+@contextmanager
+def _provider_errors(symbol: str) -> Iterator[None]:
+    """Map ValueError to 422 and provider HTTP/connection failures to 502."""
+    try:
+        yield
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except httpx.HTTPStatusError as e:
         logger.error(
             "provider_http_error",
@@ -151,19 +655,466 @@ async def get_history(
             status_code=502,
             detail="Could not reach market data provider",
         )
-    return HistoricalResponse(
+
+
+@router.get("/history/multi", response_model=MultiTimeframeResponse)
+async def get_history_multi(
+    symbol: Annotated[str, Query(description="Trading symbol (e.g. BTCUSDT, EUR/USD)")],
+    intervals: Annotated[str, Query(description="Comma-separated intervals (e.g. 5m,1H,4H,1D)")],
+    start_time: Annotated[int, Query(description="Window start Unix seconds")],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    end_time: Annotated[int | None, Query(description="Window end Unix seconds (default: now)")] = None,
+    tz: Annotated[
+        str | None,
+        Query(description="IANA timezone for daily/weekly/monthly alignment (default: user preference, else UTC)"),
+    ] = None,
+    user: Annotated[dict | None, Depends(get_optional_user)] = None,
+) -> MultiTimeframeResponse:
+    """Candles of several intervals over one shared window.
+
+    Loads the finest interval once and resamples the coarser ones from it
+    where its candles tile them (see mtf.py), so a multi-pane layout needs
+    a single request. Each series spans the whole buckets containing
+    start_time and end_time.
+    """
+    names = list(dict.fromkeys(i.strip() for i in intervals.split(",") if i.strip()))
+    if not names:
+        raise HTTPException(status_code=422, detail="intervals must not be empty")
+    if len(names) > MAX_INTERVALS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_INTERVALS} intervals")
+    for name in names:
+        _validate_interval(name)
+    if end_time is None:
+        end_time = int(_time.time())
+    if end_time < start_time:
+        raise HTTPException(status_code=422, detail="end_time must be >= start_time")
+
+    zone = await _resolve_timezone(db, tz, user)
+    service = MarketDataService(db)
+    with _provider_errors(symbol):
+        series = await load_aligned(service, symbol, names, start_time, end_time, zone)
+    return MultiTimeframeResponse(
         symbol=symbol,
-        interval=interval,
-        candles=candles,
+        start_time=start_time,
+        end_time=end_time,
+        series=[
+            {
+                "interval": s["interval"],
+                "base_interval": s["base_interval"],
+                "candles": s["batch"].to_candles(),
+            }
+            for s in series
+        ],
+    )
+
+
+@router.get("/sparklines", response_model=SparklinesResponse)
+async def get_sparklines(
+    symbols: Annotated[str, Query(description="Comma-separated symbols (e.g. BTCUSDT,ETHUSDT,EUR/USD)")],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    interval: Annotated[str, Query(description="Standard timeframe interval (e.g. 15m, 1H)")] = "1H",
+    count: Annotated[int, Query(ge=2, le=500, description="Candles per symbol")] = 24,
+) -> SparklinesResponse:
+    """Recent closes, last price and change of many symbols in one request.
+
+    Cached candles of every symbol come from one query; misses are fetched
+    concurrently (see MarketDataService.get_latest_batches). Last price and
+    24h change of crypto symbols come from one bulk Binance ticker call.
+    A symbol that fails to load is reported in its own `error` field.
+    """
+    names = list(dict.fromkeys(s.strip() for s in symbols.split(",") if s.strip()))
+    if not names:
+        raise HTTPException(status_code=422, detail="symbols must not be empty")
+    if len(names) > MAX_SPARKLINE_SYMBOLS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_SPARKLINE_SYMBOLS} symbols")
+    if interval not in INTERVAL_SECONDS:
+        raise HTTPException(status_code=422, detail=f"Unsupported interval: {interval}")
+
+    service = MarketDataService(db)
+    crypto = [n for n in names if detect_asset_class(n) == AssetClass.CRYPTO]
+    batches, tickers = await asyncio.gather(
+        service.get_latest_batches(names, interval, count),
+        _fetch_tickers(crypto),
     )
 
+    series = []
+    for name in names:
+        batch = batches[name]
+        if isinstance(batch, Exception):
+            series.append(
+                SparklineSeries(
+                    symbol=name,
+                    time=[],
+                    close=[],
+                    last=None,
+                    change_percent=None,
+                    error=_provider_error_detail(batch),
+                )
+            )
+            continue
+        batch = batch[-count:]
+        last = change = None
+        if name in tickers:
+            last, change = tickers[name]
+        elif len(batch):
+            last = float(batch.close[-1])
+            first = float(batch.open[0])
+            change = round((last / first - 1) * 100, 4) if first else None
+        series.append(
+            SparklineSeries(
+                symbol=name,
+                time=batch.time.tolist(),
+                close=batch.close.tolist(),
+                last=last,
+                change_percent=change,
+            )
+        )
+    return SparklinesResponse(interval=interval, series=series)
+
+
+async def _fetch_tickers(symbols: list[str]) -> dict[str, tuple[float, float]]:
+    """Bulk 24h tickers; empty on failure (callers fall back to candles)."""
+    if not symbols:
+        return {}
+    try:
+        return await BinanceProvider().fetch_24h_tickers(symbols)
+    except (httpx.HTTPError, KeyError, ValueError, TypeError) as e:
+        logger.warning("ticker_fetch_failed", symbols=len(symbols), error=str(e))
+        return {}
+
+
+def _provider_error_detail(error: Exception) -> str:
+    """Client-facing message for a failed per-symbol load, as in _provider_errors."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"Market data provider returned {error.response.status_code}"
+    if isinstance(error, httpx.RequestError):
+        return "Could not reach market data provider"
+    return str(error)
+
+
+@router.get("/trades", response_model=TradesResponse)
+async def get_trades(
+    symbol: Annotated[str, Query(description="Binance symbol with trade ingestion enabled")],
+    start_time: Annotated[int, Query(description="Start time Unix seconds")],
+    end_time: Annotated[int | None, Query(description="End time Unix seconds (default: now)")] = None,
+    limit: Annotated[int, Query(ge=1, le=100_000)] = 10_000,
+) -> TradesResponse:
+    """Recorded aggregated trades from start_time onwards.
+
+    Only symbols in TRADE_INGEST_SYMBOLS are recorded, from when ingestion
+    started; other ranges come back empty.
+    """
+    if end_time is None:
+        end_time = int(_time.time())
+    if end_time < start_time:
+        raise HTTPException(status_code=422, detail="end_time must be >= start_time")
+
+    trades = await asyncio.to_thread(
+        trade_store.read, symbol.upper(), start_time * 1000, end_time * 1000 + 999, limit + 1
+    )
+    return TradesResponse(
+        symbol=symbol.upper(),
+        id=trades.id[:limit].tolist(),
+        time=trades.time[:limit].tolist(),
+        price=trades.price[:limit].tolist(),
+        qty=trades.qty[:limit].tolist(),
+        buyer_maker=trades.buyer_maker[:limit].tolist(),
+        truncated=len(trades) > limit,
+    )
+
+
+@router.get("/volume-profile", response_model=VolumeProfileResponse)
+async def get_volume_profile(
+    symbol: Annotated[str, Query(description="Trading symbol (e.g. BTCUSDT, EUR/USD)")],
+    start_time: Annotated[int, Query(description="Range start (Unix seconds), or the anchor")],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    end_time: Annotated[int | None, Query(description="Range end Unix seconds (default: now)")] = None,
+    rows: Annotated[int, Query(ge=1, le=1000, description="Maximum number of price levels")] = 50,
+    value_area: Annotated[float, Query(gt=0, le=1, description="Value area share of volume")] = 0.7,
+) -> VolumeProfileResponse:
+    """Volume at price over [start_time, end_time] (see volume_profile.py).
+
+    Pass both bounds for a visible-range profile, or only `start_time` for
+    a profile anchored there and running to the latest candle.
+    """
+    if end_time is None:
+        end_time = int(_time.time())
+    if end_time < start_time:
+        raise HTTPException(status_code=422, detail="end_time must be >= start_time")
+
+    service = MarketDataService(db)
+    with _provider_errors(symbol):
+        profile = await build_profile(service, symbol, start_time, end_time, rows, value_area)
+    return VolumeProfileResponse(
+        symbol=symbol, start_time=start_time, end_time=end_time, **profile
+    )
+
+
+@router.post("/indicators", response_model=IndicatorResponse)
+async def get_indicators(
+    body: IndicatorRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> IndicatorResponse:
+    """Compute indicators server-side over a range of candles.
+
+    The candle range is selected like /history. The warm-up lookback each
+    indicator needs is loaded automatically before the range, so values
+    for the first returned candle are already settled. Outputs are aligned
+    with `time`; null marks slots where an indicator has no value yet.
+
+    Series are memoized per (symbol, interval, indicator, params) and
+    extended incrementally as new candles close (see indicator_cache.py).
+    """
+    _validate_interval(body.interval)
+    with _provider_errors(body.symbol):
+        resolved = [resolve_params(spec.name, spec.params) for spec in body.indicators]
+
+    batch = await _load_history_batch(
+        db, body.symbol, body.interval, body.start_time, body.end_time, body.limit
+    )
+    if not len(batch):
+        return IndicatorResponse(symbol=body.symbol, interval=body.interval, time=[], indicators=[])
+
+    first_time = int(batch.time[0])
+    forming_time = current_bucket_start(body.interval)
+    with _provider_errors(body.symbol):
+        warmups = [
+            warmup_candles(spec.name, params, body.interval, first_time)
+            for spec, params in zip(body.indicators, resolved)
+        ]
+
+    started = _time.perf_counter()
+    series = [
+        indicator_cache.get(body.symbol, body.interval, spec.name, params, batch, forming_time)
+        for spec, params in zip(body.indicators, resolved)
+    ]
+    missing = [i for i, outputs in enumerate(series) if outputs is None]
+
+    warm = CandleBatch.empty()
+    if missing:
+        service = MarketDataService(db)
+        with _provider_errors(body.symbol):
+            warm = await service.get_warmup(
+                body.symbol, body.interval, first_time, max(warmups[i] for i in missing)
+            )
+        full = CandleBatch.concat([warm, batch])
+        for i in missing:
+            spec, params = body.indicators[i], resolved[i]
+            outputs = {
+                k: v[len(warm) :] for k, v in compute_indicator(full, spec.name, params).items()
+            }
+            indicator_cache.put(
+                body.symbol, body.interval, spec.name, params, batch, outputs, warm, forming_time
+            )
+            series[i] = outputs
+            warmups[i] = min(warmups[i], len(warm))
+
+    results = [
+        IndicatorResult(
+            name=spec.name,
+            params=params,
+            warmup=warmup,
+            outputs={k: series_to_list(v) for k, v in outputs.items()},
+        )
+        for spec, params, warmup, outputs in zip(body.indicators, resolved, warmups, series)
+    ]
+    logger.info(
+        "indicators_computed",
+        symbol=body.symbol,
+        interval=body.interval,
+        count=len(batch),
+        warmup=len(warm),
+        indicators=[spec.name for spec in body.indicators],
+        cached=len(body.indicators) - len(missing),
+        compute_ms=round((_time.perf_counter() - started) * 1000, 2),
+    )
+    return IndicatorResponse(
+        symbol=body.symbol,
+        interval=body.interval,
+        time=batch.time.tolist(),
+        indicators=results,
+    )
+
+
+@router.get("/history/stream")
+async def stream_history(
+    request: Request,
+    symbol: Annotated[str, Query(description="Trading symbol (e.g. BTCUSDT, EUR/USD)")],
+    interval: Annotated[str, Query(description="Timeframe interval (e.g. 1m, 1H, 1D)")],
+    start_time: Annotated[int, Query(description="Start time Unix seconds")],
+    end_time: Annotated[int | None, Query(description="End time Unix seconds (default: now)")] = None,
+    max_rows: Annotated[
+        int,
+        Query(ge=1, le=settings.HISTORY_STREAM_MAX_ROWS, description="Stop after this many candles"),
+    ] = settings.HISTORY_STREAM_MAX_ROWS,
+    chunk_size: Annotated[int, Query(ge=100, le=50_000, description="Candles per chunk")] = 10_000,
+    format_param: Annotated[StreamFormat, Query(alias="format")] = StreamFormat.NDJSON,
+) -> StreamingResponse:
+    """Stream cached candles for a large range as NDJSON or binary frames.
+
+    Candles are read chunk by chunk from the cold store and a server-side
+    cursor on ohlcv_cache, so server memory stays flat for any range size.
+    Only already-cached data is exported. The stream ends early at
+    `max_rows` or when the client disconnects.
+    """
+    if end_time is None:
+        end_time = int(_time.time())
+    if end_time < start_time:
+        raise HTTPException(status_code=422, detail="end_time must be >= start_time")
+
+    encode = encode_ndjson if format_param == StreamFormat.NDJSON else encode_binary
+
+    async def body():
+        sent = 0
+        # The request-scoped get_db session may be closed before the body is
+        # streamed, so the generator owns its session.
+        async with async_session() as session:
+            service = MarketDataService(session)
+            async for chunk in service.iter_history_chunks(
+                symbol, interval, start_time, end_time, chunk_size
+            ):
+                if await request.is_disconnected():
+                    logger.info("history_stream_client_gone", symbol=symbol, sent=sent)
+                    return
+                chunk = chunk[: max_rows - sent]
+                yield encode(chunk)
+                sent += len(chunk)
+                if sent >= max_rows:
+                    break
+        logger.info("history_stream_complete", symbol=symbol, interval=interval, sent=sent)
+
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[format_param])
+
+
+@router.get("/history/pages/{page}")
+async def get_history_page(
+    page: int,
+    symbol: Annotated[str, Query(description="Trading symbol (e.g. BTCUSDT, EUR/USD)")],
+    interval: Annotated[str, Query(description="Timeframe interval (e.g. 1m, 1H, 1D)")],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    format_param: Annotated[HistoryFormat, Query(alias="format")] = HistoryFormat.COLUMNAR,
+    if_none_match: Annotated[str | None, Header()] = None,
+    accept_encoding: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Serve one boundary-aligned page of candles (see pages.py).
+
+    Page N holds open times [N * span, (N + 1) * span) with
+    span = PAGE_SIZE * interval seconds, i.e. page = floor(time / span).
+    Closed pages are immutable and carry a content-hash ETag; the body is
+    precompressed once and reused for every request.
+    """
+    if page < 0:
+        raise HTTPException(status_code=422, detail="page must be >= 0")
+    _validate_interval(interval)
+
+    entry = page_cache.get(symbol, interval, page, format_param)
+    if entry is None:
+        start_time, end_time = page_bounds(interval, page)
+        batch = await _load_history_batch(db, symbol, interval, start_time, end_time, PAGE_SIZE)
+        meta = await _symbol_meta(symbol, format_param)
+        started = _time.perf_counter()
+        try:
+            entry = build_page_entry(symbol, interval, page, format_param, batch, meta)
+        except RuntimeError as e:
+            raise HTTPException(status_code=406, detail=str(e))
+        logger.info(
+            "history_page_built",
+            symbol=symbol,
+            interval=interval,
+            page=page,
+            count=len(batch),
+            immutable=entry.immutable,
+            encode_ms=round((_time.perf_counter() - started) * 1000, 2),
+        )
+        page_cache.put(symbol, interval, page, format_param, entry)
+
+    coding = entry.pick_encoding(accept_encoding)
+    headers = {
+        "ETag": entry.etag(coding),
+        "Cache-Control": entry.cache_control(),
+        "Vary": "Accept-Encoding",
+    }
+    if entry.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+        body = entry.encoded[coding]
+    else:
+        body = entry.body
+    return Response(content=body, media_type=MEDIA_TYPES[format_param], headers=headers)
+
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> dict:
+    """Hit/miss counters and memory use of the in-process market data caches."""
+    return {
+        "history_pages": page_cache.stats(),
+        "history_prefetch": history_prefetcher.stats(),
+        "indicators": indicator_cache.stats(),
+        "volume_profile_days": day_profile_cache.stats(),
+        "replay_pages": replay_pages.stats(),
+        "replay_sessions": replay_manager.stats(),
+        "trade_ingest": stream_manager.trade_ingest.stats(),
+        "ticker_feed": stream_manager.ticker_feed.stats(),
+        "symbol_registry": symbol_registry.stats(),
+    }
+
+
+async def _symbol_index(asset_class: AssetClass | None) -> SymbolIndex:
+    """The registry index, loading the crypto universe unless only forex is asked for.
+
+    Forex pairs are built in, so they are served even when Binance is down.
+    """
+    if asset_class == AssetClass.FOREX:
+        return symbol_registry.index
+    with _provider_errors("exchangeInfo"):
+        return await symbol_registry.ensure_loaded()
+
 
 @router.get("/symbols", response_model=list[str])
 async def get_symbols(
     asset_class: Annotated[str, Query(description="Asset class: 'crypto' or 'forex'")],
-    db: Annotated[AsyncSession, Depends(get_db)],
 ) -> list[str]:
-    """Return available trading symbols for the given asset class."""
+    """Return available trading symbols for the given asset class.
+
+    Served from the symbol registry (see symbol_registry.py), which is
+    loaded at startup and refreshed in the background.
+    """
     ac = AssetClass(asset_class)
-    service = MarketDataService(db)
-    return await service.get_available_symbols(ac)
+    index = await _symbol_index(ac)
+    return index.symbols(ac)
+
+
+@router.get("/symbols/meta", response_model=SymbolMeta)
+async def get_symbol_meta(
+    symbol: Annotated[str, Query(description="Trading symbol (e.g. BTCUSDT, EUR/USD)")],
+) -> SymbolMeta:
+    """Tick size, quantity step and precision of one symbol."""
+    info = symbol_registry.index.get(symbol)
+    if info is None:
+        with _provider_errors("exchangeInfo"):
+            info = (await symbol_registry.ensure_loaded()).get(symbol)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol: {symbol}")
+    return SymbolMeta(**info._asdict())
+
+
+@router.get("/symbols/search", response_model=SymbolSearchResponse)
+async def search_symbols(
+    q: Annotated[
+        str,
+        Query(min_length=1, max_length=40, description="Symbol, asset or alias (e.g. btc, BTC-USD, eur/usd)"),
+    ],
+    limit: Annotated[int, Query(ge=1, le=100, description="Maximum number of matches")] = 10,
+    asset_class: Annotated[AssetClass | None, Query(description="Only 'crypto' or 'forex' symbols")] = None,
+) -> SymbolSearchResponse:
+    """Ranked prefix / fuzzy symbol search over the registry."""
+    index = await _symbol_index(asset_class)
+    return SymbolSearchResponse(
+        query=q,
+        results=[
+            SymbolMatch(**info._asdict(), match=match)
+            for info, match in index.search(q, limit, asset_class)
+        ],
+    )
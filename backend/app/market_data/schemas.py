@@ -1,9 +1,10 @@
 """Pydantic schemas for market data: OHLCV candles, WS messages, timeframe mappings."""
 
+import re
 from enum import Enum
 from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AssetClass(str, Enum):
@@ -39,10 +40,175 @@ class HistoricalResponse(BaseModel):
     candles: list[OHLCVCandle]
 
 
+IndicatorName = Literal[
+    "sma",
+    "ema",
+    "wma",
+    "rsi",
+    "macd",
+    "bollinger",
+    "stochastic",
+    "atr",
+    "ichimoku",
+    "pivots",
+    "vwap",
+]
+
+
+class IndicatorSpec(BaseModel):
+    name: IndicatorName
+    params: dict[str, int | float | str] = {}
+
+
+class IndicatorRequest(BaseModel):
+    symbol: str
+    interval: str
+    start_time: int | None = None
+    end_time: int | None = None
+    limit: int = Field(default=500, ge=1, le=5000)
+    indicators: list[IndicatorSpec] = Field(min_length=1, max_length=20)
+
+
+class IndicatorResult(BaseModel):
+    name: IndicatorName
+    params: dict[str, int | float | str]  # resolved, including defaults
+    warmup: int  # candles loaded before the first returned time
+    outputs: dict[str, list[float | None]]  # None inside the warm-up period
+
+
+class IndicatorResponse(BaseModel):
+    symbol: str
+    interval: str
+    time: list[int]
+    indicators: list[IndicatorResult]
+
+
+class TimeframeSeries(BaseModel):
+    interval: str
+    base_interval: str | None  # interval it was resampled from, None if loaded directly
+    candles: list[OHLCVCandle]
+
+
+class MultiTimeframeResponse(BaseModel):
+    """Several intervals of one symbol over a shared window (see mtf.py)."""
+
+    symbol: str
+    start_time: int
+    end_time: int
+    series: list[TimeframeSeries]  # in request order
+
+
+class SparklineSeries(BaseModel):
+    symbol: str
+    time: list[int]  # open times, oldest first
+    close: list[float]
+    last: float | None  # last price
+    change_percent: float | None  # 24h change (crypto), else over the series
+    error: str | None = None  # set when the symbol could not be loaded
+
+
+class SparklinesResponse(BaseModel):
+    """Recent closes of many symbols, column-wise, for watchlists."""
+
+    interval: str
+    series: list[SparklineSeries]  # in request order
+
+
+class SymbolMeta(BaseModel):
+    symbol: str
+    base: str
+    quote: str
+    asset_class: AssetClass
+    tick_size: float  # price increment; 0 if unknown
+    step_size: float  # quantity increment; 0 if unknown
+    price_decimals: int
+    qty_decimals: int
+
+
+class SymbolMatch(SymbolMeta):
+    match: str  # exact, alias, prefix, base, base_prefix or fuzzy
+
+
+class SymbolSearchResponse(BaseModel):
+    query: str
+    results: list[SymbolMatch]  # best first
+
+
+class TradesResponse(BaseModel):
+    """Recorded aggregated trades, column-wise (see trade_store.py)."""
+
+    symbol: str
+    id: list[int]  # Binance aggregate trade id
+    time: list[int]  # Unix milliseconds
+    price: list[float]
+    qty: list[float]
+    buyer_maker: list[bool]  # True: the aggressor sold
+    truncated: bool  # more trades in range than `limit`
+
+
+class VolumeProfileLevel(BaseModel):
+    price_low: float
+    price_high: float
+    volume: float
+    up_volume: float  # from candles closing at or above their open
+    down_volume: float
+
+
+class VolumeProfileResponse(BaseModel):
+    symbol: str
+    start_time: int
+    end_time: int
+    source_interval: str  # candles the profile was built from
+    bin_size: float
+    total_volume: float
+    poc: float | None  # point of control: middle of the highest-volume level
+    value_area_low: float | None
+    value_area_high: float | None
+    levels: list[VolumeProfileLevel]  # ascending price
+
+
+TransformName = Literal["heikin_ashi", "renko", "range", "tick", "volume", "dollar"]
+
+
+class TransformSpec(BaseModel):
+    name: TransformName
+    # renko/range: brick_size; volume/dollar: threshold; tick: ticks
+    params: dict[str, int | float] = {}
+
+
 class SubscribeMessage(BaseModel):
     action: Literal["subscribe", "unsubscribe"]
     symbol: str
     interval: str
+    # When set, (un)subscribes a shared indicator or chart-transform channel
+    # on the stream instead of raw price updates.
+    indicator: IndicatorSpec | None = None
+    transform: TransformSpec | None = None
+    # When true, (un)subscribes the symbol's higher-timeframe levels
+    # channel (see levels.py); `interval` is the chart's and not used.
+    levels: bool = False
+
+
+ReplayCommand = Literal["start", "play", "pause", "step", "seek", "speed", "stop"]
+
+
+class ReplayMessage(BaseModel):
+    """Client command for a server-side replay session.
+
+    `start` needs symbol, interval and start_time and opens a paused
+    session; every other command names the session it returned.
+    """
+
+    action: Literal["replay"]
+    command: ReplayCommand
+    session: str | None = None
+    symbol: str | None = None
+    interval: str | None = None
+    start_time: int | None = None  # start: open time of the first candle revealed
+    end_time: int | None = None  # start: stop here (default: last closed candle)
+    speed: float | None = Field(default=None, ge=0.1, le=1000)  # candles per second
+    count: int = Field(default=1, ge=1, le=1000)  # step: candles to reveal
+    time: int | None = None  # seek: new cursor
 
 
 class PriceUpdate(BaseModel):
@@ -53,6 +219,86 @@ class PriceUpdate(BaseModel):
     is_closed: bool
 
 
+class IndicatorUpdate(BaseModel):
+    type: Literal["indicator_update"] = "indicator_update"
+    symbol: str
+    interval: str
+    channel: str  # e.g. "rsi:period=14"
+    time: int  # open time of the candle the values belong to
+    values: dict[str, float | None]
+    is_closed: bool
+
+
+class TransformUpdate(BaseModel):
+    type: Literal["transform_update"] = "transform_update"
+    symbol: str
+    interval: str
+    channel: str  # e.g. "renko:brick_size=10.0"
+    candles: list[OHLCVCandle]  # bars completed by this tick
+    forming: OHLCVCandle | None  # bar still in progress, if any
+    is_closed: bool  # False: `candles` are provisional until the source candle closes
+
+
+class HTFLevel(BaseModel):
+    timeframe: str  # 1D, 1W or 1M
+    time: int  # open time of the previous closed bucket the levels come from
+    high: float
+    low: float
+    close: float
+    pivot: float
+    r1: float
+    r2: float
+    r3: float
+    s1: float
+    s2: float
+    s3: float
+
+
+class LevelsUpdate(BaseModel):
+    """Sent when a symbol's higher-timeframe levels change (and on subscribe)."""
+
+    type: Literal["levels_update"] = "levels_update"
+    symbol: str
+    channel: Literal["levels"] = "levels"
+    levels: list[HTFLevel]
+
+
+class TickerMessage(BaseModel):
+    """Client watchlist for live tickers; replaces the previous one, [] stops."""
+
+    action: Literal["ticker"]
+    symbols: list[str]
+
+
+class TickerUpdate(BaseModel):
+    """Changed 24h mini-ticker entries of a client's watchlist, column-wise."""
+
+    type: Literal["ticker_update"] = "ticker_update"
+    symbol: list[str]
+    last: list[float]
+    change_percent: list[float]  # rolling 24h
+    volume: list[float]  # rolling 24h, base asset
+    quote_volume: list[float]
+
+
+class ReplayUpdate(BaseModel):
+    type: Literal["replay_update"] = "replay_update"
+    session: str
+    symbol: str
+    interval: str
+    candles: list[OHLCVCandle]  # next candles in order, all older than the cursor
+
+
+class ReplayStatus(BaseModel):
+    type: Literal["replay_status"] = "replay_status"
+    session: str
+    symbol: str
+    interval: str
+    state: Literal["paused", "playing", "ended", "stopped"]
+    time: int  # cursor: open time from which candles are still hidden
+    speed: float
+
+
 class ConnectionStatus(BaseModel):
     type: Literal["connection_status"] = "connection_status"
     status: Literal["connected", "reconnecting", "error"]
@@ -84,3 +330,47 @@ TWELVEDATA_INTERVALS: dict[str, str] = {
     "1W": "1week",
     "1M": "1month",
 }
+
+# Interval durations in seconds, used for cache staleness checks and page
+# alignment. "1M" is a nominal 30-day month.
+INTERVAL_SECONDS: dict[str, int] = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1H": 3600,
+    "4H": 14400,
+    "1D": 86400,
+    "1W": 604800,
+    "1M": 2592000,
+}
+
+_UNIT_SECONDS: dict[str, int] = {
+    "m": 60,
+    "H": 3600,
+    "D": 86400,
+    "W": 604800,
+    "M": 2592000,
+}
+
+_INTERVAL_RE = re.compile(r"^([1-9][0-9]{0,3})([mHDWM])$")
+
+
+def parse_interval(interval: str) -> tuple[int, str]:
+    """Split an interval such as "3H" into (3, "H").
+
+    Accepts any positive multiple of m/H/D/W/M, not just the nine standard
+    intervals. Raises ValueError for anything else.
+    """
+    match = _INTERVAL_RE.match(interval)
+    if match is None:
+        raise ValueError(f"Invalid interval: {interval!r}")
+    return int(match.group(1)), match.group(2)
+
+
+def interval_seconds(interval: str) -> int:
+    """Nominal length in seconds of a standard or custom interval."""
+    if interval in INTERVAL_SECONDS:
+        return INTERVAL_SECONDS[interval]
+    count, unit = parse_interval(interval)
+    return count * _UNIT_SECONDS[unit]
@@ -1,33 +1,75 @@
 """Market data service: cache-first historical data fetching."""
 
+import asyncio
 import time as _time
+from collections.abc import AsyncIterator
+from zoneinfo import ZoneInfo
 
+import numpy as np
 import structlog
-from sqlalchemy import select
+from sqlalchemy import String, any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.cold_store import cold_store
+from app.market_data.ingest import COPY_CHUNK_ROWS, IngestResult, bulk_upsert_candles
 from app.market_data.models import OHLCVCache
 from app.market_data.providers.base import MarketDataProvider
 from app.market_data.providers.binance import BinanceProvider
 from app.market_data.providers.twelve_data import TwelveDataProvider
-from app.market_data.schemas import AssetClass, OHLCVCandle, detect_asset_class
+from app.market_data.resample import (
+    UTC,
+    calendar_boundaries,
+    choose_base_interval,
+    current_bucket_start,
+    needs_resampling,
+    resample,
+    resample_cache,
+)
+from app.market_data.schemas import (
+    AssetClass,
+    OHLCVCandle,
+    detect_asset_class,
+    interval_seconds,
+)
 
 logger = structlog.get_logger()
 
-# Interval durations in seconds, used for cache staleness checks.
-_INTERVAL_SECONDS: dict[str, int] = {
-    "1m": 60,
-    "5m": 300,
-    "15m": 900,
-    "30m": 1800,
-    "1H": 3600,
-    "4H": 14400,
-    "1D": 86400,
-    "1W": 604800,
-    "1M": 2592000,
-}
+# Forex sessions close over the weekend (and some holidays), so consecutive
+# closed forex candles can legitimately be several days apart.
+_FOREX_MAX_GAP_SECONDS = 4 * 86400
+
+# Standard intervals that, on a cache miss, are derived from already cached
+# finer candles before falling back to a provider call.
+_DERIVABLE_INTERVALS = ("4H", "1D", "1W", "1M")
+
+# Upper bound on base candles loaded to build one resampled response.
+_RESAMPLE_MAX_BASE_ROWS = 250_000
+
+# Concurrent provider requests when filling misses of a multi-symbol read.
+_MULTI_FETCH_CONCURRENCY = 8
+
+# First open time the provider has per (symbol, interval), learnt when a
+# read from an earlier time returned only later candles (e.g. a listing).
+# Spans reaching back before it are complete from there on.
+_history_starts: dict[tuple[str, str], int] = {}
+
+
+def max_gap_seconds(symbol: str, interval: str) -> int:
+    """Largest spacing between consecutive candles that is not a data hole."""
+    interval_sec = interval_seconds(interval)
+    if detect_asset_class(symbol) == AssetClass.FOREX:
+        return interval_sec + _FOREX_MAX_GAP_SECONDS
+    # 1.5x tolerates calendar months longer than the nominal 30 days.
+    return interval_sec * 3 // 2
+
+
+def _note_history_start(symbol: str, interval: str, start_time: int, first_time: int) -> None:
+    """Record `first_time` as history start if nothing precedes it since `start_time`."""
+    if first_time - start_time > max_gap_seconds(symbol, interval):
+        _history_starts[(symbol, interval)] = first_time
 
 
 class MarketDataService:
@@ -56,22 +98,83 @@ class MarketDataService:
         start_time: int | None = None,
         end_time: int | None = None,
         limit: int = 500,
+        tz: ZoneInfo = UTC,
     ) -> list[OHLCVCandle]:
+        """Fetch historical candles as OHLCVCandle models.
+
+        Thin wrapper over get_historical_batch for callers that need
+        per-candle objects.
+        """
+        batch = await self.get_historical_batch(
+            symbol=symbol,
+            interval=interval,
+            start_time=start_time,
+            end_time=end_time,
+            limit=limit,
+            tz=tz,
+        )
+        return batch.to_candles()
+
+    async def get_historical_batch(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int | None = None,
+        end_time: int | None = None,
+        limit: int = 500,
+        tz: ZoneInfo = UTC,
+    ) -> CandleBatch:
         """Fetch historical candles with cache-first strategy.
 
+        Custom intervals (e.g. 3H, 3D) and daily-or-longer intervals aligned
+        to a non-UTC timezone are always resampled from finer candles.
+        Otherwise:
+
+        0. For bounded requests, try the memory-mapped cold store (zero-copy)
         1. Query ohlcv_cache for matching symbol + interval in time range
         2. If enough cached rows exist AND they are fresh enough, return them
-        3. Otherwise fetch from provider, cache the result, and return
+        3. For coarse intervals, derive them from cached finer candles
+        4. Otherwise fetch from provider, cache the result, and return
 
-        When no time range is provided (initial chart load), the query fetches
-        the *newest* cached rows (ORDER BY DESC) to avoid returning stale data
-        from the bottom of the cache.
+        Without a start_time (initial chart load, or scrolling back with only
+        end_time) the query fetches the *newest* cached rows at or before the
+        end (ORDER BY DESC), like the providers do, instead of the oldest rows
+        at the bottom of the cache.
         """
+        if needs_resampling(interval, tz):
+            return await self._get_resampled(
+                symbol, interval, tz, start_time, end_time, limit, allow_backfill=True
+            )
+
         # Determine whether this is a "latest data" request (no time bounds).
         is_latest_request = start_time is None and end_time is None
+        # Without a start, the newest `limit` rows up to the end are wanted.
+        newest_first = start_time is None
+
+        # Step 0: Long ranges of closed candles come from the cold store.
+        if settings.COLD_STORE_ENABLED and not is_latest_request:
+            if start_time is not None:
+                cold = cold_store.read_range(symbol, interval, start_time, end_time, limit)
+            else:
+                cold = cold_store.read_before(symbol, interval, end_time, limit)
+            if cold is not None:
+                logger.info(
+                    "cold_store_hit",
+                    symbol=symbol,
+                    interval=interval,
+                    count=len(cold),
+                )
+                return cold
 
         # Step 1: Try cache
-        query = select(OHLCVCache).where(
+        query = select(
+            OHLCVCache.open_time,
+            OHLCVCache.open,
+            OHLCVCache.high,
+            OHLCVCache.low,
+            OHLCVCache.close,
+            OHLCVCache.volume,
+        ).where(
             OHLCVCache.symbol == symbol,
             OHLCVCache.interval == interval,
         )
@@ -81,17 +184,17 @@ class MarketDataService:
         if end_time is not None:
             query = query.where(OHLCVCache.open_time <= end_time)
 
-        if is_latest_request:
+        if newest_first:
             # Fetch the newest rows first so LIMIT grabs the tail, not the head.
             query = query.order_by(OHLCVCache.open_time.desc()).limit(limit)
         else:
             query = query.order_by(OHLCVCache.open_time.asc()).limit(limit)
 
         result = await self.db.execute(query)
-        cached_rows = list(result.scalars().all())
+        cached_rows = [tuple(row) for row in result.all()]
 
         # When fetched DESC we need to reverse back to chronological order.
-        if is_latest_request and cached_rows:
+        if newest_first and cached_rows:
             cached_rows.reverse()
 
         # Step 2: Check cache validity
@@ -100,8 +203,8 @@ class MarketDataService:
             if is_latest_request:
                 # For "latest" requests, verify the newest cached candle is
                 # reasonably recent (within 2 interval periods of now).
-                interval_sec = _INTERVAL_SECONDS.get(interval, 60)
-                newest_time = cached_rows[-1].open_time
+                interval_sec = interval_seconds(interval)
+                newest_time = cached_rows[-1][0]
                 staleness = int(_time.time()) - newest_time
                 if staleness <= interval_sec * 2:
                     cache_is_valid = True
@@ -124,19 +227,24 @@ class MarketDataService:
                 interval=interval,
                 count=len(cached_rows),
             )
-            return [
-                OHLCVCandle(
-                    time=row.open_time,
-                    open=row.open,
-                    high=row.high,
-                    low=row.low,
-                    close=row.close,
-                    volume=row.volume,
+            return CandleBatch.from_rows(cached_rows)
+
+        # Step 3: Derive coarse intervals from cached finer candles
+        if interval in _DERIVABLE_INTERVALS:
+            derived = await self._get_resampled(
+                symbol, interval, UTC, start_time, end_time, limit, allow_backfill=False
+            )
+            if derived is not None and len(derived) >= limit:
+                logger.info(
+                    "derived_from_cache",
+                    symbol=symbol,
+                    interval=interval,
+                    count=len(derived),
                 )
-                for row in cached_rows
-            ]
+                await self.store_candles(derived, symbol, interval, "derived")
+                return derived
 
-        # Step 3: Fetch from provider
+        # Step 4: Fetch from provider
         provider, provider_name = self._get_provider(symbol)
         logger.info(
             "cache_miss_fetching",
@@ -153,11 +261,389 @@ class MarketDataService:
             limit=limit,
         )
 
-        # Step 4: Cache the fetched candles
+        # Step 5: Cache the fetched candles
+        batch = CandleBatch.from_candles(candles)
         if candles:
-            await self._cache_candles(candles, symbol, interval, provider_name)
+            await self.store_candles(batch, symbol, interval, provider_name)
 
-        return candles
+        return batch
+
+    async def _get_resampled(
+        self,
+        symbol: str,
+        interval: str,
+        tz: ZoneInfo,
+        start_time: int | None,
+        end_time: int | None,
+        limit: int,
+        allow_backfill: bool,
+    ) -> CandleBatch | None:
+        """Build `interval` candles by resampling the finest suitable base.
+
+        Ranged requests return the first `limit` buckets starting at or after
+        start_time; other requests return the last `limit` buckets at or
+        before end_time (or now). Base candles are read from the cold store
+        and ohlcv_cache. If they have holes, the base span is backfilled from
+        the provider when `allow_backfill` is set; otherwise None is returned
+        so the caller can use the provider directly.
+
+        Raises ValueError if the range would need too many base candles.
+        """
+        cache_key = (symbol, interval, tz.key, start_time, end_time, limit)
+        cached = resample_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        now = int(_time.time())
+        target_sec = interval_seconds(interval)
+        # Months can run 31 days against the nominal 30; pad the span.
+        reach = (limit + 1) * target_sec * 32 // 30
+        if start_time is not None:
+            span_start = start_time
+            span_end = end_time if end_time is not None else min(now, start_time + reach)
+        else:
+            span_end = end_time if end_time is not None else now
+            span_start = span_end - reach
+
+        boundaries = calendar_boundaries(interval, span_start, span_end, tz)
+        # Base span: whole buckets only, from the first boundary >= span_start
+        # to the end of the bucket containing span_end.
+        base_start = int(boundaries[np.searchsorted(boundaries, span_start, "left")])
+        base_end = min(int(boundaries[np.searchsorted(boundaries, span_end, "right")]) - 1, now)
+        if base_end < base_start:
+            return CandleBatch.empty()
+
+        base = choose_base_interval(interval, tz, base_start, base_end)
+        if base is None:
+            return None
+        base_sec = interval_seconds(base)
+        # Long spans (e.g. 500 months from 1H) mostly predate the symbol;
+        # only the part from its first candle needs loading.
+        first_time = _history_starts.get((symbol, base))
+        if (
+            first_time is None
+            and allow_backfill
+            and (base_end - base_start) // base_sec > _RESAMPLE_MAX_BASE_ROWS
+        ):
+            first_time = await self._probe_history_start(symbol, base, base_start)
+        if first_time is not None:
+            base_start = max(base_start, first_time)
+        if (base_end - base_start) // base_sec > _RESAMPLE_MAX_BASE_ROWS:
+            if not allow_backfill:
+                return None
+            raise ValueError(
+                f"Range too large to resample {interval} from {base}; request fewer candles"
+            )
+
+        base_batch = await self._load_span(symbol, base, base_start, base_end)
+        if not self._span_complete(base_batch, symbol, base, base_start, base_end):
+            if not allow_backfill:
+                return None
+            logger.info(
+                "resample_base_backfill",
+                symbol=symbol,
+                interval=interval,
+                base=base,
+                start_time=base_start,
+                end_time=base_end,
+            )
+            await self.backfill(symbol, base, base_start, base_end)
+            base_batch = await self._load_span(symbol, base, base_start, base_end)
+
+        if allow_backfill and base_end >= now - base_sec:
+            # Cached history lags the forming base candle; refresh the tail so
+            # the newest bucket's close is current.
+            tail = await self.get_historical_batch(symbol, base, limit=3)
+            if len(tail):
+                base_batch = CandleBatch.concat(
+                    [base_batch.between(None, int(tail.time[0]) - 1), tail]
+                )
+
+        result = resample(base_batch, interval, tz)
+        if start_time is not None:
+            result = result.between(start_time, end_time)[:limit]
+        else:
+            result = result.between(None, span_end)[-limit:]
+
+        is_closed = base_end < now - base_sec
+        resample_cache.put(cache_key, result, ttl=3600 if is_closed else min(base_sec, 60))
+        logger.info(
+            "resampled",
+            symbol=symbol,
+            interval=interval,
+            tz=tz.key,
+            base=base,
+            base_count=len(base_batch),
+            count=len(result),
+        )
+        return result
+
+    async def _probe_history_start(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+    ) -> int | None:
+        """Return the first candle time at or after start_time from the provider.
+
+        Costs one single-candle provider call; a start later than a data
+        hole is remembered so later spans skip the probe.
+        """
+        provider, _ = self._get_provider(symbol)
+        candles = await provider.fetch_historical(
+            symbol=symbol, interval=interval, start_time=start_time, limit=1
+        )
+        if not candles:
+            return None
+        _note_history_start(symbol, interval, start_time, candles[0].time)
+        return candles[0].time
+
+    async def _load_span(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+    ) -> CandleBatch:
+        """Read every cached candle in [start_time, end_time] into one batch."""
+        chunks = [
+            chunk
+            async for chunk in self.iter_history_chunks(
+                symbol, interval, start_time, end_time, chunk_size=50_000
+            )
+        ]
+        return CandleBatch.concat(chunks)
+
+    async def get_warmup(
+        self,
+        symbol: str,
+        interval: str,
+        before: int,
+        count: int,
+    ) -> CandleBatch:
+        """Return up to `count` candles opening strictly before `before`.
+
+        Used to load indicator lookback ahead of a requested range. Cached
+        candles are used when they cover the span without holes; otherwise
+        the span is backfilled from the provider first.
+        """
+        if count <= 0:
+            return CandleBatch.empty()
+
+        interval_sec = interval_seconds(interval)
+        span = count * interval_sec
+        if detect_asset_class(symbol) == AssetClass.FOREX:
+            # Leave room for weekend closures inside the span.
+            span = span * 7 // 5 + _FOREX_MAX_GAP_SECONDS
+        start_time, end_time = before - span, before - 1
+
+        if needs_resampling(interval, UTC):
+            batch = await self.get_historical_batch(
+                symbol, interval, start_time, end_time, limit=span // interval_sec + 1
+            )
+            return batch[-count:]
+
+        batch = await self.get_span(symbol, interval, start_time, end_time)
+        return batch[-count:]
+
+    async def get_span(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+    ) -> CandleBatch:
+        """Return every candle opening in [start_time, end_time].
+
+        Cached candles are used when they cover the span without holes;
+        otherwise the span is backfilled from the provider first. Not for
+        resampled intervals.
+        """
+        batch = await self._load_span(symbol, interval, start_time, end_time)
+        if not self._span_complete(batch, symbol, interval, start_time, end_time):
+            await self.backfill(symbol, interval, start_time, end_time)
+            batch = await self._load_span(symbol, interval, start_time, end_time)
+        return batch
+
+    @staticmethod
+    def _span_complete(
+        batch: CandleBatch,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+    ) -> bool:
+        """True if a batch covers [start_time, end_time] without data holes.
+
+        Spans reaching back before the symbol's known history start only
+        need to be covered from there.
+        """
+        if not len(batch):
+            return False
+        start_time = max(start_time, _history_starts.get((symbol, interval), start_time))
+        max_gap = max_gap_seconds(symbol, interval)
+        # The newest slot may still be forming and is not required.
+        last_required = end_time - 2 * interval_seconds(interval)
+        return (
+            int(batch.time[0]) - start_time <= max_gap
+            and last_required - int(batch.time[-1]) <= max_gap
+            and (len(batch) < 2 or int(np.diff(batch.time).max()) <= max_gap)
+        )
+
+    async def iter_history_chunks(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+        chunk_size: int = 10_000,
+    ) -> AsyncIterator[CandleBatch]:
+        """Yield cached candles in [start_time, end_time] in chronological chunks.
+
+        The span covered by the cold store is sliced from its memory maps; the
+        rest is read through a server-side cursor on ohlcv_cache, so memory
+        stays at one chunk regardless of range size. Only cached data is
+        exported; nothing is fetched from providers.
+        """
+        cold = None
+        if settings.COLD_STORE_ENABLED:
+            cold = cold_store.read_span(symbol, interval, start_time, end_time)
+
+        if cold is None:
+            async for chunk in self._stream_cached(symbol, interval, start_time, end_time, chunk_size):
+                yield chunk
+            return
+
+        cold_first, cold_last = int(cold.time[0]), int(cold.time[-1])
+        if start_time < cold_first:
+            async for chunk in self._stream_cached(symbol, interval, start_time, cold_first - 1, chunk_size):
+                yield chunk
+        for lo in range(0, len(cold), chunk_size):
+            yield cold[lo : lo + chunk_size]
+        if end_time > cold_last:
+            async for chunk in self._stream_cached(symbol, interval, cold_last + 1, end_time, chunk_size):
+                yield chunk
+
+    async def _stream_cached(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+        chunk_size: int,
+    ) -> AsyncIterator[CandleBatch]:
+        """Stream ohlcv_cache rows for a range through a server-side cursor."""
+        query = (
+            select(
+                OHLCVCache.open_time,
+                OHLCVCache.open,
+                OHLCVCache.high,
+                OHLCVCache.low,
+                OHLCVCache.close,
+                OHLCVCache.volume,
+            )
+            .where(
+                OHLCVCache.symbol == symbol,
+                OHLCVCache.interval == interval,
+                OHLCVCache.open_time >= start_time,
+                OHLCVCache.open_time <= end_time,
+            )
+            .order_by(OHLCVCache.open_time.asc())
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(query)
+        async for partition in result.partitions(chunk_size):
+            yield CandleBatch.from_rows([tuple(row) for row in partition])
+
+    async def get_latest_batches(
+        self,
+        symbols: list[str],
+        interval: str,
+        count: int,
+    ) -> dict[str, CandleBatch | Exception]:
+        """Newest `count` candles of each symbol, for watchlists.
+
+        All symbols are read with one windowed query over ohlcv_cache
+        (symbol = ANY(...), ROW_NUMBER per symbol, bounded to the recent
+        span so it stays an index range scan). Symbols whose cached tail is
+        short or stale are fetched from their providers concurrently and
+        cached. A symbol whose fetch fails maps to the exception instead of
+        failing the whole read. Standard intervals only.
+        """
+        interval_sec = interval_seconds(interval)
+        now = int(_time.time())
+        # Forex closes over weekends; leave room like get_warmup does.
+        since = now - (count + 2) * interval_sec * 7 // 5 - _FOREX_MAX_GAP_SECONDS
+
+        ranked = (
+            select(
+                OHLCVCache.symbol,
+                OHLCVCache.open_time,
+                OHLCVCache.open,
+                OHLCVCache.high,
+                OHLCVCache.low,
+                OHLCVCache.close,
+                OHLCVCache.volume,
+                func.row_number()
+                .over(partition_by=OHLCVCache.symbol, order_by=OHLCVCache.open_time.desc())
+                .label("recency"),
+            )
+            .where(
+                OHLCVCache.symbol == any_(bindparam("symbols", symbols, type_=ARRAY(String))),
+                OHLCVCache.interval == interval,
+                OHLCVCache.open_time >= since,
+            )
+            .subquery()
+        )
+        query = (
+            select(*[c for c in ranked.c if c.name != "recency"])
+            .where(ranked.c.recency <= count)
+            .order_by(ranked.c.symbol, ranked.c.open_time)
+        )
+        result = await self.db.execute(query)
+        rows_by_symbol: dict[str, list[tuple]] = {}
+        for symbol, *row in result.all():
+            rows_by_symbol.setdefault(symbol, []).append(tuple(row))
+
+        batches: dict[str, CandleBatch | Exception] = {}
+        misses = []
+        for symbol in symbols:
+            rows = rows_by_symbol.get(symbol, [])
+            if len(rows) >= count and now - rows[-1][0] <= interval_sec * 2:
+                batches[symbol] = CandleBatch.from_rows(rows)
+            else:
+                misses.append(symbol)
+
+        if misses:
+            semaphore = asyncio.Semaphore(_MULTI_FETCH_CONCURRENCY)
+
+            async def fetch(symbol: str) -> list[OHLCVCandle]:
+                provider, _ = self._get_provider(symbol)
+                async with semaphore:
+                    return await provider.fetch_historical(
+                        symbol=symbol, interval=interval, limit=count
+                    )
+
+            fetched = await asyncio.gather(*(fetch(s) for s in misses), return_exceptions=True)
+            # One session: provider calls run concurrently, writes in turn.
+            for symbol, candles in zip(misses, fetched):
+                if isinstance(candles, Exception):
+                    logger.warning("multi_fetch_failed", symbol=symbol, error=str(candles))
+                    batches[symbol] = candles
+                    continue
+                batch = CandleBatch.from_candles(candles)
+                if len(batch):
+                    await self.store_candles(batch, symbol, interval, self._get_provider(symbol)[1])
+                batches[symbol] = batch
+
+        logger.info(
+            "latest_batches",
+            interval=interval,
+            symbols=len(symbols),
+            cache_hits=len(symbols) - len(misses),
+            fetched=len(misses),
+        )
+        return batches
 
     async def get_available_symbols(self, asset_class: AssetClass) -> list[str]:
         """Delegate to the appropriate provider for symbol listings."""
@@ -165,50 +651,112 @@ class MarketDataService:
             return await self._twelve_data.get_available_symbols()
         return await self._binance.get_available_symbols()
 
-    async def _cache_candles(
+    async def backfill(
         self,
-        candles: list[OHLCVCandle],
         symbol: str,
         interval: str,
-        provider: str,
-    ) -> None:
-        """Bulk insert candles into ohlcv_cache, skipping duplicates."""
-        if not candles:
-            return
+        start_time: int,
+        end_time: int,
+    ) -> IngestResult:
+        """Page through provider history for [start_time, end_time] and store it.
 
-        values = [
-            {
-                "symbol": symbol,
-                "interval": interval,
-                "provider": provider,
-                "open_time": c.time,
-                "open": c.open,
-                "high": c.high,
-                "low": c.low,
-                "close": c.close,
-                "volume": c.volume,
-            }
-            for c in candles
-        ]
+        Pages are accumulated and flushed through the bulk ingest path every
+        COPY_CHUNK_ROWS rows, so memory stays bounded for multi-year ranges.
+        """
+        provider, provider_name = self._get_provider(symbol)
+        page_size = provider.max_page_size
+        started = _time.perf_counter()
+        pending: list[CandleBatch] = []
+        pending_rows = 0
+        total_rows = 0
+        chunks = 0
+        cursor = start_time
 
-        stmt = pg_insert(OHLCVCache).values(values)
-        stmt = stmt.on_conflict_do_update(
-            constraint="uq_ohlcv_candle",
-            set_={
-                "open": stmt.excluded.open,
-                "high": stmt.excluded.high,
-                "low": stmt.excluded.low,
-                "close": stmt.excluded.close,
-                "volume": stmt.excluded.volume,
-            },
-        )
+        while cursor <= end_time:
+            candles = await provider.fetch_historical(
+                symbol=symbol,
+                interval=interval,
+                start_time=cursor,
+                end_time=end_time,
+                limit=page_size,
+            )
+            if not candles:
+                break
+            if cursor == start_time:
+                _note_history_start(symbol, interval, start_time, candles[0].time)
+            pending.append(CandleBatch.from_candles(candles))
+            pending_rows += len(candles)
+            cursor = candles[-1].time + 1
 
-        await self.db.execute(stmt)
-        await self.db.flush()
+            if pending_rows >= COPY_CHUNK_ROWS:
+                result = await self.store_candles(
+                    CandleBatch.concat(pending), symbol, interval, provider_name
+                )
+                total_rows += result.rows
+                chunks += result.chunks
+                pending, pending_rows = [], 0
+            if len(candles) < page_size:
+                break
 
+        if pending:
+            result = await self.store_candles(
+                CandleBatch.concat(pending), symbol, interval, provider_name
+            )
+            total_rows += result.rows
+            chunks += result.chunks
+
+        result = IngestResult(total_rows, chunks, "backfill", _time.perf_counter() - started)
         logger.info(
-            "candles_cached",
+            "backfill_complete",
             symbol=symbol,
             interval=interval,
-            count=len(candles),
+            rows=result.rows,
+            rows_per_sec=round(result.rows_per_sec),
         )
+        return result
+
+    async def store_candles(
+        self,
+        batch: CandleBatch,
+        symbol: str,
+        interval: str,
+        provider: str,
+    ) -> IngestResult:
+        """Bulk upsert candles into ohlcv_cache and archive the closed ones.
+
+        Shared by history caching, stream write-behind and backfill.
+        """
+        result = await bulk_upsert_candles(self.db, batch, symbol, interval, provider)
+
+        if settings.COLD_STORE_ENABLED:
+            await self._archive_closed(batch, symbol, interval)
+
+        return result
+
+    async def _archive_closed(
+        self,
+        batch: CandleBatch,
+        symbol: str,
+        interval: str,
+    ) -> None:
+        """Append the closed candles of a batch to the cold store.
+
+        The forming candle (whose period has not ended yet) is excluded because
+        cold files are append-only and must never need rewriting. Its open
+        time comes from the calendar: a month is not a fixed 30 days.
+        """
+        closed = batch.between(None, current_bucket_start(interval) - 1)
+        if not len(closed):
+            return
+
+        try:
+            await asyncio.to_thread(
+                cold_store.append, symbol, interval, closed, max_gap_seconds(symbol, interval)
+            )
+        except OSError as e:
+            logger.warning(
+                "cold_store_append_failed",
+                symbol=symbol,
+                interval=interval,
+                error=str(e),
+            )
@@ -2,7 +2,11 @@
 
 StreamManager connects to external market data providers (Binance WS for crypto,
 Twelve Data REST polling for forex) and fans out price updates to all subscribed
-frontend clients via ConnectionManager.
+frontend clients via ConnectionManager, plus indicator updates to subscribers of
+shared indicator channels via ChannelManager. It also owns the opt-in
+aggregated-trade ingestion (trade_ingest.py), which runs independently of
+client subscriptions, and the all-market ticker feed behind watchlist
+tickers (ticker_feed.py).
 """
 
 import asyncio
@@ -11,8 +15,10 @@ import random
 
 import structlog
 import websockets
+from fastapi import WebSocket
 
 from app.config import settings
+from app.market_data.channels import ChannelManager
 from app.market_data.connection_manager import ConnectionManager
 from app.market_data.providers.twelve_data import TwelveDataProvider
 from app.market_data.schemas import (
@@ -22,6 +28,9 @@ from app.market_data.schemas import (
     detect_asset_class,
     AssetClass,
 )
+from app.market_data.ticker_feed import TickerFeed
+from app.market_data.trade_ingest import TradeIngestor
+from app.market_data.write_behind import CandleWriteBehind
 
 logger = structlog.get_logger()
 
@@ -33,11 +42,19 @@ class StreamManager:
     For forex: polls Twelve Data REST API (WS sends ticks, not candles).
     """
 
-    def __init__(self, connection_manager: ConnectionManager) -> None:
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        channel_manager: ChannelManager,
+    ) -> None:
         self._conn_mgr = connection_manager
+        self._channels = channel_manager
         self._upstream_tasks: dict[str, asyncio.Task] = {}
         self._running: bool = False
         self._twelve_data = TwelveDataProvider(api_key=settings.TWELVE_DATA_API_KEY)
+        self._write_behind = CandleWriteBehind()
+        self.trade_ingest = TradeIngestor()
+        self.ticker_feed = TickerFeed()
 
     def start_stream(self, symbol: str, interval: str) -> None:
         """Start an upstream stream for the given symbol@interval.
@@ -51,6 +68,7 @@ class StreamManager:
             return
 
         asset_class = detect_asset_class(symbol)
+        self._write_behind.start()
 
         if asset_class == AssetClass.CRYPTO:
             task = asyncio.create_task(
@@ -66,6 +84,10 @@ class StreamManager:
         self._upstream_tasks[key] = task
         logger.info("stream_started", key=key, asset_class=asset_class.value)
 
+    def start_trade_ingest(self) -> None:
+        """Start recording aggregated trades for TRADE_INGEST_SYMBOLS, if any."""
+        self.trade_ingest.start(settings.TRADE_INGEST_SYMBOLS)
+
     def stop_stream(self, symbol: str, interval: str) -> None:
         """Stop the upstream stream for the given symbol@interval."""
         key = f"{symbol}@{interval}"
@@ -74,6 +96,24 @@ class StreamManager:
             task.cancel()
             logger.info("stream_stopped", key=key)
 
+    def release_stream(self, symbol: str, interval: str) -> None:
+        """Stop the upstream stream once neither raw price subscribers nor
+        indicator channel subscribers remain for symbol@interval."""
+        key = f"{symbol}@{interval}"
+        if self._conn_mgr.has_subscribers(key) or self._channels.has_subscribers(key):
+            return
+        self.stop_stream(symbol, interval)
+
+    def drop_client(self, ws: WebSocket) -> None:
+        """Remove a client from raw and channel subscriptions and release
+        any upstream streams left without subscribers."""
+        self.ticker_feed.drop_client(ws)
+        keys = self._conn_mgr.disconnect(ws) | self._channels.disconnect(ws)
+        for key in keys:
+            parts = key.split("@", 1)
+            if len(parts) == 2:
+                self.release_stream(parts[0], parts[1])
+
     async def _run_crypto_stream(self, symbol: str, interval: str) -> None:
         """Connect to Binance WebSocket and relay kline data to subscribers.
 
@@ -133,6 +173,8 @@ class StreamManager:
                                 is_closed=bool(k["x"]),
                             )
 
+                            if update.is_closed:
+                                self._write_behind.add(symbol, interval, candle)
                             await self._fan_out(key, update)
 
                         except (KeyError, ValueError, TypeError) as e:
@@ -211,6 +253,7 @@ class StreamManager:
                             candle=last_candle,
                             is_closed=True,
                         )
+                        self._write_behind.add(symbol, interval, last_candle)
                         await self._fan_out(key, closed_update)
 
                     # Send the current (possibly still forming) candle
@@ -250,29 +293,30 @@ class StreamManager:
             await asyncio.sleep(poll_interval)
 
     async def _fan_out(self, key: str, update: PriceUpdate) -> None:
-        """Send a PriceUpdate to all subscribers of the given key.
+        """Send a PriceUpdate to all subscribers of the given key, then the
+        updates of every indicator channel on the key to their subscribers.
 
-        Removes dead clients that fail to receive the message.
+        Each channel is evaluated once per update however many clients share
+        it. Removes dead clients that fail to receive a message.
         """
+        messages = []
         subscribers = self._conn_mgr.get_subscribers(key)
-        if not subscribers:
-            return
-
-        payload = update.model_dump()
-        dead_clients = []
-
-        for ws in subscribers:
-            try:
-                await ws.send_json(payload)
-            except Exception:
-                dead_clients.append(ws)
+        if subscribers:
+            messages.append((subscribers, update.model_dump()))
+        messages.extend(self._channels.evaluate(key, update))
+
+        dead_clients = set()
+        for clients, payload in messages:
+            for ws in clients:
+                if ws in dead_clients:
+                    continue
+                try:
+                    await ws.send_json(payload)
+                except Exception:
+                    dead_clients.add(ws)
 
         for ws in dead_clients:
-            orphaned = self._conn_mgr.remove_dead_client(ws)
-            for orphaned_key in orphaned:
-                self.stop_stream(
-                    *orphaned_key.split("@", 1)
-                )
+            self.drop_client(ws)
 
     async def shutdown(self) -> None:
         """Cleanly shut down all upstream streams."""
@@ -286,4 +330,8 @@ class StreamManager:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
 
+        await self._write_behind.stop()
+        await self.trade_ingest.stop()
+        await self.ticker_feed.stop()
+
         logger.info("stream_manager_shutdown", cancelled_tasks=len(tasks))
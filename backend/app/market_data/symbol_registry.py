@@ -0,0 +1,283 @@
+"""In-memory symbol universe with ranked prefix and fuzzy search.
+
+The registry holds every tradable Binance symbol (from exchangeInfo) and
+the supported forex pairs. It is loaded at startup and refreshed every
+SYMBOL_REFRESH_SECONDS in the background; Binance refreshes are
+conditional on the previous ETag, and a failed refresh keeps the current
+universe.
+
+Search keys are normalized to upper-case letters and digits, so
+"btc-usd", "BTC/USDT" and "eur usd" all work. Every symbol is indexed
+under its own name, its base asset (either currency for forex pairs),
+and aliases: a USD-stable quote can be written as USD (BTC-USD finds
+BTCUSDT). Keys live in one sorted list, so a prefix query is a bisect
+plus a short scan. When prefixes find fewer than `limit` symbols, base
+assets within one edit of the query are matched through a deletion index
+(every key with one character removed), which needs no scan either.
+
+Results are ranked by how they matched (exact, alias, prefix, base
+asset, fuzzy), then by quote preference (USDT first), then by length.
+
+Each entry also carries the instrument's price tick and quantity step
+(PRICE_FILTER / LOT_SIZE for Binance, pip fractions for forex) and the
+decimals they imply, which the wire layer uses for scaled-integer
+encodings (see encoding.encode_ticks).
+"""
+
+import asyncio
+import bisect
+import heapq
+import re
+import time as _time
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+import structlog
+
+from app.config import settings
+from app.market_data.providers.binance import BinanceProvider
+from app.market_data.providers.twelve_data import FOREX_PAIRS
+from app.market_data.schemas import AssetClass
+
+logger = structlog.get_logger()
+
+# Quotes written as plain "USD" in aliases, most preferred first.
+USD_QUOTES = ("USDT", "BUSD")
+
+# Quote preference for ranking; others rank after these.
+QUOTE_RANK = {"USDT": 0, "USD": 1, "BUSD": 2, "BTC": 3}
+
+# Match kinds, best first.
+EXACT, ALIAS, PREFIX, BASE, BASE_PREFIX, FUZZY = range(6)
+MATCH_NAMES = ("exact", "alias", "prefix", "base", "base_prefix", "fuzzy")
+
+# Symbols scanned per prefix query at most (short queries match many).
+MAX_PREFIX_SCAN = 5000
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+
+
+def normalize(text: str) -> str:
+    return _NON_ALNUM.sub("", text.upper())
+
+
+class SymbolInfo(NamedTuple):
+    symbol: str
+    base: str
+    quote: str
+    asset_class: AssetClass
+    tick_size: float  # price increment; 0 if unknown
+    step_size: float  # quantity increment; 0 if unknown
+    price_decimals: int
+    qty_decimals: int
+
+
+def decimals(increment: str) -> int:
+    """Decimal places of an increment written as text ("0.01000000" -> 2)."""
+    try:
+        exponent = Decimal(increment).normalize().as_tuple().exponent
+    except InvalidOperation:
+        return 0
+    return max(0, -exponent) if isinstance(exponent, int) else 0
+
+
+def crypto_info(symbol: str, base: str, quote: str, tick: str, step: str) -> SymbolInfo:
+    return SymbolInfo(
+        symbol,
+        base,
+        quote,
+        AssetClass.CRYPTO,
+        float(tick),
+        float(step),
+        decimals(tick),
+        decimals(step),
+    )
+
+
+def _deletions(key: str) -> set[str]:
+    return {key[:i] + key[i + 1 :] for i in range(len(key))}
+
+
+class SymbolIndex:
+    """Immutable search index over one symbol universe."""
+
+    def __init__(self, entries: list[SymbolInfo]) -> None:
+        self.entries = entries
+        self._by_symbol = {info.symbol: info for info in entries}
+        # (key, kind, entry index); kind is EXACT for names, ALIAS for
+        # aliases and BASE for base assets.
+        keyed: set[tuple[str, int, int]] = set()
+        self._deletes: dict[str, set[str]] = {}
+        self._by_base: dict[str, list[int]] = {}
+        for i, info in enumerate(entries):
+            keyed.add((normalize(info.symbol), EXACT, i))
+            if info.quote in USD_QUOTES:
+                keyed.add((normalize(info.base) + "USD", ALIAS, i))
+            base = normalize(info.base)
+            keyed.add((base, BASE, i))
+            if info.asset_class == AssetClass.FOREX:
+                # Either currency of a pair finds it ("JPY" -> USD/JPY).
+                keyed.add((normalize(info.quote), BASE, i))
+            if base not in self._by_base:
+                self._by_base[base] = []
+                for variant in _deletions(base) | {base}:
+                    self._deletes.setdefault(variant, set()).add(base)
+            self._by_base[base].append(i)
+        ordered = sorted(keyed)
+        self._keys = [k for k, _, _ in ordered]
+        self._refs = [(kind, i) for _, kind, i in ordered]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _rank(self, kind: int, i: int) -> tuple:
+        info = self.entries[i]
+        return (kind, QUOTE_RANK.get(info.quote, len(QUOTE_RANK)), len(info.symbol), info.symbol)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        asset_class: AssetClass | None = None,
+    ) -> list[tuple[SymbolInfo, str]]:
+        """Top `limit` (symbol info, match kind) for `query`, best first."""
+        q = normalize(query)
+        if not q:
+            return []
+        best: dict[int, int] = {}
+
+        def offer(kind: int, i: int) -> None:
+            if asset_class is not None and self.entries[i].asset_class != asset_class:
+                return
+            if kind < best.get(i, len(MATCH_NAMES)):
+                best[i] = kind
+
+        lo = bisect.bisect_left(self._keys, q)
+        for pos in range(lo, min(lo + MAX_PREFIX_SCAN, len(self._keys))):
+            key = self._keys[pos]
+            if not key.startswith(q):
+                break
+            kind, i = self._refs[pos]
+            if key != q:
+                kind = BASE_PREFIX if kind == BASE else PREFIX
+            offer(kind, i)
+
+        if len(best) < limit and len(q) >= 3:
+            # Bases within one edit: they share q or one of its deletions.
+            bases = set()
+            for variant in _deletions(q) | {q}:
+                bases |= self._deletes.get(variant, set())
+            for base in bases:
+                for i in self._by_base[base]:
+                    offer(FUZZY, i)
+
+        top = heapq.nsmallest(limit, best.items(), key=lambda item: self._rank(item[1], item[0]))
+        return [(self.entries[i], MATCH_NAMES[kind]) for i, kind in top]
+
+    def get(self, symbol: str) -> SymbolInfo | None:
+        return self._by_symbol.get(symbol)
+
+    def symbols(self, asset_class: AssetClass) -> list[str]:
+        return sorted(e.symbol for e in self.entries if e.asset_class == asset_class)
+
+
+def _forex_entries() -> list[SymbolInfo]:
+    """Forex pairs quoted to a tenth of a pip (0.001 for JPY quotes).
+
+    Forex candles carry no traded volume, so quantities use a unit step.
+    """
+    entries = []
+    for pair in FOREX_PAIRS:
+        base, quote = pair.split("/", 1)
+        places = 3 if quote == "JPY" else 5
+        entries.append(
+            SymbolInfo(pair, base, quote, AssetClass.FOREX, 10.0**-places, 1.0, places, 0)
+        )
+    return entries
+
+
+class SymbolRegistry:
+    """The current SymbolIndex plus its background refresh."""
+
+    def __init__(self, refresh_seconds: float = settings.SYMBOL_REFRESH_SECONDS) -> None:
+        self._refresh_seconds = refresh_seconds
+        self._provider = BinanceProvider()
+        self._index = SymbolIndex(_forex_entries())
+        self._crypto: list[SymbolInfo] = []
+        self._etag: str | None = None
+        self._loaded_at: float | None = None
+        self._load_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.refreshes = 0
+        self.not_modified = 0
+        self.failures = 0
+
+    @property
+    def index(self) -> SymbolIndex:
+        return self._index
+
+    async def refresh(self) -> None:
+        """Reload the crypto universe unless exchangeInfo is unchanged.
+
+        Raises provider errors; the current index stays in place.
+        """
+        assets, etag = await self._provider.fetch_symbol_assets(self._etag)
+        self._loaded_at = _time.monotonic()
+        if assets is None:
+            self.not_modified += 1
+            return
+        self._crypto = [crypto_info(*asset) for asset in assets]
+        self._etag = etag
+        started = _time.perf_counter()
+        # Build off to the side and swap: searches never see a partial index.
+        self._index = SymbolIndex(self._crypto + _forex_entries())
+        self.refreshes += 1
+        logger.info(
+            "symbol_registry_refreshed",
+            symbols=len(self._index),
+            build_ms=round((_time.perf_counter() - started) * 1000, 2),
+        )
+
+    async def ensure_loaded(self) -> SymbolIndex:
+        """The index, loading the crypto universe first if it never loaded."""
+        if self._loaded_at is None:
+            async with self._load_lock:
+                if self._loaded_at is None:
+                    await self.refresh()
+        return self._index
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="symbol-registry-refresh")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning("symbol_registry_refresh_failed", error=str(e))
+            await asyncio.sleep(self._refresh_seconds)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self._index),
+            "crypto": len(self._crypto),
+            "age_seconds": (
+                None if self._loaded_at is None else round(_time.monotonic() - self._loaded_at)
+            ),
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "failures": self.failures,
+        }
+
+
+symbol_registry = SymbolRegistry()
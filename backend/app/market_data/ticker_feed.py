@@ -0,0 +1,194 @@
+"""Watchlist-wide live tickers from Binance's all-market mini-ticker stream.
+
+One upstream subscription to `!miniTicker@arr` delivers, about once a
+second, the 24h rolling stats of every symbol that changed. TickerFeed
+keeps the latest of them in an in-memory table (last price, 24h change,
+base and quote volume) and records which symbols changed.
+
+Clients send the symbols of their watchlist; every TICKER_PUSH_INTERVAL
+the push loop sends each client only the entries that changed since the
+previous push and are on its watchlist, as one column-wise TickerUpdate.
+This replaces one kline stream per watchlist symbol with a single feed,
+which runs only while at least one client is watching.
+"""
+
+import asyncio
+import json
+import random
+
+import structlog
+import websockets
+from fastapi import WebSocket
+
+from app.config import settings
+from app.market_data.schemas import TickerUpdate
+
+logger = structlog.get_logger()
+
+STREAM_PATH = "/ws/!miniTicker@arr"
+
+MAX_SYMBOLS_PER_CLIENT = 500
+
+# (last price, 24h change percent, base volume, quote volume)
+TickerRow = tuple[float, float, float, float]
+
+
+class TickerFeed:
+    """Shared mini-ticker table and per-client watchlist fan-out."""
+
+    def __init__(self, push_interval: float = settings.TICKER_PUSH_INTERVAL) -> None:
+        self._push_interval = push_interval
+        self._table: dict[str, TickerRow] = {}
+        self._changed: set[str] = set()
+        self._clients: dict[WebSocket, set[str]] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.messages = 0
+        self.pushes = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def watch(self, ws: WebSocket, symbols: list[str]) -> None:
+        """Replace a client's watchlist; an empty list stops its updates.
+
+        The client immediately gets the entries already known for its
+        symbols. Raises ValueError for oversized watchlists.
+        """
+        if len(symbols) > MAX_SYMBOLS_PER_CLIENT:
+            raise ValueError(f"At most {MAX_SYMBOLS_PER_CLIENT} ticker symbols")
+        if not symbols:
+            self.drop_client(ws)
+            return
+        watched = {s.upper() for s in symbols}
+        self._clients[ws] = watched
+        self._start()
+        known = watched & self._table.keys()
+        if known:
+            await ws.send_json(self._payload(sorted(known)))
+
+    def drop_client(self, ws: WebSocket) -> None:
+        self._clients.pop(ws, None)
+        if not self._clients:
+            self._stop()
+
+    def _start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run_stream(), name="ticker-feed-stream"),
+            asyncio.create_task(self._run_push(), name="ticker-feed-push"),
+        ]
+        logger.info("ticker_feed_started")
+
+    def _stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            logger.info("ticker_feed_stopped")
+        self._tasks = []
+        # Entries go stale without the stream; start from scratch next time.
+        self._table.clear()
+        self._changed.clear()
+
+    async def _run_stream(self) -> None:
+        """Consume the mini-ticker array stream, reconnecting with backoff.
+
+        Falls back to binance.us if .com is geo-blocked, like the kline
+        streams.
+        """
+        from app.market_data.providers.binance import _use_fallback
+
+        base_ws_url = settings.BINANCE_WS_URL_FALLBACK if _use_fallback else settings.BINANCE_WS_URL
+        ws_url = f"{base_ws_url}{STREAM_PATH}"
+        tried_fallback = _use_fallback
+        backoff = 1.0
+        max_backoff = 30.0
+
+        while True:
+            try:
+                async with websockets.connect(ws_url, ping_interval=20, ping_timeout=10) as ws:
+                    backoff = 1.0
+                    logger.info("ticker_feed_connected")
+                    async for raw_msg in ws:
+                        try:
+                            self.apply(json.loads(raw_msg))
+                        except (KeyError, ValueError, TypeError) as e:
+                            logger.warning("ticker_feed_parse_error", error=str(e))
+
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                if not tried_fallback:
+                    tried_fallback = True
+                    ws_url = f"{settings.BINANCE_WS_URL_FALLBACK}{STREAM_PATH}"
+                    logger.warning("ticker_feed_geo_blocked_fallback", error=str(e))
+                    continue
+                wait = min(backoff + random.uniform(0, backoff * 0.3), max_backoff)
+                logger.warning("ticker_feed_disconnected", error=str(e), reconnect_in=round(wait, 1))
+                await asyncio.sleep(wait)
+                backoff = min(backoff * 2, max_backoff)
+
+    def apply(self, tickers: list[dict]) -> None:
+        """Fold one mini-ticker array message into the table."""
+        self.messages += 1
+        for t in tickers:
+            close, open_ = float(t["c"]), float(t["o"])
+            row = (
+                close,
+                round((close / open_ - 1) * 100, 4) if open_ else 0.0,
+                float(t["v"]),
+                float(t["q"]),
+            )
+            symbol = t["s"]
+            if self._table.get(symbol) != row:
+                self._table[symbol] = row
+                self._changed.add(symbol)
+
+    async def _run_push(self) -> None:
+        while True:
+            await asyncio.sleep(self._push_interval)
+            await self.push()
+
+    async def push(self) -> None:
+        """Send each client the changed entries on its watchlist."""
+        if not self._changed:
+            return
+        changed, self._changed = self._changed, set()
+        dead = []
+        for ws, watched in list(self._clients.items()):
+            symbols = changed & watched
+            if not symbols:
+                continue
+            try:
+                await ws.send_json(self._payload(sorted(symbols)))
+                self.pushes += 1
+            except Exception:
+                dead.append(ws)
+        for ws in dead:
+            self.drop_client(ws)
+
+    def _payload(self, symbols: list[str]) -> dict:
+        rows = [self._table[s] for s in symbols]
+        return TickerUpdate(
+            symbol=symbols,
+            last=[r[0] for r in rows],
+            change_percent=[r[1] for r in rows],
+            volume=[r[2] for r in rows],
+            quote_volume=[r[3] for r in rows],
+        ).model_dump()
+
+    async def stop(self) -> None:
+        tasks = self._tasks
+        self._clients.clear()
+        self._stop()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "clients": len(self._clients),
+            "symbols": len(self._table),
+            "messages": self.messages,
+            "pushes": self.pushes,
+        }
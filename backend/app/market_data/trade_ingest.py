@@ -0,0 +1,224 @@
+"""Opt-in ingestion of Binance aggregated trades into the TradeStore.
+
+For the symbols in TRADE_INGEST_SYMBOLS one combined aggTrade WebSocket
+stream runs next to the on-demand kline streams of StreamManager. Trades
+are buffered in memory and written by a background flush loop as one
+compressed block per symbol (see trade_store.py).
+
+Memory is bounded by TRADE_INGEST_MAX_BUFFERED: when the writer falls
+behind (slow disk), the reader stops pulling messages off the socket
+until a flush frees space, so back-pressure reaches the TCP connection
+instead of the heap. Aggregate trade ids are consecutive per symbol, so
+a jump after a reconnect is a gap; it is filled from the REST aggTrades
+endpoint, up to MAX_BACKFILL_PAGES pages, before live trades continue.
+"""
+
+import asyncio
+import json
+import random
+
+import structlog
+import websockets
+
+from app.config import settings
+from app.market_data.providers.binance import BinanceProvider
+from app.market_data.trade_store import TradeBatch, TradeStore, trade_store
+
+logger = structlog.get_logger()
+
+FLUSH_INTERVAL_SECONDS = 2.0
+
+# REST pages (1000 trades each) fetched to close one gap.
+MAX_BACKFILL_PAGES = 100
+
+TradeRow = tuple[int, int, float, float, bool]
+
+
+class TradeIngestor:
+    """Record aggregated trades of a fixed set of symbols to disk."""
+
+    def __init__(
+        self,
+        store: TradeStore = trade_store,
+        max_buffered: int = settings.TRADE_INGEST_MAX_BUFFERED,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self._store = store
+        self._max_buffered = max_buffered
+        self._flush_interval = flush_interval
+        self._provider = BinanceProvider()
+        self._symbols: list[str] = []
+        self._last_ids: dict[str, int | None] = {}
+        self._buffer: dict[str, list[TradeRow]] = {}
+        self._buffered = 0
+        self._space = asyncio.Event()
+        self._space.set()
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._running = False
+        self.received = 0
+        self.written = 0
+        self.backfilled = 0
+        self.stalls = 0
+
+    def start(self, symbols: list[str]) -> None:
+        """Start the stream and flush loop for `symbols` (idempotent)."""
+        if self._running or not symbols:
+            return
+        self._running = True
+        self._symbols = [s.upper() for s in symbols]
+        self._tasks = [
+            asyncio.create_task(self._run_stream(), name="trade-ingest-stream"),
+            asyncio.create_task(self._run_flush(), name="trade-ingest-flush"),
+        ]
+        logger.info("trade_ingest_started", symbols=self._symbols)
+
+    async def _run_stream(self) -> None:
+        """Consume the combined aggTrade stream, reconnecting with backoff.
+
+        Falls back to binance.us if .com is geo-blocked, like the kline
+        streams.
+        """
+        from app.market_data.providers.binance import _use_fallback
+
+        for symbol in self._symbols:
+            self._last_ids[symbol] = await asyncio.to_thread(self._store.last_id, symbol)
+
+        streams = "/".join(f"{s.lower()}@aggTrade" for s in self._symbols)
+        path = f"/stream?streams={streams}"
+        base_ws_url = settings.BINANCE_WS_URL_FALLBACK if _use_fallback else settings.BINANCE_WS_URL
+        ws_url = f"{base_ws_url}{path}"
+        tried_fallback = _use_fallback
+        backoff = 1.0
+        max_backoff = 30.0
+
+        while self._running:
+            try:
+                async with websockets.connect(ws_url, ping_interval=20, ping_timeout=10) as ws:
+                    backoff = 1.0
+                    logger.info("trade_ingest_connected", symbols=len(self._symbols))
+                    async for raw_msg in ws:
+                        if not self._space.is_set():
+                            # Writer is behind: stop reading until it catches up.
+                            self.stalls += 1
+                            await self._space.wait()
+                        try:
+                            data = json.loads(raw_msg)["data"]
+                            row = (
+                                int(data["a"]),
+                                int(data["T"]),
+                                float(data["p"]),
+                                float(data["q"]),
+                                bool(data["m"]),
+                            )
+                            symbol = data["s"]
+                        except (KeyError, ValueError, TypeError) as e:
+                            logger.warning("trade_ingest_parse_error", error=str(e))
+                            continue
+                        await self._accept(symbol, row)
+
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                if not self._running:
+                    return
+                if not tried_fallback:
+                    tried_fallback = True
+                    ws_url = f"{settings.BINANCE_WS_URL_FALLBACK}{path}"
+                    logger.warning("trade_ingest_geo_blocked_fallback", error=str(e))
+                    continue
+                wait = min(backoff + random.uniform(0, backoff * 0.3), max_backoff)
+                logger.warning("trade_ingest_disconnected", error=str(e), reconnect_in=round(wait, 1))
+                await asyncio.sleep(wait)
+                backoff = min(backoff * 2, max_backoff)
+
+    async def _accept(self, symbol: str, row: TradeRow) -> None:
+        last = self._last_ids.get(symbol)
+        if last is not None:
+            if row[0] <= last:
+                return
+            if row[0] > last + 1:
+                await self._backfill(symbol, last + 1, row[0] - 1)
+        self._add(symbol, [row])
+        self.received += 1
+
+    async def _backfill(self, symbol: str, from_id: int, to_id: int) -> None:
+        """Fetch trades [from_id, to_id] missed while disconnected."""
+        cursor = from_id
+        for _ in range(MAX_BACKFILL_PAGES):
+            await self._space.wait()
+            try:
+                rows = await self._provider.fetch_agg_trades(symbol, cursor)
+            except Exception as e:
+                logger.warning("trade_ingest_backfill_failed", symbol=symbol, error=str(e))
+                break
+            rows = [r for r in rows if r[0] <= to_id]
+            if not rows:
+                break
+            self._add(symbol, rows)
+            self.backfilled += len(rows)
+            cursor = rows[-1][0] + 1
+            if cursor > to_id:
+                break
+        if cursor <= to_id:
+            logger.warning(
+                "trade_ingest_gap_left",
+                symbol=symbol,
+                from_id=cursor,
+                to_id=to_id,
+            )
+
+    def _add(self, symbol: str, rows: list[TradeRow]) -> None:
+        self._buffer.setdefault(symbol, []).extend(rows)
+        self._buffered += len(rows)
+        self._last_ids[symbol] = rows[-1][0]
+        if self._buffered >= self._max_buffered:
+            self._space.clear()
+            self._wake.set()
+
+    async def _run_flush(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far, one block per symbol."""
+        if not self._buffer:
+            return
+        pending, self._buffer, self._buffered = self._buffer, {}, 0
+        for symbol, rows in pending.items():
+            batch = TradeBatch.from_rows(rows)
+            try:
+                self.written += await asyncio.to_thread(self._store.append, symbol, batch)
+            except Exception as e:
+                # Trades are lost; the file stays consistent and later
+                # appends continue after the gap.
+                logger.error("trade_ingest_write_failed", symbol=symbol, count=len(batch), error=str(e))
+        self._space.set()
+
+    async def stop(self) -> None:
+        """Stop ingesting and write whatever is still buffered."""
+        if not self._running:
+            return
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+        logger.info("trade_ingest_stopped", written=self.written)
+
+    def stats(self) -> dict:
+        return {
+            "symbols": self._symbols,
+            "buffered": self._buffered,
+            "max_buffered": self._max_buffered,
+            "received": self.received,
+            "backfilled": self.backfilled,
+            "written": self.written,
+            "stalls": self.stalls,
+        }
@@ -0,0 +1,307 @@
+"""Append-only, compressed, day-partitioned store for aggregated trades.
+
+Layout on disk, one directory per symbol and UTC day:
+
+    {TRADE_STORE_DIR}/{symbol}/{YYYY-MM-DD}/blocks.bin   compressed blocks
+                                           /index.bin    one record per block
+
+A block holds the trades of one flush in column order: aggregate trade id
+and time (ms) as int64 deltas from the block's first row, price and
+quantity as float64, and the buyer-is-maker flag as uint8, all zlib
+compressed together. The index record of a block is six little-endian
+int64s: (first_time, last_time, offset, length, count, last_id).
+
+Blocks are written before their index record, and a partition's readable
+content is whatever its index describes; a crash between the two leaves
+a torn tail in blocks.bin that the next append truncates, as in the
+candle cold store. Reads binary-search the in-memory index for the blocks
+overlapping a time range and decompress only those.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import zlib
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.market_data.cold_store import symbol_dir_name
+
+logger = structlog.get_logger()
+
+TRADE_COLUMNS: tuple[str, ...] = ("id", "time", "price", "qty", "buyer_maker")
+
+_DTYPES: dict[str, np.dtype] = {
+    "id": np.dtype("<i8"),
+    "time": np.dtype("<i8"),
+    "price": np.dtype("<f8"),
+    "qty": np.dtype("<f8"),
+    "buyer_maker": np.dtype("u1"),
+}
+
+# Index record fields (int64 each).
+_FIRST_TIME, _LAST_TIME, _OFFSET, _LENGTH, _COUNT, _LAST_ID = range(6)
+_RECORD_FIELDS = 6
+
+# Rows per block at most; larger appends are split.
+MAX_BLOCK_ROWS = 65_536
+
+DAY_MS = 86_400_000
+
+
+class TradeBatch:
+    """A chronologically ordered run of aggregated trades stored column-wise.
+
+    `time` is Unix milliseconds; `buyer_maker` is True when the buyer was
+    the maker, i.e. the aggressor sold.
+    """
+
+    __slots__ = TRADE_COLUMNS
+
+    def __init__(
+        self,
+        id: np.ndarray,
+        time: np.ndarray,
+        price: np.ndarray,
+        qty: np.ndarray,
+        buyer_maker: np.ndarray,
+    ) -> None:
+        self.id = id
+        self.time = time
+        self.price = price
+        self.qty = qty
+        self.buyer_maker = buyer_maker
+
+    @classmethod
+    def empty(cls) -> TradeBatch:
+        return cls(*(np.empty(0, dtype=_DTYPES[c]) for c in TRADE_COLUMNS[:-1]), np.empty(0, dtype=bool))
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple[int, int, float, float, bool]]) -> TradeBatch:
+        """Build a batch from (id, time_ms, price, qty, buyer_maker) tuples."""
+        if not rows:
+            return cls.empty()
+        id_, time, price, qty, maker = zip(*rows)
+        return cls(
+            np.array(id_, dtype=np.int64),
+            np.array(time, dtype=np.int64),
+            np.array(price, dtype=np.float64),
+            np.array(qty, dtype=np.float64),
+            np.array(maker, dtype=bool),
+        )
+
+    @classmethod
+    def concat(cls, batches: list[TradeBatch]) -> TradeBatch:
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(*(np.concatenate([getattr(b, c) for b in batches]) for c in TRADE_COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, index: slice | np.ndarray) -> TradeBatch:
+        return TradeBatch(*(getattr(self, c)[index] for c in TRADE_COLUMNS))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in TRADE_COLUMNS)
+
+    def between(self, start_ms: int, end_ms: int) -> TradeBatch:
+        """Trades with start_ms <= time <= end_ms."""
+        lo = int(np.searchsorted(self.time, start_ms, "left"))
+        hi = int(np.searchsorted(self.time, end_ms, "right"))
+        return self[lo:hi]
+
+
+def _encode(batch: TradeBatch) -> bytes:
+    parts = [
+        np.diff(batch.id, prepend=batch.id[0]).astype(_DTYPES["id"]),
+        np.diff(batch.time, prepend=batch.time[0]).astype(_DTYPES["time"]),
+        batch.price.astype(_DTYPES["price"]),
+        batch.qty.astype(_DTYPES["qty"]),
+        batch.buyer_maker.astype(_DTYPES["buyer_maker"]),
+    ]
+    header = np.array([batch.id[0], batch.time[0]], dtype="<i8")
+    return zlib.compress(header.tobytes() + b"".join(p.tobytes() for p in parts), 6)
+
+
+def _decode(data: bytes, count: int) -> TradeBatch:
+    raw = zlib.decompress(data)
+    first_id, first_time = np.frombuffer(raw, dtype="<i8", count=2)
+    offset = 16
+    columns = []
+    for c in TRADE_COLUMNS:
+        dtype = _DTYPES[c]
+        columns.append(np.frombuffer(raw, dtype=dtype, count=count, offset=offset))
+        offset += count * dtype.itemsize
+    id_, time, price, qty, maker = columns
+    return TradeBatch(
+        np.cumsum(id_) + first_id,
+        np.cumsum(time) + first_time,
+        price,
+        qty,
+        maker.astype(bool),
+    )
+
+
+class _TradePartition:
+    """Open handle on one (symbol, day) partition."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        index_file = path / "index.bin"
+        if index_file.exists():
+            raw = np.fromfile(index_file, dtype="<i8")
+            whole = len(raw) // _RECORD_FIELDS * _RECORD_FIELDS
+            self.index = raw[:whole].reshape(-1, _RECORD_FIELDS).astype(np.int64)
+        else:
+            self.index = np.empty((0, _RECORD_FIELDS), dtype=np.int64)
+
+    @property
+    def data_size(self) -> int:
+        if not len(self.index):
+            return 0
+        return int(self.index[-1, _OFFSET] + self.index[-1, _LENGTH])
+
+    @property
+    def last_id(self) -> int | None:
+        return int(self.index[-1, _LAST_ID]) if len(self.index) else None
+
+    def append(self, batch: TradeBatch) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        records = []
+        offset = self.data_size
+        with open(self.path / "blocks.bin", "ab") as fh:
+            # Drop any torn tail left by an interrupted previous append.
+            fh.truncate(offset)
+            for lo in range(0, len(batch), MAX_BLOCK_ROWS):
+                block = batch[lo : lo + MAX_BLOCK_ROWS]
+                data = _encode(block)
+                fh.write(data)
+                records.append(
+                    [block.time[0], block.time[-1], offset, len(data), len(block), block.id[-1]]
+                )
+                offset += len(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        new = np.array(records, dtype=np.int64)
+        with open(self.path / "index.bin", "ab") as fh:
+            fh.truncate(self.index.size * 8)
+            fh.write(new.astype("<i8").tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.index = np.concatenate([self.index, new])
+
+    def blocks(self, start_ms: int, end_ms: int) -> Iterator[TradeBatch]:
+        """Decode the blocks overlapping [start_ms, end_ms], trimmed to it."""
+        if not len(self.index):
+            return
+        # Blocks are in time order, so both bounds are binary searches.
+        lo = int(np.searchsorted(self.index[:, _LAST_TIME], start_ms, "left"))
+        hi = int(np.searchsorted(self.index[:, _FIRST_TIME], end_ms, "right"))
+        if lo >= hi:
+            return
+        with open(self.path / "blocks.bin", "rb") as fh:
+            for first_time, last_time, offset, length, count, _ in self.index[lo:hi]:
+                fh.seek(int(offset))
+                batch = _decode(fh.read(int(length)), int(count))
+                if first_time < start_ms or last_time > end_ms:
+                    batch = batch.between(start_ms, end_ms)
+                yield batch
+
+
+def day_of(ms: int) -> str:
+    return datetime.fromtimestamp(ms // 1000, tz=timezone.utc).date().isoformat()
+
+
+class TradeStore:
+    """Day-partitioned aggregated-trade files (see module docstring).
+
+    Appends must be newer than what is stored: rows at or below the last
+    stored aggregate trade id are dropped, so replays after a reconnect
+    are harmless. Blocking file I/O; call via asyncio.to_thread from async
+    code.
+    """
+
+    def __init__(self, root: str) -> None:
+        self._root = Path(root)
+        self._partitions: dict[tuple[str, str], _TradePartition] = {}
+        self._last_ids: dict[str, int | None] = {}
+        self._lock = threading.Lock()
+
+    def _symbol_dir(self, symbol: str) -> Path:
+        return self._root / symbol_dir_name(symbol)
+
+    def _get(self, symbol: str, day: str) -> _TradePartition:
+        key = (symbol, day)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = _TradePartition(self._symbol_dir(symbol) / day)
+            self._partitions[key] = partition
+        return partition
+
+    def last_id(self, symbol: str) -> int | None:
+        """Aggregate trade id of the newest stored trade, or None."""
+        if symbol not in self._last_ids:
+            last = None
+            directory = self._symbol_dir(symbol)
+            if directory.exists():
+                # ISO dates sort chronologically; skip empty partitions.
+                for day in sorted((p.name for p in directory.iterdir()), reverse=True):
+                    last = self._get(symbol, day).last_id
+                    if last is not None:
+                        break
+            self._last_ids[symbol] = last
+        return self._last_ids[symbol]
+
+    def append(self, symbol: str, batch: TradeBatch) -> int:
+        """Append trades in id order; returns the number of rows written."""
+        with self._lock:
+            last = self.last_id(symbol)
+            if last is not None:
+                batch = batch[batch.id > last]
+            if not len(batch):
+                return 0
+            days = (batch.time // DAY_MS).astype(np.int64)
+            cuts = np.flatnonzero(np.diff(days)) + 1
+            for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(batch)]):
+                part = batch[int(lo) : int(hi)]
+                self._get(symbol, day_of(int(part.time[0]))).append(part)
+            self._last_ids[symbol] = int(batch.id[-1])
+        return len(batch)
+
+    def iter_range(self, symbol: str, start_ms: int, end_ms: int) -> Iterator[TradeBatch]:
+        """Yield stored trades in [start_ms, end_ms] block by block."""
+        day = datetime.fromtimestamp(start_ms // 1000, tz=timezone.utc).date()
+        last_day = datetime.fromtimestamp(end_ms // 1000, tz=timezone.utc).date()
+        directory = self._symbol_dir(symbol)
+        while day <= last_day:
+            name = day.isoformat()
+            if (directory / name).exists():
+                for batch in self._get(symbol, name).blocks(start_ms, end_ms):
+                    if len(batch):
+                        yield batch
+            day += timedelta(days=1)
+
+    def read(self, symbol: str, start_ms: int, end_ms: int, limit: int) -> TradeBatch:
+        """Return up to `limit` stored trades from start_ms onwards."""
+        batches = []
+        count = 0
+        for batch in self.iter_range(symbol, start_ms, end_ms):
+            batches.append(batch[: limit - count])
+            count += len(batches[-1])
+            if count >= limit:
+                break
+        return TradeBatch.concat(batches)
+
+
+trade_store = TradeStore(settings.TRADE_STORE_DIR)
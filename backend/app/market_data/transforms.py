@@ -0,0 +1,501 @@
+"""Chart transforms: Heikin-Ashi, Renko, range and activity bars.
+
+Each transform turns source candles into display bars, both over a whole
+batch (for /history?transform=) and incrementally per streamed candle (for
+WebSocket transform channels). Brick and activity bars can also be built
+from recorded aggregated trades (trade_store.py), each trade acting as a
+candle with open = high = low = close = price:
+
+- heikin_ashi: one bar per candle. HA open is an exponential average of the
+  previous HA bars, so the batch form is evaluated with the closed-form
+  smoother from indicators.py and needs a short warm-up to converge.
+- renko: fixed-size bricks from candle closes. Brick edges sit on a fixed
+  grid of multiples of brick_size, so bricks do not depend on where the
+  source range starts; a reversal needs a move of two bricks.
+- range: bars whose high - low equals brick_size, built from the path
+  open -> low -> high -> close (open -> high -> low -> close on down
+  candles) through each source candle.
+- tick / volume / dollar: activity bars closing every `ticks` trades,
+  `threshold` base volume or `threshold` quote volume. A row belongs to
+  bar floor(activity before the row / size), counted from UTC midnight,
+  so bars sit on a fixed grid per day and do not depend on where the
+  source range starts; a row that crosses several multiples still makes
+  one bar. From candles the bars close on candle boundaries and dollar
+  volume uses the typical price; tick bars need trades.
+
+Brick-style bars are not aligned with source candles. Each new bar takes
+its source candle's open time, bumped by one second past the previous
+bar when several bars form in the same candle, so bar times are strictly
+increasing and the series stays chartable.
+
+A TransformState advances in O(1) per source candle (plus O(1) per bar
+produced). `update(candle, is_closed)` previews a forming candle without
+changing state and commits closed ones, like IndicatorState.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from app.market_data.batch import CandleBatch
+from app.market_data.indicators import ewm
+from app.market_data.schemas import OHLCVCandle, interval_seconds
+from app.market_data.trade_store import TradeBatch
+
+TRANSFORM_DEFAULTS: dict[str, dict[str, float | None]] = {
+    "heikin_ashi": {},
+    "renko": {"brick_size": None},
+    "range": {"brick_size": None},
+    "tick": {"ticks": None},
+    "volume": {"threshold": None},
+    "dollar": {"threshold": None},
+}
+
+ACTIVITY_TRANSFORMS = ("tick", "volume", "dollar")
+
+BRICK_TRANSFORMS = ("renko", "range")
+
+# Activity bars restart their count at every UTC midnight.
+ACTIVITY_ANCHOR_SECONDS = 86400
+
+# HA open converges as 0.5^k; 16 candles put the seed's weight below 2e-5.
+HEIKIN_ASHI_WARMUP = 16
+
+# Source candles replayed to seed a streamed brick transform.
+BRICK_SEED_CANDLES = 1000
+
+# Guards against brick sizes far too small for the price scale.
+MAX_BARS_PER_CANDLE = 10_000
+MAX_BARS = 200_000
+
+# Smallest streamed renko / range brick as a fraction of the price: a 10%
+# candle then stays within MAX_BARS_PER_CANDLE bars.
+MIN_BRICK_FRACTION = 1e-5
+
+Row = tuple[int, float, float, float, float, float]
+
+
+def resolve_transform_params(name: str, params: dict) -> dict[str, float]:
+    """Validate transform params; brick_size is required for renko/range.
+
+    Raises ValueError on unknown transforms or invalid params.
+    """
+    defaults = TRANSFORM_DEFAULTS.get(name)
+    if defaults is None:
+        raise ValueError(f"Unknown transform: {name!r}")
+    for key in params:
+        if key not in defaults:
+            raise ValueError(f"Unknown parameter {key!r} for {name}")
+
+    resolved = {}
+    for key in defaults:
+        value = params.get(key, defaults[key])
+        if value is None:
+            raise ValueError(f"{name}.{key} is required")
+        if (
+            isinstance(value, bool)
+            or not isinstance(value, (int, float))
+            or not math.isfinite(value)
+            or value <= 0
+        ):
+            raise ValueError(f"{name}.{key} must be a positive number")
+        resolved[key] = float(value)
+    return resolved
+
+
+def transform_warmup(name: str, interval: str, first_time: int) -> int:
+    """Source candles to load before a /history range for settled output.
+
+    Activity bars need the candles since the UTC midnight before
+    `first_time`.
+    """
+    if name == "heikin_ashi":
+        return HEIKIN_ASHI_WARMUP
+    if name in ACTIVITY_TRANSFORMS:
+        return (first_time % ACTIVITY_ANCHOR_SECONDS) // interval_seconds(interval)
+    return 0
+
+
+def heikin_ashi(batch: CandleBatch) -> CandleBatch:
+    """Vectorized Heikin-Ashi; the first bar opens at the source open."""
+    if not len(batch):
+        return CandleBatch.empty()
+    ha_close = (batch.open + batch.high + batch.low + batch.close) / 4
+    # ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2, ha_open[0] = open[0]
+    ha_open = ewm(np.concatenate(([batch.open[0]], ha_close[:-1])), 0.5, 1)
+    return CandleBatch(
+        batch.time,
+        ha_open,
+        np.maximum.reduce([batch.high, ha_open, ha_close]),
+        np.minimum.reduce([batch.low, ha_open, ha_close]),
+        ha_close,
+        batch.volume,
+    )
+
+
+def activity_measure(name: str, batch: CandleBatch, from_trades: bool) -> np.ndarray:
+    """Per-row activity counted by tick / volume / dollar bars."""
+    if name == "tick":
+        if not from_trades:
+            raise ValueError("tick bars need recorded trades")
+        return np.ones(len(batch))
+    if name == "volume":
+        return batch.volume
+    price = batch.close if from_trades else (batch.high + batch.low + batch.close) / 3
+    return batch.volume * price
+
+
+def _activity_size(name: str, params: dict) -> float:
+    return params["ticks"] if name == "tick" else params["threshold"]
+
+
+def activity_bars(batch: CandleBatch, measure: np.ndarray, size: float) -> CandleBatch:
+    """Vectorized activity bars (see module docstring).
+
+    The bar still in progress at the end of the batch is the last row.
+    """
+    if not len(batch):
+        return CandleBatch.empty()
+    day = batch.time // ACTIVITY_ANCHOR_SECONDS
+    day_starts = np.flatnonzero(np.diff(day)) + 1
+    # Running activity before each row, restarted per day. Each day is a
+    # separate cumsum so the float sums match the incremental state.
+    before = np.empty(len(batch))
+    for lo, hi in zip(np.r_[0, day_starts], np.r_[day_starts, len(batch)]):
+        before[lo:hi] = np.r_[0.0, np.cumsum(measure[lo:hi])[:-1]]
+    key = np.floor(before / size)
+    starts = np.flatnonzero(np.r_[True, (np.diff(day) != 0) | (np.diff(key) != 0)])
+    if len(starts) > MAX_BARS:
+        raise ValueError(f"bars would exceed {MAX_BARS}; increase the bar size")
+
+    ends = np.r_[starts[1:], len(batch)] - 1
+    # Strictly increasing bar times: t'[i] = max(t[i], t'[i - 1] + 1).
+    offsets = np.arange(len(starts))
+    time = np.maximum.accumulate(batch.time[starts] - offsets) + offsets
+    return CandleBatch(
+        time.astype(np.int64),
+        batch.open[starts],
+        np.maximum.reduceat(batch.high, starts),
+        np.minimum.reduceat(batch.low, starts),
+        batch.close[ends],
+        np.add.reduceat(batch.volume, starts),
+    )
+
+
+def trade_rows(trades: TradeBatch) -> CandleBatch:
+    """Trades as one-price source rows (time in seconds, volume = quantity)."""
+    return CandleBatch(
+        trades.time // 1000,
+        trades.price,
+        trades.price,
+        trades.price,
+        trades.price,
+        trades.qty,
+    )
+
+
+def apply_transform(
+    batch: CandleBatch, name: str, params: dict, from_trades: bool = False
+) -> CandleBatch:
+    """Transform a whole batch (`params` already resolved).
+
+    With `from_trades` the rows are trades (see trade_rows). For range and
+    activity bars the bar still in progress at the end of the batch is
+    included as the last row. Raises ValueError if the output would exceed
+    MAX_BARS.
+    """
+    if name == "heikin_ashi":
+        if from_trades:
+            raise ValueError("heikin_ashi is built from candles only")
+        return heikin_ashi(batch)
+    if name in ACTIVITY_TRANSFORMS:
+        measure = activity_measure(name, batch, from_trades)
+        return activity_bars(batch, measure, _activity_size(name, params))
+
+    state = create_transform_state(name, params)
+    rows: list[Row] = []
+    forming = None
+    for row in zip(*(column.tolist() for column in batch.columns())):
+        completed, forming = state._step(*row, commit=True)
+        rows.extend(completed)
+        if len(rows) > MAX_BARS:
+            raise ValueError(f"{name} produced more than {MAX_BARS} bars; increase brick_size")
+    if forming is not None:
+        rows.append(forming)
+    return CandleBatch.from_rows(rows)
+
+
+class TransformState(ABC):
+    """Incremental evaluator for one transform configuration.
+
+    `_step` returns (completed bars, bar in progress or None) for one
+    source candle and commits only when `commit` is true.
+    """
+
+    def __init__(self) -> None:
+        self.last_time: int | None = None
+
+    @abstractmethod
+    def _step(
+        self, t: int, o: float, h: float, lo: float, c: float, v: float, commit: bool
+    ) -> tuple[list[Row], Row | None]:
+        """Completed bars and the bar in progress after one source candle."""
+
+    def seed(self, batch: CandleBatch) -> None:
+        """Commit a run of closed source candles, in chronological order."""
+        batch = batch.between(None if self.last_time is None else self.last_time + 1, None)
+        for row in zip(*(column.tolist() for column in batch.columns())):
+            self._step(*row, commit=True)
+        if len(batch):
+            self.last_time = int(batch.time[-1])
+
+    def update(
+        self, candle: OHLCVCandle, is_closed: bool
+    ) -> tuple[list[OHLCVCandle], OHLCVCandle | None] | None:
+        """Evaluate a streamed source candle.
+
+        Returns (completed bars, bar in progress), or None for candles at or
+        before the last committed one. For a forming source candle the
+        completed bars are provisional and superseded by the next update.
+        """
+        if self.last_time is not None and candle.time <= self.last_time:
+            return None
+        completed, forming = self._step(
+            candle.time,
+            candle.open,
+            candle.high,
+            candle.low,
+            candle.close,
+            candle.volume,
+            commit=is_closed,
+        )
+        if is_closed:
+            self.last_time = candle.time
+        return [_to_candle(r) for r in completed], None if forming is None else _to_candle(forming)
+
+
+def _to_candle(row: Row) -> OHLCVCandle:
+    t, o, h, lo, c, v = row
+    return OHLCVCandle(time=t, open=o, high=h, low=lo, close=c, volume=v)
+
+
+class _HeikinAshiState(TransformState):
+    def __init__(self) -> None:
+        super().__init__()
+        self.prev_open: float | None = None
+        self.prev_close = 0.0
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        ha_close = (o + h + lo + c) / 4
+        ha_open = o if self.prev_open is None else (self.prev_open + self.prev_close) / 2
+        row = (t, ha_open, max(h, ha_open, ha_close), min(lo, ha_open, ha_close), ha_close, v)
+        if not commit:
+            return [], row
+        self.prev_open, self.prev_close = ha_open, ha_close
+        return [row], None
+
+
+class _BarState(TransformState):
+    """Shared plumbing for brick-style transforms: previews run on a copy."""
+
+    def __init__(self, brick_size: float) -> None:
+        super().__init__()
+        self.size = brick_size
+        self.last_bar_time: int | None = None
+
+    def _bar_time(self, t: int) -> int:
+        bar_time = t if self.last_bar_time is None else max(t, self.last_bar_time + 1)
+        self.last_bar_time = bar_time
+        return bar_time
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        target = self if commit else copy.copy(self)
+        return target._advance(t, o, h, lo, c, v)
+
+    @abstractmethod
+    def _advance(
+        self, t: int, o: float, h: float, lo: float, c: float, v: float
+    ) -> tuple[list[Row], Row | None]:
+        """`_step` on the committed state (or a throwaway copy of it)."""
+
+
+class _RenkoState(_BarState):
+    def __init__(self, brick_size: float) -> None:
+        super().__init__(brick_size)
+        self.level: int | None = None  # close of the last brick, in bricks
+        self.direction = 0
+        self.volume = 0.0  # traded since the last brick
+
+    def _advance(self, t, o, h, lo, c, v):
+        size = self.size
+        if self.level is None:
+            self.level = math.floor(c / size)
+            self.volume += v
+            return [], None
+
+        # After a down brick the next up brick starts one brick higher
+        # (and vice versa), which is what makes a reversal cost two bricks.
+        up_from = self.level + (1 if self.direction < 0 else 0)
+        down_from = self.level - (1 if self.direction > 0 else 0)
+        up_to = math.floor(c / size)
+        down_to = math.ceil(c / size)
+
+        if up_to > up_from:
+            edges, level, direction = range(up_from, up_to + 1), up_to, 1
+        elif down_to < down_from:
+            edges, level, direction = range(down_from, down_to - 1, -1), down_to, -1
+        else:
+            self.volume += v
+            return [], None
+
+        count = len(edges) - 1
+        if count > MAX_BARS_PER_CANDLE:
+            raise ValueError("renko brick_size is too small for this price range")
+        self.level, self.direction = level, direction
+        volume, self.volume = (self.volume + v) / count, 0.0
+        rows = []
+        for a, b in zip(edges, edges[1:]):
+            start, end = a * size, b * size
+            rows.append((self._bar_time(t), start, max(start, end), min(start, end), end, volume))
+        return rows, None
+
+
+class _RangeState(_BarState):
+    def __init__(self, brick_size: float) -> None:
+        super().__init__(brick_size)
+        self.bar: list | None = None  # [time, open, high, low, close, volume]
+
+    def _new_bar(self, t: int, price: float) -> list:
+        return [self._bar_time(t), price, price, price, price, 0.0]
+
+    def _advance(self, t, o, h, lo, c, v):
+        size = self.size
+        path = (o, lo, h, c) if c >= o else (o, h, lo, c)
+        # Every new bar covers `size` of the price path: bound them up front
+        # so a rejected candle leaves the state untouched.
+        last = o if self.bar is None else self.bar[4]
+        travel = sum(abs(b - a) for a, b in zip((last, *path), path))
+        if travel / size > MAX_BARS_PER_CANDLE:
+            raise ValueError("range brick_size is too small for this price range")
+
+        if self.bar is None:
+            self.bar = self._new_bar(t, o)
+        bars = [self.bar]
+
+        for target in path:
+            bar = bars[-1]
+            while bar[4] != target:
+                if target > bar[4]:
+                    limit = bar[3] + size
+                    if target < limit:
+                        bar[2] = max(bar[2], target)
+                        bar[4] = target
+                        break
+                    bar[2] = bar[4] = limit
+                else:
+                    limit = bar[2] - size
+                    if target > limit:
+                        bar[3] = min(bar[3], target)
+                        bar[4] = target
+                        break
+                    bar[3] = bar[4] = limit
+                bar = self._new_bar(t, limit)
+                bars.append(bar)
+
+        share = v / len(bars)
+        for bar in bars:
+            bar[5] += share
+        self.bar = bars[-1]
+        return [tuple(b) for b in bars[:-1]], tuple(self.bar)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        if commit:
+            return self._advance(t, o, h, lo, c, v)
+        # The bar in progress is mutable; previews work on a private copy.
+        target = copy.copy(self)
+        if self.bar is not None:
+            target.bar = list(self.bar)
+        return target._advance(t, o, h, lo, c, v)
+
+
+class _ActivityState(_BarState):
+    """Volume / dollar bars over streamed candles."""
+
+    def __init__(self, name: str, size: float) -> None:
+        super().__init__(size)
+        self.name = name
+        self.day: int | None = None
+        self.total = 0.0  # activity since UTC midnight
+        self.bar: list | None = None
+
+    def _advance(self, t, o, h, lo, c, v):
+        measure = v if self.name == "volume" else v * (h + lo + c) / 3
+        completed = []
+        day = t // ACTIVITY_ANCHOR_SECONDS
+        if day != self.day:
+            if self.bar is not None:
+                completed.append(tuple(self.bar))
+                self.bar = None
+            self.day, self.total = day, 0.0
+
+        if self.bar is None:
+            self.bar = [self._bar_time(t), o, h, lo, c, v]
+        else:
+            bar = self.bar
+            bar[2], bar[3], bar[4], bar[5] = max(bar[2], h), min(bar[3], lo), c, bar[5] + v
+
+        key = math.floor(self.total / self.size)
+        self.total += measure
+        if math.floor(self.total / self.size) != key:
+            completed.append(tuple(self.bar))
+            self.bar = None
+        return completed, None if self.bar is None else tuple(self.bar)
+
+    def _step(self, t, o, h, lo, c, v, commit):
+        if commit:
+            return self._advance(t, o, h, lo, c, v)
+        target = copy.copy(self)
+        if self.bar is not None:
+            target.bar = list(self.bar)
+        return target._advance(t, o, h, lo, c, v)
+
+
+def check_brick_size(name: str, params: dict, price: float) -> None:
+    """Reject renko / range bricks too small to stream at `price`.
+
+    Raises ValueError; other transforms are always accepted.
+    """
+    if name not in BRICK_TRANSFORMS:
+        return
+    minimum = abs(price) * MIN_BRICK_FRACTION
+    if params["brick_size"] < minimum:
+        raise ValueError(f"{name}.brick_size must be at least {minimum:.6g} at the current price")
+
+
+def create_transform_state(name: str, params: dict) -> TransformState:
+    """Create an incremental evaluator (`params` already resolved).
+
+    Raises ValueError for transforms that cannot run on streamed candles.
+    """
+    if name == "heikin_ashi":
+        return _HeikinAshiState()
+    if name == "renko":
+        return _RenkoState(**params)
+    if name == "range":
+        return _RangeState(**params)
+    if name == "tick":
+        raise ValueError("tick bars need recorded trades and are served by /history only")
+    if name in ACTIVITY_TRANSFORMS:
+        return _ActivityState(name, _activity_size(name, params))
+    raise ValueError(f"Unknown transform: {name!r}")
+
+
+def seed_candles(name: str, interval: str, forming_time: int) -> int:
+    """Source candles replayed to seed a streamed transform."""
+    if name in ACTIVITY_TRANSFORMS:
+        return transform_warmup(name, interval, forming_time)
+    return HEIKIN_ASHI_WARMUP if name == "heikin_ashi" else BRICK_SEED_CANDLES
@@ -0,0 +1,307 @@
+"""Volume profile (volume at price) over arbitrary time ranges.
+
+Volume is binned over price on a canonical grid whose step is a power of
+ten about 1/10,000 of the price (1 for BTCUSDT near 60,000, 0.0001 for
+EUR/USD), so histograms built separately share bin edges and merge by
+plain addition. Each candle's volume is spread evenly over the bins from
+its low to its high; with a difference array this is two bincounts and a
+cumsum per batch, not a loop over candles.
+
+Profiles are built from the finest interval whose candle count over the
+range stays under VOLUME_PROFILE_MAX_CANDLES. Closed UTC days are
+histogrammed once and kept in a byte-budgeted LRU (DayProfileCache), so
+a long range only loads the days it has not seen plus the partial days
+at its edges. The merged histogram is then grouped into the requested
+number of rows.
+"""
+
+import math
+import time as _time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.market_data.batch import CandleBatch
+from app.market_data.schemas import INTERVAL_SECONDS
+from app.market_data.service import MarketDataService
+
+logger = structlog.get_logger()
+
+DAY_SECONDS = 86400
+
+# Candidate source intervals, finest first.
+SOURCE_INTERVALS = ("1m", "5m", "15m", "30m", "1H", "4H", "1D")
+
+# Canonical bin step = 10 ** (floor(log10(price)) - GRID_DIGITS).
+GRID_DIGITS = 4
+
+
+class Histogram(NamedTuple):
+    """Volume per canonical bin: bin i covers [(first + i) * 10**exp, ... + 10**exp)."""
+
+    exp: int
+    first: int
+    up: np.ndarray  # volume of candles closing at or above their open
+    down: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.up.nbytes + self.down.nbytes
+
+    @property
+    def step(self) -> float:
+        return 10.0**self.exp
+
+
+EMPTY = Histogram(0, 0, np.zeros(0), np.zeros(0))
+
+
+def source_interval(start_time: int, end_time: int) -> str:
+    """Finest interval with at most VOLUME_PROFILE_MAX_CANDLES candles in the range."""
+    span = end_time - start_time + 1
+    for interval in SOURCE_INTERVALS:
+        if span / INTERVAL_SECONDS[interval] <= settings.VOLUME_PROFILE_MAX_CANDLES:
+            return interval
+    return SOURCE_INTERVALS[-1]
+
+
+def _indices(prices: np.ndarray, exp: int) -> np.ndarray:
+    # Multiply by the inverse power of ten: exact for the common tick sizes
+    # where dividing by a fractional step is not.
+    return np.floor(prices * 10.0**-exp + 1e-9).astype(np.int64)
+
+
+def histogram(batch: CandleBatch) -> Histogram:
+    """Spread each candle's volume evenly over the bins its range touches."""
+    valid = (batch.low > 0) & (batch.high >= batch.low) & (batch.volume > 0)
+    if not valid.any():
+        return EMPTY
+    low, high = batch.low[valid], batch.high[valid]
+    volume = batch.volume[valid]
+    up = batch.close[valid] >= batch.open[valid]
+
+    exp = math.floor(math.log10(float(high.max()))) - GRID_DIGITS
+    lo, hi = _indices(low, exp), _indices(high, exp)
+    first = int(lo.min())
+    n = int(hi.max()) - first + 1
+    share = volume / (hi - lo + 1)
+
+    def spread(mask: np.ndarray) -> np.ndarray:
+        # Difference array: +share from a candle's first bin, -share after
+        # its last; the running sum is the volume in each bin.
+        diff = np.bincount(lo[mask] - first, share[mask], minlength=n + 1)
+        diff -= np.bincount(hi[mask] - first + 1, share[mask], minlength=n + 1)
+        return np.maximum(np.cumsum(diff[:n]), 0.0)
+
+    return Histogram(exp, first, spread(up), spread(~up))
+
+
+def merge(parts: list[Histogram]) -> Histogram:
+    """Sum histograms, regridding finer ones to the coarsest step present."""
+    parts = [p for p in parts if len(p.up)]
+    if not parts:
+        return EMPTY
+    exp = max(p.exp for p in parts)
+    regridded = []
+    for p in parts:
+        index = p.first + np.arange(len(p.up))
+        if p.exp < exp:
+            # Finer steps are powers of ten smaller, so their bins nest.
+            index //= 10 ** (exp - p.exp)
+        regridded.append((index, p))
+    first = min(int(index[0]) for index, _ in regridded)
+    n = max(int(index[-1]) for index, _ in regridded) - first + 1
+    index = np.concatenate([index for index, _ in regridded]) - first
+    up = np.bincount(index, np.concatenate([p.up for _, p in regridded]), minlength=n)
+    down = np.bincount(index, np.concatenate([p.down for _, p in regridded]), minlength=n)
+    return Histogram(exp, first, up, down)
+
+
+def value_area(volume: np.ndarray, fraction: float) -> tuple[int, int]:
+    """Inclusive row range around the point of control holding `fraction` of volume.
+
+    Grows from the highest-volume row, each time taking the heavier of the
+    rows just above and below.
+    """
+    poc = int(np.argmax(volume))
+    target = volume.sum() * fraction
+    lo = hi = poc
+    total = volume[poc]
+    while total < target and (lo > 0 or hi < len(volume) - 1):
+        below = volume[lo - 1] if lo > 0 else -1.0
+        above = volume[hi + 1] if hi < len(volume) - 1 else -1.0
+        if above >= below:
+            hi += 1
+            total += above
+        else:
+            lo -= 1
+            total += below
+    return lo, hi
+
+
+def summarize(hist: Histogram, rows: int, fraction: float) -> dict:
+    """Group the canonical bins into at most `rows` levels with POC and value area."""
+    if not len(hist.up):
+        return {
+            "bin_size": 0.0,
+            "total_volume": 0.0,
+            "poc": None,
+            "value_area_low": None,
+            "value_area_high": None,
+            "levels": [],
+        }
+    last = hist.first + len(hist.up) - 1
+    group = -(-len(hist.up) // rows)
+    while True:
+        # Align groups to multiples of `group` so edges fall on round prices.
+        start = hist.first - hist.first % group
+        count = (last - start) // group + 1
+        if count <= rows:
+            break
+        group += 1
+    index = (hist.first + np.arange(len(hist.up)) - start) // group
+    up = np.bincount(index, hist.up, minlength=count)
+    down = np.bincount(index, hist.down, minlength=count)
+    volume = up + down
+
+    decimals = max(0, -hist.exp)
+    size = group * hist.step
+    edges = [round((start + k * group) * hist.step, decimals) for k in range(count + 1)]
+    poc = int(np.argmax(volume))
+    va_lo, va_hi = value_area(volume, fraction)
+    return {
+        "bin_size": round(size, decimals),
+        "total_volume": float(volume.sum()),
+        "poc": round((edges[poc] + edges[poc + 1]) / 2, decimals + 1),
+        "value_area_low": edges[va_lo],
+        "value_area_high": edges[va_hi + 1],
+        "levels": [
+            {
+                "price_low": edges[k],
+                "price_high": edges[k + 1],
+                "volume": float(volume[k]),
+                "up_volume": float(up[k]),
+                "down_volume": float(down[k]),
+            }
+            for k in range(count)
+        ],
+    }
+
+
+class DayProfileCache:
+    """Byte-budgeted LRU of per-day histograms of closed UTC days.
+
+    Keyed by (symbol, source interval, day start). A closed day's candles
+    never change, so entries never go stale.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str, int], Histogram] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, interval: str, day: int) -> Histogram | None:
+        key = (symbol, interval, day)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, symbol: str, interval: str, day: int, hist: Histogram) -> None:
+        key = (symbol, interval, day)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        if hist.nbytes > self._max_bytes:
+            return
+        self._entries[key] = hist
+        self._bytes += hist.nbytes
+        while self._bytes > self._max_bytes:
+            _, oldest = self._entries.popitem(last=False)
+            self._bytes -= oldest.nbytes
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+day_profile_cache = DayProfileCache(settings.VOLUME_PROFILE_CACHE_BYTES)
+
+
+def _pieces(start_time: int, end_time: int) -> list[tuple[int, int, bool]]:
+    """Split [start_time, end_time] at UTC midnights: (lo, hi, is_whole_day)."""
+    pieces = []
+    lo = start_time
+    while lo <= end_time:
+        day_end = (lo // DAY_SECONDS + 1) * DAY_SECONDS - 1
+        hi = min(day_end, end_time)
+        pieces.append((lo, hi, lo % DAY_SECONDS == 0 and hi == day_end))
+        lo = hi + 1
+    return pieces
+
+
+async def build_profile(
+    service: MarketDataService,
+    symbol: str,
+    start_time: int,
+    end_time: int,
+    rows: int,
+    fraction: float,
+) -> dict:
+    """Volume profile of candles opening in [start_time, end_time].
+
+    Raises ValueError / httpx errors from loading candles.
+    """
+    interval = source_interval(start_time, end_time)
+    now = int(_time.time())
+    started = _time.perf_counter()
+
+    pieces = _pieces(start_time, end_time)
+    parts: list[Histogram | None] = []
+    missing: list[int] = []
+    for i, (lo, hi, whole) in enumerate(pieces):
+        hist = day_profile_cache.get(symbol, interval, lo) if whole and hi < now else None
+        parts.append(hist)
+        if hist is None:
+            missing.append(i)
+
+    # Load consecutive missing pieces with one span read each.
+    runs: list[list[int]] = []
+    for i in missing:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    loaded = 0
+    for run in runs:
+        batch = await service.get_span(symbol, interval, pieces[run[0]][0], pieces[run[-1]][1])
+        loaded += len(batch)
+        for i in run:
+            lo, hi, whole = pieces[i]
+            parts[i] = histogram(batch.between(lo, hi))
+            if whole and hi < now:
+                day_profile_cache.put(symbol, interval, lo, parts[i])
+
+    result = summarize(merge(parts), rows, fraction)
+    logger.info(
+        "volume_profile_built",
+        symbol=symbol,
+        interval=interval,
+        days=len(pieces),
+        cached_days=len(pieces) - len(missing),
+        loaded_candles=loaded,
+        ms=round((_time.perf_counter() - started) * 1000, 2),
+    )
+    return {"source_interval": interval, **result}
@@ -0,0 +1,87 @@
+"""Write-behind persistence of closed candles received from upstream streams."""
+
+import asyncio
+
+import structlog
+
+from app.database import async_session
+from app.market_data.batch import CandleBatch
+from app.market_data.schemas import AssetClass, OHLCVCandle, detect_asset_class
+from app.market_data.service import MarketDataService
+
+logger = structlog.get_logger()
+
+
+class CandleWriteBehind:
+    """Buffer closed stream candles and persist them in periodic bulk flushes.
+
+    Candles are de-duplicated per (symbol, interval, open_time) while
+    buffered, so a re-sent closed candle only costs one row. Flushes go
+    through MarketDataService.store_candles, the same bulk path used by
+    history caching and backfill.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, max_buffered: int = 5000) -> None:
+        self._flush_interval = flush_interval
+        self._max_buffered = max_buffered
+        self._buffer: dict[tuple[str, str], dict[int, OHLCVCandle]] = {}
+        self._buffered = 0
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the background flush loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="candle-write-behind")
+
+    def add(self, symbol: str, interval: str, candle: OHLCVCandle) -> None:
+        """Queue a closed candle for persistence."""
+        series = self._buffer.setdefault((symbol, interval), {})
+        if candle.time not in series:
+            self._buffered += 1
+        series[candle.time] = candle
+        if self._buffered >= self._max_buffered:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Persist everything buffered so far."""
+        if not self._buffer:
+            return
+        pending, self._buffer, self._buffered = self._buffer, {}, 0
+
+        for (symbol, interval), series in pending.items():
+            batch = CandleBatch.from_candles([series[t] for t in sorted(series)])
+            provider = (
+                "twelvedata" if detect_asset_class(symbol) == AssetClass.FOREX else "binance"
+            )
+            try:
+                async with async_session() as session:
+                    service = MarketDataService(session)
+                    await service.store_candles(batch, symbol, interval, provider)
+                    await session.commit()
+            except Exception as e:
+                # Dropped candles are re-fetched by the next history request.
+                logger.warning(
+                    "write_behind_flush_failed",
+                    symbol=symbol,
+                    interval=interval,
+                    count=len(batch),
+                    error=str(e),
+                )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and persist whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
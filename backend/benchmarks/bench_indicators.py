@@ -0,0 +1,170 @@
+"""Benchmark the indicator engine against naive per-candle Python loops.
+
+Run from backend/:
+
+    python -m benchmarks.bench_indicators [--candles 5000] [--repeat 5]
+
+Reports, per indicator:
+- naive:   straightforward per-bar Python loops over lists; windowed
+           indicators re-scan their window on every bar
+- batch:   the vectorized NumPy implementation in app.market_data.indicators
+- update:  one incremental IndicatorState.update on a forming candle
+           (the alternative is recomputing the whole series in batch)
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.market_data.batch import CandleBatch
+from app.market_data.indicators import compute_indicator, create_state, resolve_params
+from app.market_data.schemas import OHLCVCandle
+
+
+def make_batch(n: int, seed: int = 7) -> CandleBatch:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    time_ = np.arange(n, dtype=np.int64) * 60 + 1_700_000_040
+    return CandleBatch(time_, open_, high, low, close, rng.random(n) * 10)
+
+
+# --- naive reference implementations ----------------------------------------
+
+
+def naive_sma(close: list[float], period: int) -> list[float]:
+    return [
+        sum(close[i - period + 1 : i + 1]) / period if i >= period - 1 else math.nan
+        for i in range(len(close))
+    ]
+
+
+def naive_ema(close: list[float], period: int) -> list[float]:
+    alpha = 2 / (period + 1)
+    out = [math.nan] * len(close)
+    for i in range(period - 1, len(close)):
+        if i == period - 1:
+            out[i] = sum(close[:period]) / period
+        else:
+            out[i] = out[i - 1] + alpha * (close[i] - out[i - 1])
+    return out
+
+
+def naive_rsi(close: list[float], period: int) -> list[float]:
+    out = [math.nan] * len(close)
+    avg_gain = avg_loss = 0.0
+    for i in range(1, len(close)):
+        change = close[i] - close[i - 1]
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if i <= period:
+            avg_gain += gain / period
+            avg_loss += loss / period
+        else:
+            avg_gain += (gain - avg_gain) / period
+            avg_loss += (loss - avg_loss) / period
+        if i >= period:
+            out[i] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+
+def naive_bollinger(close: list[float], period: int, k: float) -> list[tuple[float, float, float]]:
+    out = []
+    for i in range(len(close)):
+        if i < period - 1:
+            out.append((math.nan, math.nan, math.nan))
+            continue
+        window = close[i - period + 1 : i + 1]
+        mean = sum(window) / period
+        std = math.sqrt(sum((x - mean) ** 2 for x in window) / period)
+        out.append((mean, mean + k * std, mean - k * std))
+    return out
+
+
+def naive_stochastic(high: list[float], low: list[float], close: list[float], period: int) -> list[float]:
+    out = []
+    for i in range(len(close)):
+        if i < period - 1:
+            out.append(math.nan)
+            continue
+        hh = max(high[i - period + 1 : i + 1])
+        ll = min(low[i - period + 1 : i + 1])
+        out.append(100 * (close[i] - ll) / (hh - ll) if hh > ll else 50.0)
+    return out
+
+
+# --- harness -----------------------------------------------------------------
+
+
+def best_of(fn, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candles", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    batch = make_batch(args.candles)
+    close, high, low = batch.close.tolist(), batch.high.tolist(), batch.low.tolist()
+
+    cases = [
+        ("sma", {"period": 200}, lambda: naive_sma(close, 200)),
+        ("ema", {"period": 200}, lambda: naive_ema(close, 200)),
+        ("rsi", {"period": 14}, lambda: naive_rsi(close, 14)),
+        ("bollinger", {"period": 20}, lambda: naive_bollinger(close, 20, 2.0)),
+        ("stochastic", {"k_period": 14}, lambda: naive_stochastic(high, low, close, 14)),
+        ("macd", {}, None),
+        ("atr", {}, None),
+        ("ichimoku", {}, None),
+        ("vwap", {}, None),
+    ]
+
+    print(f"{args.candles} candles, best of {args.repeat}")
+    print(f"{'indicator':<12}{'naive ms':>12}{'batch ms':>12}{'speedup':>10}{'update us':>12}")
+
+    forming = OHLCVCandle(
+        time=int(batch.time[-1]) + 60,
+        open=close[-1],
+        high=close[-1] + 1,
+        low=close[-1] - 1,
+        close=close[-1] + 0.5,
+        volume=1.0,
+    )
+
+    for name, params, naive in cases:
+        resolved = resolve_params(name, params)
+        batch_sec = best_of(lambda: compute_indicator(batch, name, resolved), args.repeat)
+
+        state = create_state(name, resolved)
+        state.seed(batch)
+        updates = 10_000
+        started = time.perf_counter()
+        for _ in range(updates):
+            state.update(forming, is_closed=False)
+        update_us = (time.perf_counter() - started) / updates * 1e6
+
+        if naive is not None:
+            naive_sec = best_of(naive, args.repeat)
+            naive_col = f"{naive_sec * 1000:>12.2f}"
+            speedup = f"{naive_sec / batch_sec:>9.0f}x"
+        else:
+            naive_col, speedup = f"{'-':>12}", f"{'-':>10}"
+
+        print(
+            f"{name:<12}{naive_col}{batch_sec * 1000:>12.3f}{speedup}"
+            f"{update_us:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Round trips of the scaled-integer ticks format."""
+
+import numpy as np
+import pytest
+
+from app.market_data.batch import CandleBatch
+from app.market_data.encoding import decode_ticks, encode_ticks
+from app.market_data.schemas import AssetClass
+from app.market_data.symbol_registry import SymbolInfo, crypto_info
+
+BTC = crypto_info("BTCUSDT", "BTC", "USDT", "0.01000000", "0.00001000")
+USDJPY = SymbolInfo("USD/JPY", "USD", "JPY", AssetClass.FOREX, 0.001, 1.0, 3, 0)
+
+
+def on_grid(meta: SymbolInfo, n: int, seed: int, price: float, volume: float) -> CandleBatch:
+    """Candles whose values are exact multiples of the symbol's increments."""
+    rng = np.random.default_rng(seed)
+    tick, step = meta.tick_size, meta.step_size
+    close = np.round(price / tick) + np.cumsum(rng.integers(-50, 51, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    # Some candles gap away from the previous close.
+    open_[::13] += rng.integers(-400, 401, len(open_[::13]))
+    high = np.maximum(open_, close) + rng.integers(0, 30, n)
+    low = np.minimum(open_, close) - rng.integers(0, 30, n)
+    # Large volumes (sums of many trades) test the grid tolerance at scale.
+    units = rng.integers(0, int(volume / step), n)
+    time = 1_700_000_000 + np.cumsum(rng.choice([60, 60, 60, 120, 3600], n))
+    return CandleBatch(
+        time.astype(np.int64),
+        np.round(open_ * tick, meta.price_decimals),
+        np.round(high * tick, meta.price_decimals),
+        np.round(low * tick, meta.price_decimals),
+        np.round(close * tick, meta.price_decimals),
+        np.round(units * step, meta.qty_decimals),
+    )
+
+
+def assert_same(a: CandleBatch, b: CandleBatch) -> None:
+    assert len(a) == len(b)
+    for x, y in zip(a.columns(), b.columns()):
+        assert np.array_equal(x, y)
+
+
+@pytest.mark.parametrize(
+    ("meta", "price", "volume"),
+    [(BTC, 65_000.0, 250_000.0), (BTC, 0.5, 10.0), (USDJPY, 150.0, 1000.0)],
+)
+def test_ticks_round_trip_is_exact(meta: SymbolInfo, price: float, volume: float) -> None:
+    batch = on_grid(meta, 2000, seed=1, price=price, volume=volume)
+    assert_same(decode_ticks(encode_ticks(batch, meta)), batch)
+
+
+def test_ticks_round_trip_of_summed_volume() -> None:
+    # Resampled candles sum volumes, which leaves float noise at large values.
+    parts = [on_grid(BTC, 500, seed=s, price=65_000.0, volume=50_000.0).volume for s in range(4)]
+    batch = on_grid(BTC, 500, seed=9, price=65_000.0, volume=1.0)
+    summed = CandleBatch(batch.time, batch.open, batch.high, batch.low, batch.close, sum(parts))
+    decoded = decode_ticks(encode_ticks(summed, BTC))
+    assert np.allclose(decoded.volume, summed.volume, rtol=0, atol=BTC.step_size / 2)
+
+
+def test_ticks_round_trip_of_edge_batches() -> None:
+    for batch in (CandleBatch.empty(), on_grid(BTC, 1, seed=2, price=65_000.0, volume=5.0)):
+        assert_same(decode_ticks(encode_ticks(batch, BTC)), batch)
+
+
+def test_ticks_reject_values_off_the_grid() -> None:
+    batch = on_grid(BTC, 10, seed=3, price=65_000.0, volume=5.0)
+    averaged = CandleBatch(
+        batch.time, batch.open, batch.high, batch.low, batch.close + 0.005, batch.volume
+    )
+    with pytest.raises(RuntimeError):
+        encode_ticks(averaged, BTC)
+
+
+def test_ticks_need_increments() -> None:
+    unknown = SymbolInfo("XUSDT", "X", "USDT", AssetClass.CRYPTO, 0.0, 0.0, 0, 0)
+    with pytest.raises(RuntimeError):
+        encode_ticks(on_grid(BTC, 5, seed=4, price=1.0, volume=1.0), unknown)
@@ -0,0 +1,141 @@
+"""The vectorized trade engine against a naive per-candle loop."""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.backtest import engine
+
+
+def make_candles(
+    n: int, seed: int, wick: float = 0.4, gap_every: int = 50
+) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.3, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    # Gapping candles exercise fills at the open.
+    open_[::gap_every] += rng.normal(0, 2, len(open_[::gap_every]))
+    high = np.maximum(open_, close) + rng.uniform(0, wick, n)
+    low = np.minimum(open_, close) - rng.uniform(0, wick, n)
+    time = np.arange(n, dtype=np.int64) * 60 + 1_700_000_000
+    return time, open_, high, low, close, np.ones(n)
+
+
+def make_trades(candles: tuple[np.ndarray, ...], n: int, seed: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    time, close = candles[0], candles[4]
+    # Some entries fall before the first and after the last candle.
+    entry_time = rng.integers(time[0] - 600, time[-1] + 600, n)
+    at = np.clip(np.searchsorted(time, entry_time, "right") - 1, 0, len(time) - 1)
+    entry_price = close[at]
+    direction = rng.choice([-1.0, 1.0], n)
+    stop_loss = entry_price - direction * rng.uniform(0.2, 4, n)
+    take_profit = entry_price + direction * rng.uniform(0.2, 4, n)
+    stop_loss[::7] = np.nan
+    take_profit[::11] = np.nan
+    expires = np.where(rng.random(n) < 0.2, entry_time + rng.integers(0, 6000, n), time[-1] + 1)
+    return {
+        "entry_time": entry_time,
+        "entry_price": entry_price,
+        "direction": direction,
+        "stop_loss": stop_loss,
+        "take_profit": take_profit,
+        "expires": expires,
+    }
+
+
+def naive_evaluate(candles, trade: dict, max_candles: int, stop_first: bool):
+    """(exit_index, reason, ambiguous, exit_price) of one trade, candle by candle."""
+    time, open_, high, low, close = candles[:5]
+    d, sl, tp = trade["direction"], trade["stop_loss"], trade["take_profit"]
+    start = int(np.searchsorted(time, trade["entry_time"], "right"))
+    end = min(start + max_candles, len(time), int(np.searchsorted(time, trade["expires"], "right")))
+    for i in range(start, end):
+        adverse = low[i] if d > 0 else high[i]
+        favorable = high[i] if d > 0 else low[i]
+        stop = adverse * d <= sl * d
+        target = favorable * d >= tp * d
+        if not (stop or target):
+            continue
+        ambiguous = False
+        if stop and target:
+            if open_[i] * d <= sl * d:
+                target = False
+            elif open_[i] * d >= tp * d:
+                stop = False
+            else:
+                ambiguous = True
+                if stop_first:
+                    target = False
+                else:
+                    stop = False
+        if stop:
+            price = open_[i] if open_[i] * d <= sl * d else sl
+            return i, engine.STOP, ambiguous, price
+        price = open_[i] if open_[i] * d >= tp * d else tp
+        return i, engine.TARGET, ambiguous, price
+    if start < end:
+        return end - 1, engine.OPEN, False, close[end - 1]
+    return -1, engine.OPEN, False, math.nan
+
+
+def check_against_naive(candles, trades, max_candles: int, stop_first: bool) -> None:
+    out = engine.evaluate(
+        candles,
+        trades["entry_time"],
+        trades["entry_price"],
+        trades["direction"],
+        trades["stop_loss"],
+        trades["take_profit"],
+        max_candles,
+        stop_first,
+        trades["expires"],
+    )
+    for j in range(len(trades["entry_time"])):
+        trade = {k: v[j] for k, v in trades.items()}
+        exit_index, reason, ambiguous, price = naive_evaluate(candles, trade, max_candles, stop_first)
+        assert out.exit_index[j] == exit_index, j
+        assert out.reason[j] == reason, j
+        assert out.ambiguous[j] == ambiguous, j
+        assert out.exit_price[j] == pytest.approx(price, nan_ok=True), j
+        pnl = (price - trade["entry_price"]) * trade["direction"]
+        if reason == engine.OPEN:
+            assert out.outcome[j] == engine.OUTCOME_OPEN
+        elif abs(pnl) > engine.BREAKEVEN_TOLERANCE * trade["entry_price"]:
+            assert out.outcome[j] == (engine.WIN if pnl > 0 else engine.LOSS), j
+
+
+@pytest.mark.parametrize("stop_first", [True, False])
+@pytest.mark.parametrize("max_candles", [1, 40, 5000])
+def test_engine_matches_naive_loop(stop_first: bool, max_candles: int) -> None:
+    candles = make_candles(3000, seed=1)
+    trades = make_trades(candles, 400, seed=2)
+    check_against_naive(candles, trades, max_candles, stop_first)
+
+
+@pytest.mark.parametrize("stop_first", [True, False])
+def test_engine_resolves_same_candle_hits(stop_first: bool) -> None:
+    # Wide candles and frequent gaps: many candles reach both levels.
+    candles = make_candles(1500, seed=5, wick=3.0, gap_every=3)
+    trades = make_trades(candles, 400, seed=6)
+    check_against_naive(candles, trades, 5000, stop_first)
+
+
+def test_engine_scans_in_slices_under_a_small_budget(monkeypatch) -> None:
+    # More pending trades than one pass holds: scanned in slices.
+    monkeypatch.setattr(engine, "MAX_SCAN_ELEMENTS", 256)
+    candles = make_candles(2000, seed=3)
+    trades = make_trades(candles, 300, seed=4)
+    check_against_naive(candles, trades, 5000, stop_first=True)
+
+
+def test_engine_without_candles() -> None:
+    empty = tuple(np.empty(0, dtype=np.int64 if i == 0 else np.float64) for i in range(6))
+    out = engine.evaluate(
+        empty, np.array([1]), np.array([100.0]), np.array([1.0]),
+        np.array([99.0]), np.array([101.0]), 10,
+    )
+    assert out.exit_index[0] == -1
+    assert out.outcome[0] == engine.OUTCOME_OPEN
+    assert math.isnan(out.exit_price[0])
@@ -0,0 +1,85 @@
+"""Batch indicators against their incremental states."""
+
+import numpy as np
+import pytest
+
+from app.market_data.batch import CandleBatch
+from app.market_data.indicators import (
+    INDICATORS,
+    PIVOT_METHODS,
+    SESSION_ANCHORS,
+    SOURCES,
+    compute_indicator,
+    create_state,
+    resolve_params,
+)
+from app.market_data.schemas import OHLCVCandle
+
+# Hourly candles over about 70 days, so daily, weekly and monthly sessions roll.
+N = 1700
+FIRST = 1_704_067_200  # 2024-01-01 00:00 UTC
+
+
+def make_batch(seed: int = 7) -> CandleBatch:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, N))
+    open_ = np.concatenate(([close[0]], close[:-1])) + rng.normal(0, 0.2, N)
+    high = np.maximum(open_, close) + rng.random(N)
+    low = np.minimum(open_, close) - rng.random(N)
+    time = FIRST + np.arange(N, dtype=np.int64) * 3600
+    return CandleBatch(time, open_, high, low, close, rng.random(N) * 10)
+
+
+def configurations() -> list[tuple[str, dict]]:
+    configs = [(name, {}) for name in INDICATORS]
+    configs += [(name, {"source": s}) for name in ("sma", "ema", "wma") for s in SOURCES]
+    configs += [("bollinger", {"period": 5, "stddev": 1.5, "source": "hlc3"})]
+    configs += [("stochastic", {"k_period": 9, "k_smooth": 3, "d_period": 5})]
+    configs += [("macd", {"fast": 5, "slow": 35, "signal": 5})]
+    configs += [("pivots", {"method": m, "anchor": a}) for m in PIVOT_METHODS for a in SESSION_ANCHORS]
+    configs += [("vwap", {"anchor": a}) for a in SESSION_ANCHORS]
+    configs += [("vwap", {"start_time": FIRST + 100 * 3600})]
+    return configs
+
+
+def assert_close(actual: np.ndarray, expected: np.ndarray) -> None:
+    assert np.allclose(actual, expected, rtol=1e-7, atol=1e-9, equal_nan=True)
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+
+
+@pytest.mark.parametrize(("name", "params"), configurations())
+def test_state_matches_batch(name: str, params: dict) -> None:
+    batch = make_batch()
+    params = resolve_params(name, params)
+    expected = compute_indicator(batch, name, params)
+
+    extended = create_state(name, params).extend(batch)
+    assert extended.keys() == expected.keys()
+    for key in expected:
+        assert_close(extended[key], expected[key])
+
+
+@pytest.mark.parametrize(("name", "params"), configurations())
+def test_streamed_updates_match_batch(name: str, params: dict) -> None:
+    """Seed on a prefix, then preview and close each later candle."""
+    batch = make_batch()
+    params = resolve_params(name, params)
+    expected = compute_indicator(batch, name, params)
+
+    state = create_state(name, params)
+    split = N // 2
+    state.seed(batch[:split])
+    for i in range(split, N):
+        t, o, h, lo, c, v = (column[i].item() for column in batch.columns())
+        candle = OHLCVCandle(time=t, open=o, high=h, low=lo, close=c, volume=v)
+        # A partial preview first: it must not change the committed state.
+        state.update(OHLCVCandle(time=t, open=o, high=o, low=o, close=o, volume=0.0), False)
+        preview = state.update(candle, False)
+        closed = state.update(candle, True)
+        assert preview == closed
+        for key, value in closed.items():
+            want = expected[key][i]
+            if np.isnan(want):
+                assert value is None
+            else:
+                assert value == pytest.approx(want, rel=1e-7, abs=1e-9)
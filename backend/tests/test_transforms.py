@@ -0,0 +1,99 @@
+"""Batch chart transforms against their incremental states."""
+
+import numpy as np
+import pytest
+
+from app.market_data.batch import CandleBatch
+from app.market_data.schemas import OHLCVCandle
+from app.market_data.transforms import (
+    apply_transform,
+    create_transform_state,
+    resolve_transform_params,
+)
+
+N = 1500
+
+
+def make_batch(seed: int = 3, step: int = 60) -> CandleBatch:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.8, N))
+    open_ = np.concatenate(([close[0]], close[:-1])) + rng.normal(0, 0.1, N)
+    high = np.maximum(open_, close) + rng.random(N)
+    low = np.minimum(open_, close) - rng.random(N)
+    time = 1_704_067_200 + np.arange(N, dtype=np.int64) * step
+    return CandleBatch(time, open_, high, low, close, rng.random(N) * 10)
+
+
+def candle(batch: CandleBatch, i: int) -> OHLCVCandle:
+    t, o, h, lo, c, v = (column[i].item() for column in batch.columns())
+    return OHLCVCandle(time=t, open=o, high=h, low=lo, close=c, volume=v)
+
+
+def streamed(name: str, params: dict, batch: CandleBatch) -> CandleBatch:
+    """Bars from closing each candle in turn, previewing it first."""
+    state = create_transform_state(name, params)
+    rows: list[OHLCVCandle] = []
+    forming = None
+    for i in range(len(batch)):
+        c = candle(batch, i)
+        partial = OHLCVCandle(time=c.time, open=c.open, high=c.open, low=c.open, close=c.open, volume=0.0)
+        state.update(partial, is_closed=False)
+        preview = state.update(c, is_closed=False)
+        completed, forming = state.update(c, is_closed=True)
+        if name != "heikin_ashi":
+            # A closed candle yields what its preview showed.
+            assert preview == (completed, forming)
+        rows.extend(completed)
+    if forming is not None:
+        rows.append(forming)
+    return CandleBatch.from_candles(rows) if rows else CandleBatch.empty()
+
+
+def assert_same_bars(actual: CandleBatch, expected: CandleBatch) -> None:
+    assert len(actual) == len(expected)
+    assert np.array_equal(actual.time, expected.time)
+    for a, b in zip(actual.columns()[1:], expected.columns()[1:]):
+        assert np.allclose(a, b, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    ("name", "params"),
+    [
+        ("heikin_ashi", {}),
+        ("renko", {"brick_size": 0.5}),
+        ("renko", {"brick_size": 3.0}),
+        ("range", {"brick_size": 0.5}),
+        ("range", {"brick_size": 3.0}),
+    ],
+)
+def test_streamed_transform_matches_batch(name: str, params: dict) -> None:
+    batch = make_batch()
+    params = resolve_transform_params(name, params)
+    assert_same_bars(streamed(name, params, batch), apply_transform(batch, name, params))
+
+
+@pytest.mark.parametrize(
+    ("name", "params"),
+    [("volume", {"threshold": 40.0}), ("dollar", {"threshold": 2500.0})],
+)
+def test_streamed_activity_bars_match_batch(name: str, params: dict) -> None:
+    # 15-minute candles over about 15 days: counts restart at each UTC midnight.
+    batch = make_batch(step=900)
+    params = resolve_transform_params(name, params)
+    assert_same_bars(streamed(name, params, batch), apply_transform(batch, name, params))
+
+
+@pytest.mark.parametrize("name", ["renko", "range"])
+def test_rejected_candle_leaves_state_untouched(name: str) -> None:
+    batch = make_batch()
+    params = resolve_transform_params(name, {"brick_size": 0.5})
+    state = create_transform_state(name, params)
+    reference = create_transform_state(name, params)
+    state.seed(batch[:100])
+    reference.seed(batch[:100])
+
+    spike = candle(batch, 100).model_copy(update={"high": 1e6, "close": 1e6})
+    with pytest.raises(ValueError):
+        state.update(spike, is_closed=True)
+    for i in range(100, 200):
+        assert state.update(candle(batch, i), True) == reference.update(candle(batch, i), True)
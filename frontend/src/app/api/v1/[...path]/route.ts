@@ -1,5 +1,19 @@
 import { NextRequest, NextResponse } from "next/server";
 
+// Request headers forwarded to the backend in addition to content-type/cookie.
+// Accept selects compact history formats; If-None-Match revalidates pages.
+const FORWARDED_REQUEST_HEADERS = ["accept", "if-none-match"];
+
+// Response headers passed back so browsers and CDNs can cache immutable
+// history pages and revalidate them with ETags.
+const FORWARDED_RESPONSE_HEADERS = [
+  "content-type",
+  "cache-control",
+  "etag",
+  "vary",
+  "server-timing",
+];
+
 // Route handlers run server-side — use BACKEND_URL (same as auth.ts)
 // with NEXT_PUBLIC_BACKEND_URL as fallback for compatibility.
 const BACKEND_URL =
@@ -23,6 +37,10 @@ async function proxyRequest(
   const headers = new Headers();
   headers.set("content-type", request.headers.get("content-type") || "application/json");
   headers.set("cookie", request.headers.get("cookie") || "");
+  for (const name of FORWARDED_REQUEST_HEADERS) {
+    const value = request.headers.get(name);
+    if (value) headers.set(name, value);
+  }
 
   const response = await fetch(url.toString(), {
     method: request.method,
@@ -32,12 +50,21 @@ async function proxyRequest(
     duplex: "half",
   });
 
+  // fetch() already decoded any Content-Encoding, so that header is not
+  // forwarded; the platform re-compresses the response itself.
+  const responseHeaders = new Headers();
+  for (const name of FORWARDED_RESPONSE_HEADERS) {
+    const value = response.headers.get(name);
+    if (value) responseHeaders.set(name, value);
+  }
+  if (!responseHeaders.has("content-type")) {
+    responseHeaders.set("content-type", "application/json");
+  }
+
   return new NextResponse(response.body, {
     status: response.status,
     statusText: response.statusText,
-    headers: {
-      "content-type": response.headers.get("content-type") || "application/json",
-    },
+    headers: responseHeaders,
   });
 }
 
@@ -1,7 +1,7 @@
 import { apiGet } from "@/lib/api";
 import type {
   OHLCVCandle,
-  HistoricalResponse,
+  ColumnarHistoricalResponse,
   AssetClass,
 } from "@/types/market-data";
 
@@ -14,6 +14,9 @@ interface FetchHistoricalOptions {
 /**
  * Fetch historical OHLCV candles for a symbol and interval.
  * Proxied through Next.js rewrites to the backend.
+ *
+ * Requests the compact columnar format (one array per field) and zips it
+ * back into candle objects for the chart.
  */
 export async function fetchHistoricalCandles(
   symbol: string,
@@ -23,6 +26,7 @@ export async function fetchHistoricalCandles(
   const params = new URLSearchParams();
   params.set("symbol", symbol);
   params.set("interval", interval);
+  params.set("format", "columnar");
 
   if (options.startTime !== undefined) {
     params.set("start_time", String(options.startTime));
@@ -34,10 +38,26 @@ export async function fetchHistoricalCandles(
     params.set("limit", String(options.limit));
   }
 
-  const response = await apiGet<HistoricalResponse>(
+  const response = await apiGet<ColumnarHistoricalResponse>(
     `/api/v1/market-data/history?${params.toString()}`,
   );
-  return response.candles;
+  return fromColumnar(response);
+}
+
+function fromColumnar(response: ColumnarHistoricalResponse): OHLCVCandle[] {
+  const { t, o, h, l, c, v } = response;
+  const candles: OHLCVCandle[] = new Array(t.length);
+  for (let i = 0; i < t.length; i++) {
+    candles[i] = {
+      time: t[i],
+      open: o[i],
+      high: h[i],
+      low: l[i],
+      close: c[i],
+      volume: v[i],
+    };
+  }
+  return candles;
 }
 
 /**
@@ -74,3 +74,15 @@ export interface HistoricalResponse {
   interval: string;
   candles: OHLCVCandle[];
 }
+
+/** Columnar /history response (format=columnar): one array per field. */
+export interface ColumnarHistoricalResponse {
+  symbol: string;
+  interval: string;
+  t: number[];
+  o: number[];
+  h: number[];
+  l: number[];
+  c: number[];
+  v: number[];
+}